@@ -164,6 +164,31 @@ def _load_dataframes_from_csv(site_folder: str) -> Dict[str, pd.DataFrame]:
     return dataframes
 
 
+def _load_qc_rejection_rates(site_folder: str, site_name: str) -> Dict[str, float]:
+    """
+    Read the per-year NOAA ISD QC tables (qc_<source>_<site>.csv written by
+    noaa_isd_fetcher) and return, per source key, the share of hourly wind
+    speed values rejected by quality code or range (%).
+    """
+    rates: Dict[str, float] = {}
+    suffix = f"_{site_name}.csv"
+
+    for file in Path(site_folder).glob(f"qc_*{suffix}"):
+        source_key = file.name[len("qc_"):-len(suffix)]
+        try:
+            df_qc = pd.read_csv(file)
+        except Exception as e:
+            print(f"  [Error] Failed to read QC table {file.name}: {e}")
+            continue
+
+        speed_cols = [c for c in df_qc.columns if c.startswith("speed_")]
+        n_obs = df_qc["n_obs"].sum() if "n_obs" in df_qc.columns else 0
+        if n_obs > 0:
+            rates[source_key] = df_qc[speed_cols].to_numpy().sum() / n_obs * 100.0
+
+    return rates
+
+
 # ============================================================
 # 2. Fonction principale : run_analysis_for_site
 # ============================================================
@@ -334,6 +359,8 @@ def run_analysis_for_site(
     # ------------------------------------------------------------
     print("Evaluating data quality / coverage...")
 
+    qc_rejection_rates = _load_qc_rejection_rates(site_folder, site_name)
+
     coverage_rows = []
     for name, df in dataframes.items():
         if "time" not in df.columns:
@@ -365,6 +392,9 @@ def run_analysis_for_site(
                 "Row count": nb_lignes,
                 "Mean wind coverage (%)": round(coverage_mean, 1),
                 "Gust coverage (%)": round(coverage_gust, 1),
+                "QC rejected hourly speeds (%)": round(
+                    qc_rejection_rates.get(name, np.nan), 1
+                ),
             }
         )
 
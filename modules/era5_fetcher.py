@@ -1,10 +1,13 @@
 import cdsapi
 import os
+import time
 import zipfile
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from modules.utils import file_lock
+
 
 def read_era5_csv(filepath):
     """
@@ -160,6 +163,247 @@ def save_era5_daily(site_name, site_folder, hourly_df):
     return filepath
 
 
+ERA5_DATASET = "reanalysis-era5-single-levels-timeseries"
+
+# ERA5 native grid spacing (deg). The timeseries dataset serves the nearest
+# grid point, so all sites within one cell receive the same series.
+ERA5_GRID_STEP_DEG = 0.25
+
+# Cell-level hourly series shared by all sites of a grid cell (direct
+# downloads and queued jobs alike)
+ERA5_CELL_CACHE_DIR = os.path.join("data", "cache", "era5")
+# A cell download lock older than this is considered abandoned (s)
+ERA5_CELL_LOCK_STALE_S = 3 * 3600
+# Poll interval of a direct download with a time budget (s)
+ERA5_POLL_INTERVAL_S = 10
+
+# CDS states (legacy API and ecmwf-datastores statuses)
+_CDS_COMPLETED = ("completed", "successful")
+_CDS_FAILED = ("failed", "rejected", "dismissed", "deleted")
+
+
+def _cds_job_state(result):
+    """Refresh and return the CDS state of a job."""
+    update = getattr(result, "update", None)
+    if callable(update):
+        update()
+    reply = getattr(result, "reply", None)
+    if isinstance(reply, dict) and reply.get("state"):
+        return reply["state"]
+    return getattr(result, "status", None)
+
+
+def snap_to_era5_grid(lat, lon):
+    """
+    Nearest ERA5 grid point (lat, lon) of a location, lon in [-180, 180).
+    Ties (points halfway between grid lines) go up, not to even.
+    """
+    step = ERA5_GRID_STEP_DEG
+    snapped_lat = float(np.floor(float(lat) / step + 0.5)) * step
+    snapped_lon = float(np.floor(float(lon) / step + 0.5)) * step
+    snapped_lon = ((snapped_lon + 180.0) % 360.0) - 180.0
+    return snapped_lat, snapped_lon
+
+
+def era5_cell_key(lat, lon, start_date, end_date):
+    """
+    Identifier of the ERA5 request for a location: snapped grid cell and
+    date range. Sites sharing a key share one download.
+    """
+    cell_lat, cell_lon = snap_to_era5_grid(lat, lon)
+    return f"{cell_lat:.2f}_{cell_lon:.2f}_{start_date}_{end_date}"
+
+
+def era5_cell_csv_path(key, cell_cache_dir=ERA5_CELL_CACHE_DIR):
+    """Cached hourly series of a cell request (key from era5_cell_key)."""
+    return os.path.join(cell_cache_dir, f"era5_cell_{key}.csv")
+
+
+def era5_cell_lock(cell_csv, poll_s=5.0, stale_s=ERA5_CELL_LOCK_STALE_S, timeout=None):
+    """
+    Lock of a cell series (lock file next to it, shared by the site worker
+    processes), so one site downloads or decodes a cell while the others
+    wait and then reuse its series. A lock older than stale_s is taken over;
+    waiting longer than timeout (s) raises TimeoutError.
+    """
+    return file_lock(f"{cell_csv}.lock", poll_s=poll_s, stale_s=stale_s, timeout=timeout)
+
+
+def build_era5_request(lat, lon, start_date, end_date):
+    """CDS request body for the 10 m wind timeseries at one point."""
+    return {
+        "variable": [
+            "10m_u_component_of_wind",
+            "10m_v_component_of_wind",
+        ],
+        "location": {
+            "longitude": float(lon),
+            "latitude": float(lat),
+        },
+        "date": f"{start_date}/{end_date}",
+        "data_format": "csv",
+    }
+
+
+def build_era5_cell_request(lat, lon, start_date, end_date):
+    """CDS request for the grid cell containing (lat, lon)."""
+    cell_lat, cell_lon = snap_to_era5_grid(lat, lon)
+    return build_era5_request(cell_lat, cell_lon, start_date, end_date)
+
+
+def read_era5_zip(zip_path, work_dir):
+    """
+    Extract the CSV of a downloaded ERA5 timeseries ZIP into work_dir,
+    read it with read_era5_csv and delete the extracted file.
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        csv_files = [f for f in zip_ref.namelist() if f.endswith(".csv")]
+        if not csv_files:
+            raise Exception("No CSV file found in downloaded ERA5 ZIP.")
+        zip_ref.extract(csv_files[0], work_dir)
+
+    temp_csv = os.path.join(work_dir, csv_files[0])
+    try:
+        return read_era5_csv(temp_csv)
+    finally:
+        os.remove(temp_csv)
+
+
+def load_era5_cell_hourly(cell_csv):
+    """Read a cached cell-level hourly series (output of read_era5_csv)."""
+    df = pd.read_csv(cell_csv)
+    df["time"] = pd.to_datetime(df["time"], utc=True)
+    return df
+
+
+def save_era5_cell_hourly(df_hourly_raw, cell_csv):
+    """Atomically write a cell-level hourly series."""
+    os.makedirs(os.path.dirname(cell_csv) or ".", exist_ok=True)
+    tmp_path = f"{cell_csv}.{os.getpid()}.tmp"
+    df_hourly_raw.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, cell_csv)
+
+
+def write_era5_site_outputs(
+    site_name,
+    site_folder,
+    df_hourly_raw,
+    lat,
+    lon,
+    mean_correction_factor=None,
+    gust_correction_factor=None,
+):
+    """
+    Fan a (possibly shared) hourly ERA5 series out to one site.
+
+    Saves:
+        * era5_{site_name}.csv        (hourly)
+        * era5_daily_{site_name}.csv  (daily)
+
+    Returns the summary dict of save_era5_data, or None if empty.
+    """
+    if df_hourly_raw.empty:
+        print("[ERA5] ERA5 file empty after processing.")
+        return None
+
+    os.makedirs(site_folder, exist_ok=True)
+
+    # Add windspeed_mean (hourly) for the raw file
+    df_hourly = df_hourly_raw.copy()
+    df_hourly["windspeed_mean"] = df_hourly["windspeed_10m"]
+
+    if mean_correction_factor is not None:
+        df_hourly["windspeed_mean"] = (
+            df_hourly["windspeed_mean"] * float(mean_correction_factor)
+        )
+        df_hourly["mean_correction_factor"] = float(mean_correction_factor)
+    else:
+        df_hourly["mean_correction_factor"] = 1.0
+
+    # Simple metadata on hourly file
+    df_hourly["source"] = "era5"
+    df_hourly["latitude"] = float(lat)
+    df_hourly["longitude"] = float(lon)
+    df_hourly["timezone"] = "UTC"
+    df_hourly["utc_offset_seconds"] = 0
+    df_hourly["model"] = "ERA5"
+
+    final_csv = os.path.join(site_folder, f"era5_{site_name}.csv")
+    df_hourly.to_csv(final_csv, index=False)
+
+    # Daily aggregation
+    df_daily = _aggregate_era5_daily(
+        df_hourly_raw,
+        lat=lat,
+        lon=lon,
+        mean_correction_factor=mean_correction_factor,
+        gust_correction_factor=gust_correction_factor,
+    )
+
+    daily_csv = os.path.join(site_folder, f"era5_daily_{site_name}.csv")
+    df_daily.to_csv(daily_csv, index=False)
+    print(f"[ERA5] Daily file generated: {daily_csv}")
+    print(f"[ERA5] Hourly file generated: {final_csv}")
+
+    return {
+        "filename": os.path.basename(final_csv),
+        "filepath": final_csv,
+        "filepath_daily": daily_csv,
+        "latitude": lat,
+        "longitude": lon,
+    }
+
+
+def process_era5_zip(
+    site_name,
+    site_folder,
+    zip_path,
+    lat,
+    lon,
+    mean_correction_factor=None,
+    gust_correction_factor=None,
+    remove_zip=True,
+    cell_csv=None,
+):
+    """
+    Turn a downloaded ERA5 timeseries ZIP into the standardized hourly and
+    daily CSVs of a site (read_era5_csv + _aggregate_era5_daily).
+
+    With cell_csv, the decoded hourly series is cached there the first time
+    and reused by the other sites of the same grid cell (the ZIP is then
+    decoded only once).
+
+    Returns the same summary dict as save_era5_data, or None on error.
+    The ZIP is deleted afterwards unless remove_zip=False.
+    """
+    try:
+        if cell_csv and os.path.exists(cell_csv):
+            df_hourly_raw = load_era5_cell_hourly(cell_csv)
+        else:
+            df_hourly_raw = read_era5_zip(zip_path, site_folder)
+            if cell_csv:
+                save_era5_cell_hourly(df_hourly_raw, cell_csv)
+
+        result = write_era5_site_outputs(
+            site_name,
+            site_folder,
+            df_hourly_raw,
+            lat,
+            lon,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+        )
+
+        if remove_zip and os.path.exists(zip_path):
+            os.remove(zip_path)
+
+        return result
+
+    except Exception as e:
+        print(f"[ERA5] ERA5 processing error: {e}")
+        return None
+
+
 def save_era5_data(
     site_name,
     site_folder,
@@ -169,6 +413,8 @@ def save_era5_data(
     end_date,
     mean_correction_factor=None,
     gust_correction_factor=None,
+    cell_cache_dir=ERA5_CELL_CACHE_DIR,
+    timeout=None,
 ):
     """
     Download ERA5 timeseries (reanalysis-era5-single-levels-timeseries)
@@ -182,107 +428,124 @@ def save_era5_data(
     Time:
         - Hourly series in UTC (valid_time).
 
+    Requests are made for the site's ERA5 grid cell (snap_to_era5_grid).
+    The decoded hourly series is cached per cell and date range in
+    cell_cache_dir, so other sites of the same cell reuse it without a new
+    CDS request (cell_cache_dir=None disables this). The download runs
+    under the cell lock (era5_cell_lock): a site of the same cell started
+    meanwhile waits for it instead of sending the same request.
+
     Saves:
         * era5_{site_name}.csv        (hourly)
         * era5_daily_{site_name}.csv  (daily)
+
+    This call blocks while the request waits in the CDS queue; see
+    era5_job_queue for submitting all sites up front. With a timeout (s),
+    the wait for the cell lock and for the CDS job share that budget and
+    TimeoutError is raised once it is spent (the lock is released).
+    """
+    os.makedirs(site_folder, exist_ok=True)
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    if not cell_cache_dir:
+        return _download_era5_site(
+            site_name,
+            site_folder,
+            lat,
+            lon,
+            start_date,
+            end_date,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            deadline=deadline,
+        )
+
+    cell_csv = era5_cell_csv_path(era5_cell_key(lat, lon, start_date, end_date), cell_cache_dir)
+    with era5_cell_lock(cell_csv, timeout=timeout):
+        if os.path.exists(cell_csv):
+            print(f"[ERA5] Reusing grid-cell series {cell_csv} for {site_name}")
+            return write_era5_site_outputs(
+                site_name,
+                site_folder,
+                load_era5_cell_hourly(cell_csv),
+                lat,
+                lon,
+                mean_correction_factor=mean_correction_factor,
+                gust_correction_factor=gust_correction_factor,
+            )
+        return _download_era5_site(
+            site_name,
+            site_folder,
+            lat,
+            lon,
+            start_date,
+            end_date,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            cell_csv=cell_csv,
+            deadline=deadline,
+        )
+
+
+def _download_era5_site(
+    site_name,
+    site_folder,
+    lat,
+    lon,
+    start_date,
+    end_date,
+    mean_correction_factor=None,
+    gust_correction_factor=None,
+    cell_csv=None,
+    deadline=None,
+):
+    """
+    CDS download of a site's cell, then process_era5_zip. Without a
+    deadline (time.monotonic() value) the client blocks until the job is
+    done; with one, the job is submitted without waiting and polled until
+    it completes or the deadline passes (TimeoutError).
     """
     print(f"[ERA5] Downloading timeseries for {site_name}...")
 
-    os.makedirs(site_folder, exist_ok=True)
-    dataset = "reanalysis-era5-single-levels-timeseries"
-    request = {
-        "variable": [
-            "10m_u_component_of_wind",
-            "10m_v_component_of_wind",
-        ],
-        "location": {
-            "longitude": float(lon),
-            "latitude": float(lat),
-        },
-        "date": f"{start_date}/{end_date}",
-        "data_format": "csv",
-    }
+    request = build_era5_cell_request(lat, lon, start_date, end_date)
 
     temp_zip = os.path.join(site_folder, f"era5_temp_{site_name}.zip")
 
     try:
-        c = cdsapi.Client()
+        if deadline is None:
+            c = cdsapi.Client()
+        else:
+            c = cdsapi.Client(wait_until_complete=False)
     except Exception as e:
         print(f"[ERA5] Error creating CDSAPI client: {e}")
         return None
 
     try:
-        result = c.retrieve(dataset, request)
+        result = c.retrieve(ERA5_DATASET, request)
+        if deadline is not None:
+            state = _cds_job_state(result)
+            while state not in _CDS_COMPLETED:
+                if state in _CDS_FAILED:
+                    print(f"[ERA5] CDS job {state}.")
+                    return None
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"ERA5 job still {state} at the deadline")
+                time.sleep(ERA5_POLL_INTERVAL_S)
+                state = _cds_job_state(result)
         result.download(temp_zip)
+    except TimeoutError:
+        raise
     except Exception as e:
         print(f"[ERA5] ERA5 API error: {e}")
         return None
 
-    try:
-        with zipfile.ZipFile(temp_zip, "r") as zip_ref:
-            zip_ref.extractall(site_folder)
-            extracted_files = zip_ref.namelist()
-
-        csv_files = [f for f in extracted_files if f.endswith(".csv")]
-        if not csv_files:
-            raise Exception("No CSV file found in downloaded ERA5 ZIP.")
-
-        temp_csv = os.path.join(site_folder, csv_files[0])
-
-        # Hourly raw data
-        df_hourly_raw = read_era5_csv(temp_csv)
-        if df_hourly_raw.empty:
-            print("[ERA5] ERA5 file empty after processing.")
-            return None
-
-        # Add windspeed_mean (hourly) for the raw file
-        df_hourly = df_hourly_raw.copy()
-        df_hourly["windspeed_mean"] = df_hourly["windspeed_10m"]
-
-        if mean_correction_factor is not None:
-            df_hourly["windspeed_mean"] = (
-                df_hourly["windspeed_mean"] * float(mean_correction_factor)
-            )
-            df_hourly["mean_correction_factor"] = float(mean_correction_factor)
-        else:
-            df_hourly["mean_correction_factor"] = 1.0
-
-        # Simple metadata on hourly file
-        df_hourly["source"] = "era5"
-        df_hourly["latitude"] = float(lat)
-        df_hourly["longitude"] = float(lon)
-        df_hourly["timezone"] = "UTC"
-        df_hourly["utc_offset_seconds"] = 0
-        df_hourly["model"] = "ERA5"
-
-        final_csv = os.path.join(site_folder, f"era5_{site_name}.csv")
-        df_hourly.to_csv(final_csv, index=False)
-
-        # Daily aggregation
-        df_daily = _aggregate_era5_daily(
-            df_hourly_raw,
-            lat=lat,
-            lon=lon,
-            mean_correction_factor=mean_correction_factor,
-            gust_correction_factor=gust_correction_factor,
-        )
-
-        daily_csv = os.path.join(site_folder, f"era5_daily_{site_name}.csv")
-        df_daily.to_csv(daily_csv, index=False)
-        print(f"[ERA5] Daily file generated: {daily_csv}")
-        print(f"[ERA5] Hourly file generated: {final_csv}")
-
-        os.remove(temp_csv)
-        os.remove(temp_zip)
-
-        return {
-            "filename": os.path.basename(final_csv),
-            "filepath": final_csv,
-            "filepath_daily": daily_csv,
-            "latitude": lat,
-            "longitude": lon,
-        }
-
-    except Exception as e:
-        print(f"[ERA5] ERA5 processing error: {e}")
-        return None
+    return process_era5_zip(
+        site_name,
+        site_folder,
+        temp_zip,
+        lat,
+        lon,
+        mean_correction_factor=mean_correction_factor,
+        gust_correction_factor=gust_correction_factor,
+        cell_csv=cell_csv,
+    )
@@ -0,0 +1,362 @@
+# era5_job_queue.py
+#
+# Asynchronous ERA5 job management for batches of sites.
+#
+# save_era5_data() blocks while its request waits in the CDS queue. Here all
+# requests are submitted up front (without waiting), their job IDs are
+# persisted to disk (one JSON file per job), a background thread polls them
+# and downloads the finished ZIPs, and each site later collects its ZIP and
+# runs the usual process_era5_zip() path (read_era5_csv + daily aggregation).
+#
+# Job files survive restarts: a job already submitted is never resubmitted,
+# and polling resumes from the stored job ID.
+#
+# Jobs are keyed on the snapped ERA5 grid cell and date range
+# (era5_cell_key): sites in the same 0.25 deg cell share one CDS request,
+# one ZIP and one decoded hourly CSV, fanned out per site afterwards. The
+# decoded CSV lives in the same cell cache as direct downloads
+# (era5_fetcher.ERA5_CELL_CACHE_DIR), so either path reuses the other's.
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import cdsapi
+
+from modules.era5_fetcher import (
+    _CDS_COMPLETED,
+    _CDS_FAILED,
+    ERA5_CELL_CACHE_DIR,
+    ERA5_DATASET,
+    _cds_job_state,
+    build_era5_cell_request,
+    era5_cell_csv_path,
+    era5_cell_key,
+    era5_cell_lock,
+    process_era5_zip,
+    save_era5_data,
+)
+
+DEFAULT_JOBS_DIR = os.path.join("data", "cache", "era5_jobs")
+DEFAULT_POLL_INTERVAL_S = 30
+# A job whose status cannot be read this many times in a row is marked
+# failed, so the poller ends and waiting sites stop waiting for it.
+MAX_CONSECUTIVE_POLL_ERRORS = 5
+# Default bound on how long a site waits for its queued job.
+DEFAULT_WAIT_TIMEOUT_S = 3 * 3600
+
+# Job states stored on disk
+STATE_SUBMITTED = "submitted"
+STATE_DOWNLOADED = "downloaded"
+STATE_FAILED = "failed"
+
+def era5_job_key(lat, lon, start_date, end_date):
+    """
+    Identifier of the ERA5 request covering a location (also the job file
+    name): grid cell + date range, see era5_fetcher.era5_cell_key.
+    """
+    return era5_cell_key(lat, lon, start_date, end_date)
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _cds_job_id(result):
+    """Request ID of a submitted CDS job (legacy Result or datastores Remote)."""
+    reply = getattr(result, "reply", None)
+    if isinstance(reply, dict) and reply.get("request_id"):
+        return reply["request_id"]
+    return getattr(result, "request_id", None)
+
+
+def _resume_cds_result(client, job_id):
+    """Rebuild a pollable job handle from a persisted request ID."""
+    datastores_client = getattr(client, "client", None)
+    if datastores_client is not None and hasattr(datastores_client, "get_remote"):
+        return datastores_client.get_remote(job_id)
+    return cdsapi.api.Result(client, {"request_id": job_id, "state": "queued"})
+
+
+class Era5JobQueue:
+    """
+    Submit ERA5 timeseries requests without waiting and track them on disk.
+
+    Typical use (script.py):
+        queue = Era5JobQueue()
+        for site in sites:
+            queue.submit(lat, lon, start, end)
+        queue.start_polling()
+        ...  # per-site processing calls collect_era5_job(...)
+        queue.stop_polling()
+
+    client / resume_result can be injected (tests use a fake CDS client).
+    """
+
+    def __init__(
+        self,
+        jobs_dir=DEFAULT_JOBS_DIR,
+        client=None,
+        poll_interval_s=DEFAULT_POLL_INTERVAL_S,
+        resume_result=None,
+        max_poll_errors=MAX_CONSECUTIVE_POLL_ERRORS,
+        cell_cache_dir=ERA5_CELL_CACHE_DIR,
+    ):
+        self.jobs_dir = jobs_dir
+        self.cell_cache_dir = cell_cache_dir
+        self.poll_interval_s = poll_interval_s
+        self._client = client
+        self._resume_result = resume_result or _resume_cds_result
+        self.max_poll_errors = max_poll_errors
+        self._handles = {}
+        self._poll_errors = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = cdsapi.Client(wait_until_complete=False, delete=False)
+        return self._client
+
+    # ------------------------------------------------------------------
+    # Job files
+    # ------------------------------------------------------------------
+    def _job_path(self, key):
+        return os.path.join(self.jobs_dir, f"{key}.json")
+
+    def zip_path(self, key):
+        return os.path.join(self.jobs_dir, f"{key}.zip")
+
+    def cell_csv_path(self, key):
+        return era5_cell_csv_path(key, self.cell_cache_dir)
+
+    def load_job(self, key):
+        return load_era5_job(self.jobs_dir, key)
+
+    def _save_job(self, job):
+        path = self._job_path(job["key"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+    def submit(self, lat, lon, start_date, end_date):
+        """
+        Submit the request for the grid cell of one location unless a job
+        for that cell and period already exists on disk (failed jobs are
+        resubmitted). Returns the job key.
+        """
+        key = era5_job_key(lat, lon, start_date, end_date)
+        job = self.load_job(key)
+        if job is not None and job["state"] != STATE_FAILED:
+            return key
+
+        request = build_era5_cell_request(lat, lon, start_date, end_date)
+        try:
+            result = self.client.retrieve(ERA5_DATASET, request)
+        except Exception as e:
+            print(f"[ERA5] Job submission failed for {key}: {e}")
+            return key
+
+        job = {
+            "key": key,
+            "job_id": _cds_job_id(result),
+            "state": STATE_SUBMITTED,
+            "request": request,
+            "submitted_at": _now_iso(),
+        }
+        self._save_job(job)
+        with self._lock:
+            self._handles[key] = result
+        print(f"[ERA5] Job submitted for {key}: {job['job_id']}")
+        return key
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+    def poll_once(self):
+        """
+        Check every submitted job once; download finished ones.
+        A job failing to poll max_poll_errors times in a row is marked failed.
+        Returns the number of jobs still pending.
+        """
+        pending = 0
+        for name in sorted(os.listdir(self.jobs_dir)):
+            if not name.endswith(".json"):
+                continue
+            job = self.load_job(name[: -len(".json")])
+            if job is None or job["state"] != STATE_SUBMITTED:
+                continue
+
+            key = job["key"]
+            try:
+                with self._lock:
+                    handle = self._handles.get(key)
+                if handle is None:
+                    handle = self._resume_result(self.client, job["job_id"])
+                    with self._lock:
+                        self._handles[key] = handle
+
+                state = _cds_job_state(handle)
+                self._poll_errors.pop(key, None)
+                if state in _CDS_COMPLETED:
+                    handle.download(self.zip_path(key))
+                    job.update(state=STATE_DOWNLOADED, zip_path=self.zip_path(key))
+                    job["completed_at"] = _now_iso()
+                    self._save_job(job)
+                    print(f"[ERA5] Job {key} downloaded.")
+                elif state in _CDS_FAILED:
+                    job.update(state=STATE_FAILED, error=f"CDS state: {state}")
+                    self._save_job(job)
+                    print(f"[ERA5] Job {key} failed ({state}).")
+                else:
+                    pending += 1
+            except Exception as e:
+                errors = self._poll_errors.get(key, 0) + 1
+                self._poll_errors[key] = errors
+                print(f"[ERA5] Polling error for {key} ({errors}/{self.max_poll_errors}): {e}")
+                if errors >= self.max_poll_errors:
+                    job.update(state=STATE_FAILED, error=f"Polling failed: {e}")
+                    self._save_job(job)
+                    print(f"[ERA5] Job {key} marked failed after {errors} polling errors.")
+                else:
+                    pending += 1
+
+        return pending
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            if self.poll_once() == 0:
+                break
+            self._stop.wait(self.poll_interval_s)
+
+    def start_polling(self):
+        """Poll pending jobs in a background thread until all are done."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="era5-poller", daemon=True)
+        self._thread.start()
+
+    def stop_polling(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+
+def load_era5_job(jobs_dir, key):
+    """Read a persisted job record, or None."""
+    path = os.path.join(jobs_dir, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def wait_for_era5_zip(jobs_dir, key, timeout=DEFAULT_WAIT_TIMEOUT_S, check_interval_s=2.0):
+    """
+    Wait until the job's ZIP has been downloaded by the poller (possibly in
+    another process). Returns the ZIP path, or None if the job failed, does
+    not exist or the timeout (s) expired. timeout=None waits without limit.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        job = load_era5_job(jobs_dir, key)
+        if job is None or job["state"] == STATE_FAILED:
+            return None
+        if job["state"] == STATE_DOWNLOADED and os.path.exists(job["zip_path"]):
+            return job["zip_path"]
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(check_interval_s, remaining))
+        else:
+            time.sleep(check_interval_s)
+
+
+def collect_era5_job(
+    jobs_dir,
+    site_name,
+    site_folder,
+    lat,
+    lon,
+    start_date,
+    end_date,
+    mean_correction_factor=None,
+    gust_correction_factor=None,
+    timeout=DEFAULT_WAIT_TIMEOUT_S,
+    cell_cache_dir=ERA5_CELL_CACHE_DIR,
+):
+    """
+    Per-site counterpart of save_era5_data when requests were queued with
+    Era5JobQueue: wait for the site's ZIP and process it into
+    era5_{site_name}.csv / era5_daily_{site_name}.csv.
+
+    Falls back to the blocking save_era5_data when no job was submitted for
+    this request or the job failed. Returns None when the job is still not
+    downloaded after `timeout` seconds. A cell series already in
+    cell_cache_dir is used without waiting.
+    """
+    key = era5_job_key(lat, lon, start_date, end_date)
+    cell_csv = era5_cell_csv_path(key, cell_cache_dir)
+    if os.path.exists(cell_csv):
+        os.makedirs(site_folder, exist_ok=True)
+        return process_era5_zip(
+            site_name,
+            site_folder,
+            os.path.join(jobs_dir, f"{key}.zip"),
+            lat,
+            lon,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            remove_zip=False,
+            cell_csv=cell_csv,
+        )
+
+    job = load_era5_job(jobs_dir, key)
+    if job is None or job["state"] == STATE_FAILED:
+        print(f"[ERA5] No usable queued job for {site_name} - direct download.")
+        return save_era5_data(
+            site_name,
+            site_folder,
+            lat,
+            lon,
+            start_date,
+            end_date,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            cell_cache_dir=cell_cache_dir,
+        )
+
+    print(f"[ERA5] Waiting for queued job {key} ({site_name})...")
+    zip_path = wait_for_era5_zip(jobs_dir, key, timeout=timeout)
+    if zip_path is None:
+        print(f"[ERA5] Queued job {key} not available for {site_name} (failed or timed out).")
+        return None
+
+    os.makedirs(site_folder, exist_ok=True)
+    # Sites of the same cell decode the ZIP once
+    with era5_cell_lock(cell_csv, poll_s=1.0):
+        return process_era5_zip(
+            site_name,
+            site_folder,
+            zip_path,
+            lat,
+            lon,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            remove_zip=False,
+            cell_csv=cell_csv,
+        )
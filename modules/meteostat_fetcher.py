@@ -1,15 +1,140 @@
+import copy
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
 from geopy.distance import geodesic
 from meteostat import Stations, Hourly
 
+# Pipeline-managed Meteostat cache (instead of the library default under
+# the user's home), with explicit retention. Hourly files of past years do
+# not change, so they are kept for a month; the current year is still being
+# filled and is refreshed after a day (see fetch_meteostat_hourly). The
+# station list is kept for a week.
+METEOSTAT_CACHE_DIR = os.path.join("data", "cache", "meteostat")
+METEOSTAT_HOURLY_MAX_AGE_S = 30 * 24 * 3600
+METEOSTAT_RECENT_MAX_AGE_S = 24 * 3600
+METEOSTAT_STATIONS_MAX_AGE_S = 7 * 24 * 3600
+
+_recent_max_age_s = METEOSTAT_RECENT_MAX_AGE_S
+
+
+def configure_meteostat_cache(
+    cache_dir=METEOSTAT_CACHE_DIR,
+    hourly_max_age_s=METEOSTAT_HOURLY_MAX_AGE_S,
+    stations_max_age_s=METEOSTAT_STATIONS_MAX_AGE_S,
+    recent_max_age_s=METEOSTAT_RECENT_MAX_AGE_S,
+):
+    """
+    Point the Meteostat library cache (Hourly and Stations) to cache_dir
+    with the given maximum ages (seconds). Called explicitly by the entry
+    points (and by each site worker process), not at import.
+    """
+    global _recent_max_age_s
+    os.makedirs(cache_dir, exist_ok=True)
+    Hourly.cache_dir = cache_dir
+    Hourly.max_age = int(hourly_max_age_s)
+    Stations.cache_dir = cache_dir
+    Stations.max_age = int(stations_max_age_s)
+    _recent_max_age_s = int(recent_max_age_s)
+
+
+def fetch_meteostat_hourly(station_ids, start, end):
+    """
+    Meteostat Hourly data (UTC) of one or several stations. The part of the
+    period in the current year is fetched separately with the short recent
+    retention, so newly published hours are picked up; past years keep the
+    Hourly.max_age retention (max_age applies to every cached file of a
+    request).
+    """
+    this_year = datetime(datetime.now().year, 1, 1)
+    frames = []
+    if start < this_year:
+        past_end = min(end, this_year - timedelta(seconds=1))
+        frames.append(Hourly(station_ids, start, past_end, timezone="UTC").fetch())
+    if end >= this_year:
+        recent = type("RecentHourly", (Hourly,), {"max_age": _recent_max_age_s})
+        frames.append(recent(station_ids, max(start, this_year), end, timezone="UTC").fetch())
+
+    non_empty = [df for df in frames if not df.empty]
+    if len(non_empty) < 2:
+        return non_empty[0] if non_empty else frames[0]
+    return pd.concat(non_empty).sort_index()
+
+
+# Station metadata is memoized per site location (coordinates rounded to
+# STATION_CACHE_DECIMALS, ~100 m), shared by all calls in the process.
+STATION_CACHE_DECIMALS = 3
+# Stations searched when looking up the metadata of a given station ID
+STATION_LOOKUP_LIMIT = 10
+
+_station_cache = {}
+_station_cache_lock = threading.Lock()
+
+
+def _nearby_stations(lat, lon, limit):
+    """
+    Memoized list of station dicts (nearest first) for a location, at least
+    `limit` long when Meteostat has that many. A cached list is reused for
+    any smaller limit; a larger limit triggers one new query. At least
+    STATION_LOOKUP_LIMIT stations are fetched.
+    """
+    key = (round(float(lat), STATION_CACHE_DECIMALS), round(float(lon), STATION_CACHE_DECIMALS))
+    with _station_cache_lock:
+        cached = _station_cache.get(key)
+    if cached is not None and (cached["limit"] >= limit or cached["exhausted"]):
+        return cached["stations"][:limit]
+
+    # One query per site serves both the nearest stations and ID lookups
+    fetch_limit = max(limit, STATION_LOOKUP_LIMIT)
+    results = Stations().nearby(lat, lon).fetch(fetch_limit)
+    stations = []
+    for index, row in results.iterrows():
+        dist = geodesic((lat, lon), (row["latitude"], row["longitude"])).km
+        stations.append(
+            {
+                "id": index,
+                "name": row.get("name", ""),
+                "distance_km": round(dist, 2),
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "elevation": float(row["elevation"]) if not pd.isna(row.get("elevation")) else np.nan,
+                "timezone": row.get("timezone", "UTC"),
+            }
+        )
+
+    with _station_cache_lock:
+        _station_cache[key] = {
+            "limit": fetch_limit,
+            "exhausted": len(stations) < fetch_limit,
+            "stations": stations,
+        }
+    return stations[:limit]
+
+
+def clear_station_cache():
+    """Forget the memoized station metadata."""
+    with _station_cache_lock:
+        _station_cache.clear()
+
+
+def get_station_meta(lat, lon, station_id):
+    """
+    Metadata dict of a given station ID (as in get_nearest_stations_info),
+    looked up among the stations near the site; {} when not found.
+    """
+    for station in _nearby_stations(lat, lon, STATION_LOOKUP_LIMIT):
+        if station["id"] == station_id:
+            return copy.deepcopy(station)
+    return {}
+
 
 def get_nearest_stations_info(lat, lon, limit=2):
     """
     Return the closest Meteostat stations for a given site.
+    Results are memoized per rounded location (see _nearby_stations).
 
     Output structure:
         {
@@ -26,37 +151,122 @@ def get_nearest_stations_info(lat, lon, limit=2):
             ...
         }
     """
-    stations = Stations().nearby(lat, lon)
-    results = stations.fetch(limit)
+    stations = _nearby_stations(lat, lon, limit)
+    return {
+        f"station{i}": copy.deepcopy(station) for i, station in enumerate(stations, 1)
+    }
 
-    info = {}
-    for i, (index, row) in enumerate(results.iterrows(), 1):
-        dist = geodesic((lat, lon), (row["latitude"], row["longitude"])).km
-        info[f"station{i}"] = {
-            "id": index,
-            "name": row.get("name", ""),
-            "distance_km": round(dist, 2),
-            "latitude": float(row["latitude"]),
-            "longitude": float(row["longitude"]),
-            "elevation": float(row["elevation"]) if not pd.isna(row.get("elevation")) else np.nan,
-            "timezone": row.get("timezone", "UTC"),
+
+def _aggregate_meteostat_daily(df):
+    """
+    Daily aggregation of Meteostat hourly rows for any number of stations,
+    as one grouped operation on (station, date).
+
+    Expects columns station, time (UTC), wspd, wpgt, wdir (km/h, deg).
+    Returns one row per (station, date) with the standard daily columns.
+    """
+    dir_rad = np.deg2rad(df["wdir"].to_numpy(dtype=float))
+    work = pd.DataFrame(
+        {
+            "station": df["station"].to_numpy(),
+            "date": pd.to_datetime(df["time"], utc=True).dt.date.to_numpy(),
+            # Convert km/h to m/s
+            "wspd_ms": df["wspd"].to_numpy(dtype=float) / 3.6,
+            "wpgt_ms": df["wpgt"].to_numpy(dtype=float) / 3.6,
+            # Direction for vector mean
+            "dir_u": np.cos(dir_rad),
+            "dir_v": np.sin(dir_rad),
         }
-    return info
+    )
 
+    grouped = work.groupby(["station", "date"], sort=True)
+    daily = grouped.agg(
+        windspeed_mean=("wspd_ms", "max"),          # daily max of hourly means
+        windspeed_daily_avg=("wspd_ms", "mean"),    # daily average of hourly means
+        u_mean=("dir_u", "mean"),
+        v_mean=("dir_v", "mean"),
+        windspeed_gust=("wpgt_ms", "max"),          # daily max of hourly gusts
+    )
+    daily["n_hours"] = grouped.size()
 
-def _fetch_meteostat_daily_for_station(
-    station_id,
-    lat,
-    lon,
+    direction = np.rad2deg(np.arctan2(daily["v_mean"], daily["u_mean"]))
+    daily["wind_direction"] = (direction + 360.0) % 360.0
+
+    daily = daily.reset_index()
+    daily["time"] = pd.to_datetime(daily["date"])
+    return daily[
+        [
+            "station",
+            "time",
+            "windspeed_mean",
+            "windspeed_daily_avg",
+            "wind_direction",
+            "windspeed_gust",
+            "n_hours",
+        ]
+    ]
+
+
+def _finalize_meteostat_daily(
+    daily_df, station_id, mean_correction_factor=None, gust_correction_factor=None, station_meta=None
+):
+    """Correction factors and station metadata columns of one station."""
+    daily_df = daily_df.reset_index(drop=True)
+
+    # Optional correction on mean speeds
+    if mean_correction_factor is not None:
+        daily_df["windspeed_mean"] = (
+            daily_df["windspeed_mean"] * float(mean_correction_factor)
+        )
+        daily_df["windspeed_daily_avg"] = (
+            daily_df["windspeed_daily_avg"] * float(mean_correction_factor)
+        )
+        daily_df["mean_correction_factor"] = float(mean_correction_factor)
+    else:
+        daily_df["mean_correction_factor"] = 1.0
+
+    # Optional gust fallback factor (only for NaN gusts)
+    if gust_correction_factor is not None:
+        factor = float(gust_correction_factor)
+        mask_nan = daily_df["windspeed_gust"].isna()
+        if mask_nan.any():
+            print(
+                f"[Meteostat] Applying gust_correction_factor={factor} on days "
+                "without gusts (NaN) using windspeed_mean as fallback."
+            )
+            daily_df.loc[mask_nan, "windspeed_gust"] = (
+                daily_df.loc[mask_nan, "windspeed_mean"] * factor
+            )
+        daily_df["gust_correction_factor"] = factor
+    else:
+        daily_df["gust_correction_factor"] = 1.0
+
+    # Metadata
+    meta = station_meta or {}
+    daily_df["source"] = "meteostat"
+    daily_df["station_id"] = station_id
+    daily_df["station_name"] = meta.get("name", "")
+    daily_df["station_latitude"] = meta.get("latitude", np.nan)
+    daily_df["station_longitude"] = meta.get("longitude", np.nan)
+    daily_df["station_distance_km"] = meta.get("distance_km", np.nan)
+    daily_df["station_elevation"] = meta.get("elevation", np.nan)
+    daily_df["timezone"] = meta.get("timezone", "UTC")
+
+    return daily_df
+
+
+def fetch_meteostat_daily_multi(
+    station_ids,
     start_date,
     end_date,
     mean_correction_factor=None,
     gust_correction_factor=None,
-    station_meta=None,
+    station_metas=None,
 ):
     """
-    Download Meteostat hourly data for ONE station, aggregate by day,
-    and format to the standard schema for the stats engine.
+    Download Meteostat hourly data for SEVERAL stations in one Hourly
+    request, aggregate by (station, date) in one grouped operation, and
+    format each station to the standard schema for the stats engine.
 
     Using Meteostat Hourly (timezone=UTC) we expect:
         - wspd : hourly wind speed (km/h, mean over the hour)
@@ -82,103 +292,73 @@ def _fetch_meteostat_daily_for_station(
             * If gust_correction_factor is provided:
                 - do NOT change existing gusts (non-NaN),
                 - when windspeed_gust is NaN, fill fallback = gust_correction_factor * windspeed_mean.
+
+    station_metas maps station ID to its metadata dict.
+    Returns {station_id: daily DataFrame} (empty DataFrame without data).
     """
+    station_ids = list(dict.fromkeys(station_ids))
+    station_metas = station_metas or {}
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
 
-    # Hourly data (timezone=UTC for alignment)
-    data = Hourly(station_id, start, end, timezone="UTC")
-    df = data.fetch().reset_index()  # index 'time' to column 'time'
+    # Hourly data (timezone=UTC for alignment); several stations give a
+    # (station, time) index, a single one a time index.
+    df = fetch_meteostat_hourly(station_ids, start, end)
+    if "station" not in df.index.names:
+        df = df.assign(station=station_ids[0])
+    df = df.reset_index()
 
+    results = {station_id: pd.DataFrame() for station_id in station_ids}
     if df.empty:
-        print(f"No hourly data for Meteostat station {station_id}")
-        return pd.DataFrame()
+        print(f"No hourly data for Meteostat station(s) {station_ids}")
+        return results
 
     # Expected columns
     required_cols = {"time", "wspd", "wpgt", "wdir"}
     missing = required_cols - set(df.columns)
     if missing:
         raise ValueError(
-            f"Missing columns in Meteostat Hourly for station {station_id}: {missing}"
+            f"Missing columns in Meteostat Hourly for station(s) {station_ids}: {missing}"
         )
 
-    df["time"] = pd.to_datetime(df["time"], utc=True)
-
-    # Convert km/h to m/s
-    df["wspd_ms"] = df["wspd"].astype(float) / 3.6
-    df["wpgt_ms"] = df["wpgt"].astype(float) / 3.6
-
-    # Direction for vector mean
-    dir_rad = np.deg2rad(df["wdir"].astype(float))
-    df["dir_u"] = np.cos(dir_rad)
-    df["dir_v"] = np.sin(dir_rad)
-
-    # Daily grouping
-    df["date"] = df["time"].dt.date
-    grouped = df.groupby("date")
-
-    daily_speed_max = grouped["wspd_ms"].max()
-    daily_speed_avg = grouped["wspd_ms"].mean()
-    daily_gust_max = grouped["wpgt_ms"].max()
-
-    u_mean = grouped["dir_u"].mean()
-    v_mean = grouped["dir_v"].mean()
-    daily_direction = np.rad2deg(np.arctan2(v_mean, u_mean))
-    daily_direction = (daily_direction + 360.0) % 360.0
-
-    n_hours = grouped.size()
-
-    daily_df = pd.DataFrame(
-        {
-            "time": pd.to_datetime(daily_speed_max.index),
-            "windspeed_mean": daily_speed_max.values,          # daily max of hourly means
-            "windspeed_daily_avg": daily_speed_avg.values,     # daily average of hourly means
-            "wind_direction": daily_direction.values,
-            "windspeed_gust": daily_gust_max.values,           # daily max of hourly gusts
-            "n_hours": n_hours.values,
-        }
-    )
-
-    # Optional correction on mean speeds
-    if mean_correction_factor is not None:
-        daily_df["windspeed_mean"] = (
-            daily_df["windspeed_mean"] * float(mean_correction_factor)
-        )
-        daily_df["windspeed_daily_avg"] = (
-            daily_df["windspeed_daily_avg"] * float(mean_correction_factor)
+    daily = _aggregate_meteostat_daily(df)
+    for station_id, station_daily in daily.groupby("station", sort=False):
+        results[station_id] = _finalize_meteostat_daily(
+            station_daily.drop(columns="station"),
+            station_id,
+            mean_correction_factor=mean_correction_factor,
+            gust_correction_factor=gust_correction_factor,
+            station_meta=station_metas.get(station_id),
         )
-        daily_df["mean_correction_factor"] = float(mean_correction_factor)
-    else:
-        daily_df["mean_correction_factor"] = 1.0
 
-    # Optional gust fallback factor (only for NaN gusts)
-    if gust_correction_factor is not None:
-        factor = float(gust_correction_factor)
-        mask_nan = daily_df["windspeed_gust"].isna()
-        if mask_nan.any():
-            print(
-                f"[Meteostat] Applying gust_correction_factor={factor} on days "
-                "without gusts (NaN) using windspeed_mean as fallback."
-            )
-            daily_df.loc[mask_nan, "windspeed_gust"] = (
-                daily_df.loc[mask_nan, "windspeed_mean"] * factor
-            )
-        daily_df["gust_correction_factor"] = factor
-    else:
-        daily_df["gust_correction_factor"] = 1.0
+    for station_id, daily_df in results.items():
+        if daily_df.empty:
+            print(f"No hourly data for Meteostat station {station_id}")
+    return results
 
-    # Metadata
-    meta = station_meta or {}
-    daily_df["source"] = "meteostat"
-    daily_df["station_id"] = station_id
-    daily_df["station_name"] = meta.get("name", "")
-    daily_df["station_latitude"] = meta.get("latitude", np.nan)
-    daily_df["station_longitude"] = meta.get("longitude", np.nan)
-    daily_df["station_distance_km"] = meta.get("distance_km", np.nan)
-    daily_df["station_elevation"] = meta.get("elevation", np.nan)
-    daily_df["timezone"] = meta.get("timezone", "UTC")
 
-    return daily_df
+def _fetch_meteostat_daily_for_station(
+    station_id,
+    lat,
+    lon,
+    start_date,
+    end_date,
+    mean_correction_factor=None,
+    gust_correction_factor=None,
+    station_meta=None,
+):
+    """
+    Download Meteostat hourly data for ONE station, aggregate by day,
+    and format to the standard schema (see fetch_meteostat_daily_multi).
+    """
+    return fetch_meteostat_daily_multi(
+        [station_id],
+        start_date,
+        end_date,
+        mean_correction_factor=mean_correction_factor,
+        gust_correction_factor=gust_correction_factor,
+        station_metas={station_id: station_meta},
+    )[station_id]
 
 
 def fetch_meteostat_data(
@@ -191,30 +371,39 @@ def fetch_meteostat_data(
     station_ids=None,
     mean_correction_factor=None,
     gust_correction_factor=None,
+    ranks=None,
 ):
     """
-    High-level wrapper to fetch Meteostat for one or two stations.
+    High-level wrapper to fetch Meteostat for one or two stations, with a
+    single Hourly request for all of them (fetch_meteostat_daily_multi).
+
+    ranks gives the output rank of each station ID (default 1, 2, ...), so
+    a single call for station 2 writes meteostat2_{site_name}.csv.
+    Station metadata is looked up by ID (memoized, see get_station_meta).
 
     Returns a dict with keys meteostat1 / meteostat2 when available.
     """
     if station_ids is None:
         station_ids = []
+    if ranks is None:
+        ranks = range(1, len(station_ids) + 1)
+
+    selected = [(i, sid) for i, sid in zip(ranks, station_ids) if sid][:2]
+    if not selected:
+        return {}
+
+    daily_by_station = fetch_meteostat_daily_multi(
+        [sid for _, sid in selected],
+        start_date,
+        end_date,
+        mean_correction_factor=mean_correction_factor,
+        gust_correction_factor=gust_correction_factor,
+        station_metas={sid: get_station_meta(lat, lon, sid) for _, sid in selected},
+    )
 
     data = {}
-    station_meta = get_nearest_stations_info(lat, lon, limit=max(2, len(station_ids)))
-
-    for i, station_id in enumerate(station_ids[:2], 1):
-        meta = station_meta.get(f"station{i}", {})
-        daily_df = _fetch_meteostat_daily_for_station(
-            station_id=station_id,
-            lat=lat,
-            lon=lon,
-            start_date=start_date,
-            end_date=end_date,
-            mean_correction_factor=mean_correction_factor,
-            gust_correction_factor=gust_correction_factor,
-            station_meta=meta,
-        )
+    for i, station_id in selected:
+        daily_df = daily_by_station[station_id]
         # Save CSV
         filename = f"meteostat{i}_{site_name}.csv"
         filepath = os.path.join(site_folder, filename)
@@ -6,8 +6,11 @@ import requests
 import pandas as pd
 import numpy as np
 
+from modules.utils import json_float_array, loads_json
+
 # NASA POWER daily data (UTC/LST) available starting 1981-01-01.
 NASA_POWER_START_DATE = datetime(1981, 1, 1)
+NASA_POWER_TIMEOUT_S = 60
 
 
 def _to_datetime(dt: Union[str, datetime]) -> datetime:
@@ -62,6 +65,7 @@ def fetch_nasa_power_data(
     end_date: Union[str, datetime],
     mean_correction_factor: Optional[float] = None,
     gust_correction_factor: Optional[float] = None,
+    timeout: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Fetch NASA POWER (Daily API, RE community) 10 m wind data and return
@@ -84,6 +88,9 @@ def fetch_nasa_power_data(
       - n_hours              = 24 for days covered by NASA POWER.
 
     If start_date < 1981-01-01, prefix with empty rows up to 1980-12-31.
+
+    timeout (s) caps the HTTP timeout (60 s by default); requests.Timeout
+    is raised when it expires.
     """
     os.makedirs(site_folder, exist_ok=True)
 
@@ -120,45 +127,48 @@ def fetch_nasa_power_data(
     )
 
     print(f"Calling NASA POWER API (Daily, 10 m) for {site_name}...")
-    response = requests.get(url, timeout=60)
+    http_timeout = NASA_POWER_TIMEOUT_S if timeout is None else min(NASA_POWER_TIMEOUT_S, timeout)
+    response = requests.get(url, timeout=http_timeout)
 
     if response.status_code != 200:
         raise RuntimeError(
             f"NASA POWER API error: {response.status_code} - {response.text}"
         )
 
-    data = response.json()
+    data = loads_json(response.content)
     param = data["properties"]["parameter"]
 
     if "WS10M" not in param:
         raise KeyError("WS10M missing in NASA POWER response.")
 
-    dates_str = list(param["WS10M"].keys())
-    dates_dt = pd.to_datetime(dates_str)
+    # Each parameter is a {YYYYMMDD: value} dict; values go straight into
+    # float64 arrays, dates are parsed with an explicit format.
+    dates_dt = pd.to_datetime(list(param["WS10M"]), format="%Y%m%d")
+    n_days = len(dates_dt)
 
-    ws10m = list(param["WS10M"].values())
+    ws10m = json_float_array(param["WS10M"])
 
     if "WS10M_MAX" in param:
-        ws10m_max = list(param["WS10M_MAX"].values())
+        ws10m_max = json_float_array(param["WS10M_MAX"])
     else:
         print("WS10M_MAX missing in NASA POWER response, falling back to WS10M.")
         ws10m_max = ws10m
 
     if "WD10M" in param:
-        wd10m = list(param["WD10M"].values())
+        wd10m = json_float_array(param["WD10M"])
     else:
         print("WD10M missing in NASA POWER response, wind_direction set to NaN.")
-        wd10m = [np.nan] * len(dates_dt)
+        wd10m = np.full(n_days, np.nan)
 
     if "U10M" in param:
-        u10m = list(param["U10M"].values())
+        u10m = json_float_array(param["U10M"])
     else:
-        u10m = [np.nan] * len(dates_dt)
+        u10m = np.full(n_days, np.nan)
 
     if "V10M" in param:
-        v10m = list(param["V10M"].values())
+        v10m = json_float_array(param["V10M"])
     else:
-        v10m = [np.nan] * len(dates_dt)
+        v10m = np.full(n_days, np.nan)
 
     df_nasa = pd.DataFrame(
         {
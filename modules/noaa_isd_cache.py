@@ -0,0 +1,196 @@
+# noaa_isd_cache.py
+#
+# On-disk content cache for NOAA ISD yearly files, shared across sites and
+# runs. One entry per (dataset, year, file name), e.g.
+#   data/cache/noaa_isd/global-hourly/2015/07579099999.csv
+#   data/cache/noaa_isd/global-hourly/2015/07579099999.csv.json  (metadata)
+#
+# - Closed years are immutable once fetched after a grace period.
+# - Recent years are revalidated with conditional requests (ETag /
+#   Last-Modified) by the fetcher.
+# - Total size is bounded with least-recently-used eviction.
+# - Files that do not exist (404) for closed years are remembered with a
+#   small marker file (negative cache) and never requested again, e.g.
+#   data/cache/noaa_isd/global-hourly/1995/07579099999.csv.missing
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_CACHE_DIR = os.path.join("data", "cache", "noaa_isd")
+DEFAULT_MAX_CACHE_BYTES = 5 * 1024 ** 3
+
+# NOAA keeps appending late reports for a while after a year closes.
+IMMUTABLE_GRACE = timedelta(days=60)
+
+_META_SUFFIX = ".json"
+_MISSING_SUFFIX = ".missing"
+
+
+def _entry_path(cache_dir, dataset, year, filename):
+    return os.path.join(cache_dir, dataset, str(year), filename)
+
+
+def _atomic_write(path, data, mode="wb"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def is_immutable(year, fetched_at):
+    """
+    True when a file for `year` fetched at `fetched_at` (aware datetime) can
+    no longer change: the year is closed and the grace period has passed.
+    """
+    year_end = datetime(int(year) + 1, 1, 1, tzinfo=timezone.utc)
+    return fetched_at >= year_end + IMMUTABLE_GRACE
+
+
+def lookup(cache_dir, dataset, year, filename):
+    """
+    Return the cache entry as a dict, or None when absent / unreadable:
+        {
+            "path": str,
+            "etag": str | None,
+            "last_modified": str | None,
+            "fetched_at": datetime,
+            "immutable": bool,
+        }
+    """
+    path = _entry_path(cache_dir, dataset, year, filename)
+    meta_path = path + _META_SUFFIX
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        return None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        fetched_at = datetime.fromisoformat(meta["fetched_at"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return {
+        "path": path,
+        "etag": meta.get("etag"),
+        "last_modified": meta.get("last_modified"),
+        "fetched_at": fetched_at,
+        "immutable": is_immutable(year, fetched_at),
+    }
+
+
+def read(entry):
+    """Read the cached bytes of an entry and mark it as recently used."""
+    with open(entry["path"], "rb") as f:
+        content = f.read()
+    touch(entry)
+    return content
+
+
+def touch(entry):
+    """Update the entry's mtime, used as the LRU clock."""
+    try:
+        os.utime(entry["path"])
+    except OSError:
+        pass
+
+
+def conditional_headers(entry):
+    """HTTP validators for revalidating a cached entry."""
+    headers = {}
+    if entry is None:
+        return headers
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def store(cache_dir, dataset, year, filename, content, etag=None, last_modified=None):
+    """Write file bytes and their metadata to the cache."""
+    path = _entry_path(cache_dir, dataset, year, filename)
+    meta = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "size": len(content),
+    }
+    _atomic_write(path, content)
+    _atomic_write(path + _META_SUFFIX, json.dumps(meta), mode="w")
+    try:
+        os.remove(path + _MISSING_SUFFIX)
+    except OSError:
+        pass
+
+
+def mark_revalidated(entry, etag=None, last_modified=None):
+    """
+    Record a successful revalidation (304 Not Modified): fetched_at becomes
+    now, so a closed year turns immutable once the grace period has passed
+    instead of being revalidated on every run. The validators are kept
+    unless the server sent new ones.
+    """
+    meta = {
+        "etag": etag or entry.get("etag"),
+        "last_modified": last_modified or entry.get("last_modified"),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "size": os.path.getsize(entry["path"]),
+    }
+    _atomic_write(entry["path"] + _META_SUFFIX, json.dumps(meta), mode="w")
+
+
+def is_missing(cache_dir, dataset, year, filename):
+    """True when the file is known not to exist on the server (negative cache)."""
+    return os.path.exists(_entry_path(cache_dir, dataset, year, filename) + _MISSING_SUFFIX)
+
+
+def store_missing(cache_dir, dataset, year, filename):
+    """
+    Remember that a file does not exist (404). Only closed years past the
+    grace period are recorded: files of recent years may still appear.
+    Returns True when the marker was written.
+    """
+    now = datetime.now(timezone.utc)
+    if not is_immutable(year, now):
+        return False
+    path = _entry_path(cache_dir, dataset, year, filename) + _MISSING_SUFFIX
+    _atomic_write(path, json.dumps({"checked_at": now.isoformat()}), mode="w")
+    return True
+
+
+def evict_lru(cache_dir, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Delete least-recently-used entries until the cache holds at most
+    max_bytes of data. Returns the number of evicted entries.
+    """
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith((_META_SUFFIX, _MISSING_SUFFIX, ".tmp")):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    evicted = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        for p in (path, path + _META_SUFFIX):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        total -= size
+        evicted += 1
+
+    return evicted
@@ -1,10 +1,310 @@
 # noaa_isd_fetcher.py
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
 import pandas as pd
 import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from modules import noaa_isd_cache
+from modules.noaa_isd_parser import (
+    apply_isd_quality_filter,
+    canonicalize_hourly,
+    read_isd_global_hourly,
+    read_isd_lite,
+    summarize_qc_table,
+)
+
+ISD_GLOBAL_HOURLY_URL = "https://www.ncei.noaa.gov/data/global-hourly/access"
+GLOBAL_HOURLY_DATASET = "global-hourly"
+
+ISD_LITE_URL = "https://www.ncei.noaa.gov/pub/data/noaa/isd-lite"
+ISD_LITE_DATASET = "isd-lite"
+
+# Yearly file layouts per backend (the backend name is also the cache dataset)
+ISD_BACKENDS = {
+    GLOBAL_HOURLY_DATASET: {
+        "base_url": ISD_GLOBAL_HOURLY_URL,
+        "filename": "{usaf}{wban}.csv",
+        "reader": read_isd_global_hourly,
+    },
+    ISD_LITE_DATASET: {
+        "base_url": ISD_LITE_URL,
+        "filename": "{usaf}-{wban}-{year}.gz",
+        "reader": read_isd_lite,
+    },
+}
+
+# Concurrent downloads: worker threads per call, and a process-wide cap on
+# simultaneous connections to one host (shared by all calls / stations).
+DEFAULT_MAX_WORKERS = 4
+MAX_CONNECTIONS_PER_HOST = 4
+HTTP_TIMEOUT_S = 60
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _host_semaphore(url):
+    """Return the shared semaphore limiting concurrent requests to url's host."""
+    host = urlsplit(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
+def _make_session(pool_size):
+    """requests.Session with a keep-alive connection pool sized for the workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _download_isd_year(session, url, cache_dir=None, dataset=None, year=None):
+    """
+    Download one yearly ISD file. Returns the raw bytes, or None when the
+    file does not exist (404). Other HTTP / network errors are raised.
+
+    With cache_dir, the file goes through the shared raw-file cache
+    (noaa_isd_cache): immutable entries are served without any request,
+    other entries are revalidated with a conditional GET, and files known
+    to be missing for closed years (negative cache) are not requested again.
+    An entry evicted between its lookup and its read (evict_lru in another
+    worker) is downloaded again.
+    """
+    entry = None
+    if cache_dir:
+        filename = url.rsplit("/", 1)[-1]
+        if noaa_isd_cache.is_missing(cache_dir, dataset, year, filename):
+            return None
+        entry = noaa_isd_cache.lookup(cache_dir, dataset, year, filename)
+        if entry is not None and entry["immutable"]:
+            try:
+                return noaa_isd_cache.read(entry)
+            except OSError:
+                entry = None
+
+    with _host_semaphore(url):
+        response = session.get(
+            url,
+            headers=noaa_isd_cache.conditional_headers(entry),
+            timeout=HTTP_TIMEOUT_S,
+        )
+    if response.status_code == 304 and entry is not None:
+        try:
+            noaa_isd_cache.mark_revalidated(
+                entry,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return noaa_isd_cache.read(entry)
+        except OSError:
+            # Evicted meanwhile: the 304 has no body, fetch the file in full
+            with _host_semaphore(url):
+                response = session.get(url, timeout=HTTP_TIMEOUT_S)
+    if response.status_code == 404:
+        if cache_dir:
+            noaa_isd_cache.store_missing(cache_dir, dataset, year, filename)
+        return None
+    response.raise_for_status()
+
+    if cache_dir:
+        noaa_isd_cache.store(
+            cache_dir,
+            dataset,
+            year,
+            filename,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return response.content
+
+
+def _parse_isd_year(
+    content, usaf, wban, year, verbose=False, reader=read_isd_global_hourly, canonical=True
+):
+    """
+    Parse one yearly ISD file (bytes) into the hourly frame used for
+    aggregation: time, date, wind_speed, windspeed_gust, wind_direction.
+
+    Decoding is done by the backend reader of noaa_isd_parser
+    (read_isd_global_hourly: needed columns only, fixed-width WND decoding;
+    read_isd_lite: fixed-width ISD-Lite lines), then the QC stage
+    apply_isd_quality_filter drops values by ISD quality code and range.
+    With canonical=True, canonicalize_hourly then keeps one observation per
+    hour it falls in (routine reports first, nearest to a whole hour;
+    gusts = hourly max).
+
+    Returns (hourly, qc_table), or None when the file lacks DATE / WND.
+    """
+    df = reader(content)
+    if df is None:
+        if verbose:
+            print(
+                f"Missing 'DATE' or 'WND' columns for {usaf}-{wban} in {year}"
+            )
+        return None
+
+    df, qc_table = apply_isd_quality_filter(df)
+    if canonical:
+        df = canonicalize_hourly(df)
+    df["date"] = df["time"].dt.date
+
+    # Gusts: GUST column in m/s (NaN when absent)
+    df["windspeed_gust"] = df["gust_raw"].mask(
+        (df["gust_raw"] > 150) | (df["gust_raw"] < 0)
+    )
+
+    # Direction: DRCT takes precedence when present, otherwise WND direction
+    df["wind_direction"] = df["drct_raw"].where(df["drct_raw"].notna(), df["wind_dir"])
+
+    # Filter invalid directions (999, <0, >360)
+    df["wind_direction"] = df["wind_direction"].mask(
+        (df["wind_direction"] > 360)
+        | (df["wind_direction"] < 0)
+        | (df["wind_direction"] == 999)
+    )
+
+    # Keep only columns needed for aggregation
+    hourly = df[["time", "date", "wind_speed", "windspeed_gust", "wind_direction"]].copy()
+    return hourly, qc_table
+
+
+# Mergeable per-day partial aggregates (combined with max or sum)
+_PARTIAL_MAX = ["speed_max", "gust_max"]
+_PARTIAL_SUM = ["speed_sum", "n_hours", "dir_u_sum", "dir_v_sum", "n_dir"]
+
+
+def _daily_partials(hourly):
+    """
+    Reduce hourly rows to per-day partial aggregates that can be merged
+    across chunks (years) and finalized by _daily_from_partials.
+    Only hours with a valid speed are used, as in the daily aggregation.
+    """
+    df = hourly.dropna(subset=["wind_speed"])
+    dates = pd.to_datetime(df["date"])
+
+    rad = np.deg2rad(df["wind_direction"].to_numpy(dtype=float))
+    has_dir = ~np.isnan(rad)
+    work = pd.DataFrame(
+        {
+            "date": dates.to_numpy(),
+            "speed": df["wind_speed"].to_numpy(dtype=float),
+            "gust": df["windspeed_gust"].to_numpy(dtype=float),
+            "dir_u": np.where(has_dir, np.cos(rad), 0.0),
+            "dir_v": np.where(has_dir, np.sin(rad), 0.0),
+            "has_dir": has_dir.astype(np.int64),
+        }
+    )
+
+    grouped = work.groupby("date", sort=True)
+    return pd.DataFrame(
+        {
+            "speed_max": grouped["speed"].max(),
+            "gust_max": grouped["gust"].max(),
+            "speed_sum": grouped["speed"].sum(),
+            "n_hours": grouped.size(),
+            "dir_u_sum": grouped["dir_u"].sum(),
+            "dir_v_sum": grouped["dir_v"].sum(),
+            "n_dir": grouped["has_dir"].sum(),
+        }
+    )
+
+
+def _merge_daily_partials(partials):
+    """Merge partial aggregates of several chunks (same day in >1 chunk ok)."""
+    merged = pd.concat(partials)
+    if merged.index.is_unique:
+        return merged.sort_index()
+    grouped = merged.groupby(level=0, sort=True)
+    return pd.concat(
+        [grouped[_PARTIAL_MAX].max(), grouped[_PARTIAL_SUM].sum()], axis=1
+    )
+
+
+def _daily_from_partials(partials):
+    """
+    Finalize merged partials into the standard daily columns:
+    time, windspeed_mean (max), windspeed_daily_avg, wind_direction
+    (vector mean of valid directions), windspeed_gust (max), n_hours.
+    """
+    n_dir = partials["n_dir"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        u_mean = partials["dir_u_sum"].to_numpy() / n_dir
+        v_mean = partials["dir_v_sum"].to_numpy() / n_dir
+    dir_deg = (np.rad2deg(np.arctan2(v_mean, u_mean)) + 360.0) % 360.0
+    dir_deg = np.where(n_dir > 0, dir_deg, np.nan)
+
+    return pd.DataFrame(
+        {
+            "time": pd.to_datetime(partials.index),
+            "windspeed_mean": partials["speed_max"].to_numpy(),
+            "windspeed_daily_avg": partials["speed_sum"].to_numpy() / partials["n_hours"].to_numpy(),
+            "wind_direction": dir_deg,
+            "windspeed_gust": partials["gust_max"].to_numpy(),
+            "n_hours": partials["n_hours"].to_numpy(),
+        }
+    )
+
+
+def _fetch_isd_year(
+    session,
+    base_url,
+    year,
+    usaf,
+    wban,
+    verbose=False,
+    cache_dir=None,
+    streaming=False,
+    backend=GLOBAL_HOURLY_DATASET,
+    canonical=True,
+):
+    """
+    Download and parse one station-year (runs inside a worker thread, so
+    parsing overlaps with the other downloads).
+
+    With streaming=True the hourly rows are reduced to daily partial
+    aggregates inside the worker and never returned.
+    """
+    layout = ISD_BACKENDS[backend]
+    filename = layout["filename"].format(usaf=usaf, wban=wban, year=year)
+    file_url = f"{base_url}/{year}/{filename}"
+    if verbose:
+        print(f"  -> {year} : {file_url}")
+
+    content = _download_isd_year(
+        session, file_url, cache_dir=cache_dir, dataset=backend, year=year
+    )
+    if content is None:
+        if verbose:
+            print(f"No file for {usaf}-{wban} {year} (404)")
+        return None
+
+    parsed = _parse_isd_year(
+        content,
+        usaf,
+        wban,
+        year,
+        verbose=verbose,
+        reader=layout["reader"],
+        canonical=canonical,
+    )
+    del content
+    if parsed is None or not streaming:
+        return parsed
+
+    hourly, qc_table = parsed
+    return _daily_partials(hourly), qc_table
+
 
 def fetch_isd_series(
     usaf,
@@ -18,10 +318,21 @@ def fetch_isd_series(
     gust_correction_factor=None,
     mean_correction_factor=None,
     station_metadata=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    base_url=None,
+    cache_dir=None,
+    cache_max_bytes=noaa_isd_cache.DEFAULT_MAX_CACHE_BYTES,
+    streaming=False,
+    save=True,
+    merge_qc=False,
+    backend=GLOBAL_HOURLY_DATASET,
+    save_hourly=False,
+    return_hourly=False,
+    canonical_hourly=True,
 ):
     """
-    Download NOAA ISD (Global Hourly CSV) hourly data and aggregate to daily
-    with the standardized columns used by the analysis.
+    Download NOAA ISD hourly data (Global Hourly CSV or ISD-Lite) and
+    aggregate to daily with the standardized columns used by the analysis.
 
     Technical references:
     - DATE/time: observation time in UTC.
@@ -29,14 +340,56 @@ def fetch_isd_series(
       so speed_m/s = value / 10.
 
     Assumptions and conventions:
-    - CSV files read from:
-      https://www.ncei.noaa.gov/data/global-hourly/access/{year}/{usaf}{wban}.csv
-    - Columns used:
+    - backend selects the yearly files (base_url defaults to the backend's):
+        * "global-hourly" (default), ISD_GLOBAL_HOURLY_URL:
+          https://www.ncei.noaa.gov/data/global-hourly/access/{year}/{usaf}{wban}.csv
+        * "isd-lite", ISD_LITE_URL: fixed-width gzip files, a fraction of
+          the Global Hourly size, with values already quality-controlled
+          by NOAA and one report per hour (no GUST / DRCT, so gusts are
+          NaN unless gust_correction_factor is given):
+          https://www.ncei.noaa.gov/pub/data/noaa/isd-lite/{year}/{usaf}-{wban}-{year}.gz
+    - Years are downloaded concurrently by up to max_workers threads over a
+      shared keep-alive session (max_workers=1 downloads serially). Each
+      worker parses its file as soon as it arrives.
+    - cache_dir (e.g. noaa_isd_cache.DEFAULT_CACHE_DIR) enables the shared
+      raw-file cache keyed by (year, usaf, wban): closed years are reused
+      without network access, the others are revalidated (ETag /
+      Last-Modified). The cache is trimmed to cache_max_bytes (LRU).
+    - Global Hourly columns used (only these are read from the CSV):
         * DATE : timestamp (UTC)
-        * WND  : raw direction + wind speed (tenths of m/s)
+        * WND  : packed direction + speed (tenths of m/s) + quality codes;
+                 values flagged suspect/erroneous (QC 2, 3, 6, 7) or out of
+                 range are dropped; per-year rejected counts by flag are saved
+                 to qc_noaa_station{rank}_{site_name}.csv
         * GUST : gust (tenths of m/s) when present
         * DRCT : wind direction (deg) when present
+    - ISD-Lite fields used: date/hour, wind direction, wind speed (tenths
+      of m/s); only the range checks apply (no quality codes).
+    - canonical_hourly=True (default) reduces each hour to one observation
+      before aggregation (noaa_isd_parser.canonicalize_hourly): routine
+      METAR/SYNOP reports (FM-15/FM-12) over specials (FM-16) and others,
+      then nearest to a whole hour, within the (floored) hour of the
+      report; gusts keep the hourly maximum. Daily max
+      and n_hours are then comparable across stations.
     - Always convert speeds to m/s.
+    - Outputs, from a single pass over the parsed years:
+        * daily series, saved to noaa_station{rank}_{site_name}.csv unless
+          save=False (update_isd_series merges and writes it itself);
+        * with save_hourly=True, the hourly archive (time, date, wind_speed,
+          windspeed_gust, wind_direction, sorted by time) saved next to it
+          as raw_noaa_station{rank}_{site_name}.csv;
+        * return_hourly=True returns (daily_df, hourly_df) instead of
+          daily_df; return_raw=True returns the hourly frame only.
+    - merge_qc=True keeps the rows of an existing QC file for the years
+      that were not fetched (incremental updates).
+
+    Memory:
+    - streaming=False keeps all parsed hourly rows until the end (required
+      for return_raw, save_hourly and return_hourly).
+    - streaming=True reduces each year, as soon as it is parsed, to daily
+      partial aggregates (max, sum, count, u/v sums) and drops its hourly
+      rows, so peak memory no longer grows with the number of years. The
+      daily output is identical.
 
     Daily aggregates produced:
         * time                : date (UTC, naive)
@@ -71,127 +424,99 @@ def fetch_isd_series(
             ...
         }
     """
-    base_url = "https://www.ncei.noaa.gov/data/global-hourly/access"
-    all_data = []
-
     if station_rank:
         print(
             f"Downloading NOAA ISD data for station {station_rank} ({usaf}-{wban})"
         )
 
-    years = list(years)
-    print(f"Downloading NOAA files {usaf}-{wban} across {len(years)} year(s)...")
-
-    for i, year in enumerate(tqdm(years, desc=f"{usaf}-{wban}", ncols=80), 1):
-        file_url = f"{base_url}/{year}/{usaf}{wban}.csv"
-        if verbose:
-            print(f"  -> {i}/{len(years)} : {file_url}")
-
-        try:
-            df = pd.read_csv(file_url)
-        except Exception as e:
-            if verbose:
-                print(f"Error for {usaf}-{wban} {year}: {e}")
-            continue
-
-        if "DATE" not in df.columns or "WND" not in df.columns:
-            if verbose:
-                print(
-                    f"Missing 'DATE' or 'WND' columns for {usaf}-{wban} in {year}"
-                )
-            continue
-
-        # DATE to datetime (UTC) per ISD docs
-        df["DATE"] = pd.to_datetime(df["DATE"], errors="coerce", utc=True)
-        df = df.dropna(subset=["DATE"])
-        df["date"] = df["DATE"].dt.date
-
-        # Parse WND column: "dir,dir_qc,speed,speed_qc,type"
-        parsed = df["WND"].astype(str).str.split(",", expand=True)
-        df["wind_dir_raw"] = pd.to_numeric(parsed[0], errors="coerce")
-
-        # Speed in tenths of m/s -> m/s
-        df["wind_speed"] = pd.to_numeric(parsed[3], errors="coerce") / 10.0
-        # Filter outliers
-        df["wind_speed"] = df["wind_speed"].mask(
-            (df["wind_speed"] > 100) | (df["wind_speed"] < 0)
+    keep_hourly = return_raw or save_hourly or return_hourly
+    if streaming and keep_hourly:
+        raise ValueError(
+            "return_raw / save_hourly / return_hourly need the hourly rows; use streaming=False."
         )
+    if backend not in ISD_BACKENDS:
+        raise ValueError(f"Unknown ISD backend: {backend} (expected one of {list(ISD_BACKENDS)})")
+    if base_url is None:
+        base_url = ISD_BACKENDS[backend]["base_url"]
 
-        # Gusts: GUST column in tenths of m/s
-        if "GUST" in df.columns:
-            df["windspeed_gust"] = pd.to_numeric(df["GUST"], errors="coerce") / 10.0
-            df["windspeed_gust"] = df["windspeed_gust"].mask(
-                (df["windspeed_gust"] > 150) | (df["windspeed_gust"] < 0)
-            )
-        else:
-            df["windspeed_gust"] = np.nan
-
-        # Direction: DRCT takes precedence, otherwise raw WND direction
-        if "DRCT" in df.columns:
-            df["wind_direction"] = pd.to_numeric(df["DRCT"], errors="coerce")
-        else:
-            df["wind_direction"] = df["wind_dir_raw"]
-
-        # Filter invalid directions (999, <0, >360)
-        df["wind_direction"] = df["wind_direction"].mask(
-            (df["wind_direction"] > 360)
-            | (df["wind_direction"] < 0)
-            | (df["wind_direction"] == 999)
-        )
+    years = list(years)
+    print(f"Downloading NOAA files {usaf}-{wban} across {len(years)} year(s)...")
 
-        # Keep only columns needed for aggregation
-        subset = df[["DATE", "date", "wind_speed", "windspeed_gust", "wind_direction"]].copy()
-        subset = subset.rename(columns={"DATE": "time"})
-        all_data.append(subset)
+    max_workers = max(1, min(int(max_workers), len(years) or 1))
+    yearly = {}
+    with _make_session(max_workers) as session, ThreadPoolExecutor(max_workers) as pool:
+        futures = {
+            pool.submit(
+                _fetch_isd_year,
+                session,
+                base_url,
+                year,
+                usaf,
+                wban,
+                verbose,
+                cache_dir,
+                streaming,
+                backend,
+                canonical_hourly,
+            ): year
+            for year in years
+        }
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc=f"{usaf}-{wban}", ncols=80
+        ):
+            year = futures.pop(future)
+            try:
+                parsed = future.result()
+            except Exception as e:
+                if verbose:
+                    print(f"Error for {usaf}-{wban} {year}: {e}")
+                continue
+            if parsed is not None:
+                yearly[year] = parsed
+
+    if cache_dir:
+        noaa_isd_cache.evict_lru(cache_dir, cache_max_bytes)
+
+    all_data = [yearly[year][0] for year in sorted(yearly)]
 
     if not all_data:
         print(f"No data retrieved for station {usaf}-{wban}.")
         return None
 
-    # Merge years
-    full_df = pd.concat(all_data, ignore_index=True)
-
-    if return_raw:
-        full_df = full_df.sort_values("time").reset_index(drop=True)
-        return full_df
+    # Per-year QC rejection counts, saved next to the station CSV
+    rank = station_rank if station_rank is not None else "X"
+    qc_table = summarize_qc_table(
+        pd.concat([yearly[year][1] for year in sorted(yearly)], ignore_index=True)
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    qc_csv = os.path.join(output_dir, f"qc_noaa_station{rank}_{site_name}.csv")
+    if merge_qc and os.path.exists(qc_csv):
+        previous = pd.read_csv(qc_csv)
+        previous = previous[~previous["year"].isin(qc_table["year"])]
+        qc_table = summarize_qc_table(pd.concat([previous, qc_table], ignore_index=True))
+    qc_table.to_csv(qc_csv, index=False)
+    if verbose:
+        print(f"NOAA ISD QC summary saved to {qc_csv}")
 
-    # Daily aggregation
-    full_df["date"] = pd.to_datetime(full_df["date"])
-    full_df_speed = full_df.dropna(subset=["wind_speed"]).copy()
-    grouped = full_df_speed.groupby("date", sort=True)
-
-    daily_speed_max = grouped["wind_speed"].max()
-    daily_speed_avg = grouped["wind_speed"].mean()
-    daily_gust_max = grouped["windspeed_gust"].max()
-    n_hours = grouped.size()
-
-    # Vector-mean direction (only valid directions)
-    df_dir = full_df_speed.dropna(subset=["wind_direction"]).copy()
-    if not df_dir.empty:
-        rad = np.deg2rad(df_dir["wind_direction"].astype(float))
-        df_dir["u"] = np.cos(rad)
-        df_dir["v"] = np.sin(rad)
-        grouped_dir = df_dir.groupby("date", sort=True)
-        u_mean = grouped_dir["u"].mean()
-        v_mean = grouped_dir["v"].mean()
-        dir_deg = np.rad2deg(np.arctan2(v_mean, u_mean))
-        dir_deg = (dir_deg + 360.0) % 360.0
-        daily_direction = dir_deg.reindex(daily_speed_max.index)
+    if streaming:
+        # Years already reduced to daily partials in the workers
+        partials = _merge_daily_partials(all_data)
     else:
-        daily_direction = pd.Series(
-            index=daily_speed_max.index, data=np.nan, dtype=float
-        )
+        # Merge years
+        full_df = pd.concat(all_data, ignore_index=True)
+        if keep_hourly:
+            full_df = full_df.sort_values("time").reset_index(drop=True)
 
-    daily_df = pd.DataFrame(
-        {
-            "time": pd.to_datetime(daily_speed_max.index),
-            "windspeed_mean": daily_speed_max.values,
-            "windspeed_daily_avg": daily_speed_avg.values,
-            "wind_direction": daily_direction.values,
-            "windspeed_gust": daily_gust_max.values,
-            "n_hours": n_hours.values,
-        }
-    )
+        if return_raw:
+            return full_df
+
+        partials = _daily_partials(full_df)
+
+    hourly_df = full_df if keep_hourly else None
+    del all_data, yearly
+
+    # Daily aggregation
+    daily_df = _daily_from_partials(partials)
 
     # Mean correction factor (optional)
     if mean_correction_factor is not None:
@@ -236,27 +561,203 @@ def fetch_isd_series(
     daily_df["station_name"] = meta.get("name", "")
     daily_df["country"] = meta.get("country", "")
 
-    daily_df["station_latitude"] = float(meta["latitude"]) if "latitude" in meta else np.nan
-    daily_df["station_longitude"] = float(meta["longitude"]) if "longitude" in meta else np.nan
-    daily_df["station_elevation"] = float(meta["elevation_m"]) if "elevation_m" in meta else np.nan
-    daily_df["station_distance_km"] = (
-        float(meta["distance_km"]) if "distance_km" in meta else np.nan
-    )
+    daily_df["station_latitude"] = _meta_float(meta, "latitude")
+    daily_df["station_longitude"] = _meta_float(meta, "longitude")
+    daily_df["station_elevation"] = _meta_float(meta, "elevation_m")
+    daily_df["station_distance_km"] = _meta_float(meta, "distance_km")
 
     daily_df["timezone"] = "UTC"
     daily_df["utc_offset_seconds"] = 0
 
     # Save daily CSV
-    os.makedirs(output_dir, exist_ok=True)
-    rank = station_rank if station_rank is not None else "X"
     final_csv = os.path.join(output_dir, f"noaa_station{rank}_{site_name}.csv")
-    daily_df.to_csv(final_csv, index=False)
+    if save:
+        daily_df.to_csv(final_csv, index=False)
 
-    if verbose:
-        print(f"\nNOAA ISD daily CSV saved to {final_csv}")
+        if verbose:
+            print(f"\nNOAA ISD daily CSV saved to {final_csv}")
+            print(
+                "   Main columns: time, windspeed_mean, windspeed_daily_avg, "
+                "wind_direction, windspeed_gust, n_hours"
+            )
+
+    # Save hourly archive next to it
+    if save_hourly:
+        raw_csv = hourly_csv_path(final_csv)
+        hourly_df.to_csv(raw_csv, index=False)
+        if verbose:
+            print(f"NOAA ISD hourly CSV saved to {raw_csv}")
+
+    if return_hourly:
+        return daily_df, hourly_df
+    return daily_df
+
+
+def _meta_float(meta, key):
+    """Numeric station metadata value, NaN when absent."""
+    value = meta.get(key)
+    return float(value) if value is not None else np.nan
+
+
+def hourly_csv_path(daily_csv):
+    """Hourly archive (raw_*) stored next to a NOAA daily station CSV."""
+    folder, filename = os.path.split(daily_csv)
+    return os.path.join(folder, f"raw_{filename}")
+
+
+def _write_csv_atomic(df, path):
+    """Write a CSV through a temporary file so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _read_series_csv(path):
+    """(frame, UTC time) of a saved station CSV, or None when unusable."""
+    try:
+        df = pd.read_csv(path)
+        time = pd.to_datetime(df["time"], format="ISO8601", utc=True)
+    except Exception as e:
+        print(f"Cannot read existing NOAA file {path}: {e}")
+        return None
+    if time.isna().all():
+        return None
+    return df, time
+
+
+def _merge_series(existing, existing_time, new):
+    """
+    Replace the years present in `new` and append the rest; duplicates on
+    time keep the fresh row.
+    """
+    # Same time representation as the fresh rows (hourly: UTC-aware,
+    # daily: naive dates)
+    if new["time"].dt.tz is None:
+        existing_time = existing_time.dt.tz_localize(None)
+    existing = existing.assign(time=existing_time)
+    refreshed = existing_time.dt.year.isin(new["time"].dt.year.unique())
+
+    merged = pd.concat([existing[~refreshed], new], ignore_index=True)
+    return (
+        merged.drop_duplicates(subset="time", keep="last")
+        .sort_values("time")
+        .reset_index(drop=True)
+    )
+
+
+def update_isd_series(
+    existing_csv,
+    usaf,
+    wban,
+    end_date,
+    output_dir,
+    site_name="site",
+    station_rank=None,
+    save_hourly=False,
+    verbose=False,
+    years_available=None,
+    start_date=None,
+    **fetch_kwargs,
+):
+    """
+    Incremental counterpart of fetch_isd_series for an existing daily
+    station CSV (and its raw_* hourly archive when save_hourly=True).
+
+    - Checks that existing_csv belongs to station usaf-wban and starts no
+      later than the year of start_date (or the first of years_available,
+      if later); otherwise it cannot be extended.
+    - Reads the last covered date of existing_csv.
+    - Nothing is downloaded when it already reaches end_date.
+    - Otherwise re-fetches the last year (unless it ends on Dec 31) and
+      every following year up to end_date; re-fetched years replace their
+      old rows, remaining duplicates on "time" are dropped.
+    - The merged daily series (and hourly archive) are written back
+      atomically; the per-year QC file is merged as well.
+    - years_available (station active years, noaa_station_finder) limits
+      the years requested.
+
+    Other keyword arguments are passed to fetch_isd_series.
+    Returns the merged daily DataFrame, or None when the existing files
+    cannot be used (the caller should then run a full fetch_isd_series).
+    """
+    loaded = _read_series_csv(existing_csv)
+    if loaded is None:
+        return None
+    existing, existing_time = loaded
+    if "windspeed_mean" not in existing.columns:
+        print(f"{existing_csv} is not a daily NOAA series - full download needed.")
+        return None
+    station_id = f"{usaf}-{wban}"
+    existing_ids = set(existing.get("station_id", pd.Series(dtype=str)).dropna().astype(str))
+    if existing_ids != {station_id}:
         print(
-            "   Main columns: time, windspeed_mean, windspeed_daily_avg, "
-            "wind_direction, windspeed_gust, n_hours"
+            f"{existing_csv} holds station(s) {sorted(existing_ids)}, not {station_id} "
+            "- full download needed."
         )
+        return None
+    first_needed = None
+    if start_date is not None:
+        first_needed = pd.Timestamp(start_date).year
+    if years_available:
+        first_active = min(years_available)
+        first_needed = first_active if first_needed is None else max(first_needed, first_active)
+    if first_needed is not None and existing_time.min().year > first_needed:
+        print(
+            f"{existing_csv} starts in {existing_time.min().year}, after {first_needed} "
+            "- full download needed."
+        )
+        return None
 
-    return daily_df
+    raw_csv = hourly_csv_path(existing_csv)
+    if save_hourly and not os.path.exists(raw_csv):
+        print(f"Hourly archive {raw_csv} missing - full download needed.")
+        return None
+
+    last = existing_time.max()
+    end = pd.Timestamp(end_date).date()
+    if last.date() >= end:
+        print(f"NOAA file already up to date ({last.date()}): {existing_csv}")
+        return existing
+
+    first_year = last.year + 1 if (last.month, last.day) == (12, 31) else last.year
+    years = list(range(first_year, end.year + 1))
+    if years_available is not None:
+        years = [y for y in years if y in set(years_available)]
+    if not years:
+        print(f"No active year of {usaf}-{wban} left to fetch - keeping {existing_csv}.")
+        return existing
+    print(
+        f"Updating NOAA file {existing_csv} from {first_year} "
+        f"({len(years)} year(s) to fetch)..."
+    )
+
+    fetched = fetch_isd_series(
+        usaf,
+        wban,
+        years,
+        output_dir,
+        site_name=site_name,
+        verbose=verbose,
+        station_rank=station_rank,
+        save=False,
+        merge_qc=True,
+        return_hourly=save_hourly,
+        **fetch_kwargs,
+    )
+    if fetched is None:
+        print(f"No new NOAA data for {usaf}-{wban} - keeping {existing_csv}.")
+        return existing
+    new_daily, new_hourly = fetched if save_hourly else (fetched, None)
+
+    if new_hourly is not None:
+        loaded_raw = _read_series_csv(raw_csv)
+        if loaded_raw is None:
+            # Rewriting it with the re-fetched years only would lose the rest
+            print(f"Hourly archive {raw_csv} unreadable - full download needed.")
+            return None
+        _write_csv_atomic(_merge_series(*loaded_raw, new_hourly), raw_csv)
+
+    merged = _merge_series(existing, existing_time, new_daily)
+    _write_csv_atomic(merged, existing_csv)
+    print(f"NOAA file updated: {existing_csv} ({len(new_daily)} new/refreshed days)")
+    return merged
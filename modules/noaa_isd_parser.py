@@ -0,0 +1,438 @@
+# noaa_isd_parser.py
+#
+# Vectorized readers for NOAA ISD files (see modules/docs/).
+#
+# Global Hourly CSV, mandatory WND field (WIND-OBSERVATION), 14 characters:
+#   "ddd,q,t,ssss,q"
+#     ddd  : direction angle (deg), 999 = missing
+#     q    : direction quality code
+#     t    : type code (N normal, C calm, V variable, 9 missing, ...)
+#     ssss : speed rate (m/s, scaling factor 10), 9999 = missing
+#     q    : speed quality code
+#
+# ISD-Lite (modules/docs/isd-lite-format.pdf): gzip-compressed fixed-width
+# text, one line per hour, fields right-aligned, missing = -9999:
+#   pos 1-4 year, 6-7 month, 9-10 day, 12-13 hour (UTC),
+#   pos 32-37 wind direction (deg, calm = 0),
+#   pos 38-43 wind speed (m/s, scaling factor 10)
+
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+
+# Only these columns are read from the (very wide) Global Hourly CSVs.
+GLOBAL_HOURLY_COLUMNS = ("DATE", "REPORT_TYPE", "WND", "GUST", "DRCT")
+
+ISD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+WND_WIDTH = 14
+_WND_COMMAS = (3, 5, 7, 12)
+
+ISD_LITE_WIDTH = 61
+ISD_LITE_MISSING = -9999
+
+# 0-based [start, end) slices of the ISD-Lite fields used here
+_LITE_YEAR = slice(0, 4)
+_LITE_MONTH = slice(5, 7)
+_LITE_DAY = slice(8, 10)
+_LITE_HOUR = slice(11, 13)
+_LITE_WIND_DIR = slice(31, 37)
+_LITE_WIND_SPEED = slice(37, 43)
+
+# Quality codes flagging a value as suspect or erroneous (ISD format doc,
+# codes 2/3 for NCEI QC, 6/7 for data-source QC).
+REJECTED_QC_CODES = ("2", "3", "6", "7")
+
+MISSING_DIRECTION = 999
+MISSING_SPEED = 9999
+
+# Physical bounds applied after quality codes (m/s, deg)
+MAX_WIND_SPEED = 100.0
+MAX_DIRECTION = 360.0
+
+# Canonical hourly series: when an hour holds several reports, routine
+# METAR / SYNOP reports win over specials (FM-16) and other types.
+ROUTINE_REPORT_TYPES = ("FM-15", "FM-12")
+
+# Rejection flags tracked by the QC stage, in table column order.
+QC_FLAGS = tuple(f"qc_{code}" for code in REJECTED_QC_CODES) + ("range",)
+_RANGE_FLAG = len(QC_FLAGS) - 1
+
+
+def _digits_to_int(codes):
+    """
+    Convert a (n, w) uint8 block of ASCII digits to integers.
+    Returns (values, valid) where valid is False when a byte is not a digit.
+    """
+    values = np.zeros(len(codes), dtype=np.int32)
+    valid = np.ones(len(codes), dtype=bool)
+    for j in range(codes.shape[1]):
+        digit = codes[:, j].astype(np.int32) - 48
+        valid &= (digit >= 0) & (digit <= 9)
+        values = values * 10 + digit
+    return values, valid
+
+
+def _signed_fixed_width_int(codes):
+    """
+    Convert a (n, w) uint8 block of right-aligned, optionally negative
+    integers (e.g. "  -9999") to int64. Returns (values, valid) where
+    valid is False for blank fields.
+    """
+    values = np.zeros(len(codes), dtype=np.int64)
+    negative = np.zeros(len(codes), dtype=bool)
+    valid = np.zeros(len(codes), dtype=bool)
+    for j in range(codes.shape[1]):
+        digit = codes[:, j].astype(np.int64) - 48
+        is_digit = (digit >= 0) & (digit <= 9)
+        values = np.where(is_digit, values * 10 + digit, values)
+        negative |= codes[:, j] == ord("-")
+        valid |= is_digit
+    return np.where(negative, -values, values), valid
+
+
+def _fixed_width_block(data, width):
+    """
+    View fixed-width text (bytes) as a (n_lines, width) uint8 array.
+    Uses a zero-copy reshape when every line has exactly `width`
+    characters, otherwise pads / truncates lines to `width`.
+    """
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) % (width + 1) == 0:
+        block = buf.reshape(-1, width + 1)
+        if (block[:, width] == ord("\n")).all():
+            return block[:, :width]
+
+    lines = data.replace(b"\r", b"").split(b"\n")
+    raw = np.array([line for line in lines if line.strip()], dtype=f"S{width}")
+    return raw.view(np.uint8).reshape(-1, width)
+
+
+def _ascii_categorical(col):
+    """Categorical of single characters from a uint8 array, in O(n)."""
+    present = np.flatnonzero(np.bincount(col, minlength=256))
+    lut = np.full(256, -1, dtype=np.int16)
+    lut[present] = np.arange(len(present), dtype=np.int16)
+    return pd.Categorical.from_codes(lut[col], [chr(c) for c in present])
+
+
+def decode_wnd(values):
+    """
+    Decode an array-like of packed WND strings with fixed-width byte
+    operations (no per-row Python, no str.split).
+
+    Returns a dict of arrays:
+        direction     : float64 deg, NaN when missing (999) or malformed
+        direction_qc  : quality code (Categorical of characters)
+        type_code     : observation type code (Categorical)
+        speed         : float64 m/s, NaN when missing (9999) or malformed
+        speed_qc      : quality code (Categorical)
+
+    Malformed entries get direction / speed NaN and codes '9' (missing).
+    """
+    raw = pd.Series(values).fillna("").to_numpy(dtype=str).astype(f"S{WND_WIDTH}")
+    codes = raw.view(np.uint8).reshape(-1, WND_WIDTH)
+
+    well_formed = np.ones(len(codes), dtype=bool)
+    for pos in _WND_COMMAS:
+        well_formed &= codes[:, pos] == ord(",")
+
+    direction, dir_ok = _digits_to_int(codes[:, 0:3])
+    speed, speed_ok = _digits_to_int(codes[:, 8:12])
+
+    direction = np.where(
+        well_formed & dir_ok & (direction != MISSING_DIRECTION), direction, np.nan
+    )
+    speed = np.where(
+        well_formed & speed_ok & (speed != MISSING_SPEED), speed / 10.0, np.nan
+    )
+
+    def _char_column(pos):
+        return _ascii_categorical(np.where(well_formed, codes[:, pos], ord("9")))
+
+    return {
+        "direction": direction.astype(float),
+        "direction_qc": _char_column(4),
+        "type_code": _char_column(6),
+        "speed": speed.astype(float),
+        "speed_qc": _char_column(13),
+    }
+
+
+def read_isd_global_hourly(content):
+    """
+    Read one yearly Global Hourly CSV (bytes or path) keeping only the
+    needed columns, and decode it into a typed hourly frame:
+
+        time           : datetime64[ns, UTC]
+        report_type    : REPORT_TYPE (category, e.g. FM-15, FM-16), NaN if absent
+        wind_dir_raw   : WND direction (deg, NaN if missing)
+        wind_dir_qc    : WND direction quality code (category)
+        wind_type      : WND type code (category)
+        wind_speed_raw : WND speed (m/s, NaN if missing)
+        wind_speed_qc  : WND speed quality code (category)
+        gust_raw       : GUST (m/s) when present, else NaN
+        drct_raw       : DRCT (deg) when present, else NaN
+
+    Returns None when DATE or WND is absent.
+    """
+    source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    df = pd.read_csv(
+        source,
+        usecols=lambda c: c in GLOBAL_HOURLY_COLUMNS,
+        dtype=str,
+    )
+
+    if "DATE" not in df.columns or "WND" not in df.columns:
+        return None
+
+    wnd = decode_wnd(df["WND"])
+    hourly = pd.DataFrame(
+        {
+            "time": pd.to_datetime(
+                df["DATE"], format=ISD_DATE_FORMAT, errors="coerce", utc=True
+            ),
+            "report_type": pd.Categorical(
+                df["REPORT_TYPE"].str.strip()
+                if "REPORT_TYPE" in df.columns
+                else np.full(len(df), np.nan)
+            ),
+            "wind_dir_raw": wnd["direction"],
+            "wind_dir_qc": wnd["direction_qc"],
+            "wind_type": wnd["type_code"],
+            "wind_speed_raw": wnd["speed"],
+            "wind_speed_qc": wnd["speed_qc"],
+        }
+    )
+
+    # GUST: tenths of m/s; DRCT: degrees
+    if "GUST" in df.columns:
+        hourly["gust_raw"] = pd.to_numeric(df["GUST"], errors="coerce").to_numpy() / 10.0
+    else:
+        hourly["gust_raw"] = np.nan
+    if "DRCT" in df.columns:
+        hourly["drct_raw"] = pd.to_numeric(df["DRCT"], errors="coerce").to_numpy()
+    else:
+        hourly["drct_raw"] = np.nan
+
+    return hourly.dropna(subset=["time"]).reset_index(drop=True)
+
+
+def read_isd_lite(content):
+    """
+    Read one yearly ISD-Lite file (gzip or plain bytes) into the same typed
+    hourly frame as read_isd_global_hourly, with a vectorized fixed-width
+    decoder (no per-line Python).
+
+    ISD-Lite carries no quality codes or report types (NOAA already dropped flagged values
+    and duplicate reports): wind_dir_qc / wind_speed_qc are all missing, so
+    only the range checks of apply_isd_quality_filter apply. wind_type is
+    'C' for calm hours (speed 0), 'N' otherwise, and the calm direction
+    code 0 becomes NaN as in Global Hourly (999). gust_raw and drct_raw are
+    NaN (not part of the format).
+    """
+    data = bytes(content)
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+
+    codes = _fixed_width_block(data, ISD_LITE_WIDTH)
+
+    def _field(cols, scale=1.0):
+        values, valid = _signed_fixed_width_int(codes[:, cols])
+        return np.where(valid & (values != ISD_LITE_MISSING), values / scale, np.nan)
+
+    year = _field(_LITE_YEAR)
+    month = _field(_LITE_MONTH)
+    day = _field(_LITE_DAY)
+    hour = _field(_LITE_HOUR)
+    ok = ~(np.isnan(year) | np.isnan(month) | np.isnan(day) | np.isnan(hour))
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31) & (hour <= 23)
+
+    year, month, day, hour = (a[ok].astype(np.int64) for a in (year, month, day, hour))
+    months = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]")
+    stamps = (
+        months.astype("datetime64[D]")
+        + (day - 1).astype("timedelta64[D]")
+        + hour.astype("timedelta64[h]")
+    ).astype("datetime64[ns]")
+
+    speed = _field(_LITE_WIND_SPEED, scale=10.0)[ok]
+    direction = _field(_LITE_WIND_DIR)[ok]
+    calm = speed == 0
+    direction = np.where(calm & (direction == 0), np.nan, direction)
+    missing_qc = pd.Categorical.from_codes(np.full(len(speed), -1), categories=[])
+
+    return pd.DataFrame(
+        {
+            "time": pd.DatetimeIndex(stamps).tz_localize("UTC"),
+            "report_type": missing_qc.copy(),
+            "wind_dir_raw": direction,
+            "wind_dir_qc": missing_qc,
+            "wind_type": pd.Categorical(
+                np.where(calm, "C", "N"), categories=["C", "N"]
+            ),
+            "wind_speed_raw": speed,
+            "wind_speed_qc": missing_qc.copy(),
+            "gust_raw": np.nan,
+            "drct_raw": np.nan,
+        }
+    )
+
+
+def _rejection_flags(qc_codes, values, out_of_range):
+    """
+    Per-row index into QC_FLAGS (-1 = accepted) for one WND element.
+    Quality codes take precedence over the range check; missing values
+    are never counted as rejected.
+    """
+    qc = pd.Categorical(qc_codes)
+    lut = np.array(
+        [
+            REJECTED_QC_CODES.index(c) if c in REJECTED_QC_CODES else -1
+            for c in qc.categories
+        ]
+        + [-1],
+        dtype=np.int8,
+    )
+    flags = lut[qc.codes]  # code -1 (NaN category) maps to the trailing -1
+    present = ~np.isnan(values)
+    flags = np.where((flags < 0) & present & out_of_range, _RANGE_FLAG, flags)
+    return np.where(present, flags, -1)
+
+
+def _count_flags_per_year(year_idx, n_years, flags):
+    """(n_years, len(QC_FLAGS)) rejected counts, from a single bincount."""
+    rejected = flags >= 0
+    idx = year_idx[rejected] * len(QC_FLAGS) + flags[rejected]
+    counts = np.bincount(idx, minlength=n_years * len(QC_FLAGS))
+    return counts.reshape(n_years, len(QC_FLAGS))
+
+
+def apply_isd_quality_filter(hourly):
+    """
+    Vectorized QC stage for a decoded hourly frame (read_isd_global_hourly).
+
+    - WND speed / direction flagged suspect or erroneous (REJECTED_QC_CODES)
+      are set to NaN, then speeds outside [0, MAX_WIND_SPEED] and
+      directions outside [0, MAX_DIRECTION] as well.
+    - Adds the filtered columns wind_speed and wind_dir.
+
+    Returns (filtered_hourly, qc_table) where qc_table has one row per year:
+        year, n_obs,
+        speed_qc_2, speed_qc_3, speed_qc_6, speed_qc_7, speed_range,
+        direction_qc_2, ..., direction_range
+    (counts of values rejected by each flag).
+    """
+    speed = hourly["wind_speed_raw"].to_numpy(dtype=float)
+    direction = hourly["wind_dir_raw"].to_numpy(dtype=float)
+
+    with np.errstate(invalid="ignore"):
+        speed_flags = _rejection_flags(
+            hourly["wind_speed_qc"], speed, (speed < 0) | (speed > MAX_WIND_SPEED)
+        )
+        dir_flags = _rejection_flags(
+            hourly["wind_dir_qc"], direction, (direction < 0) | (direction > MAX_DIRECTION)
+        )
+
+    filtered = hourly.copy()
+    filtered["wind_speed"] = np.where(speed_flags >= 0, np.nan, speed)
+    filtered["wind_dir"] = np.where(dir_flags >= 0, np.nan, direction)
+
+    years = hourly["time"].dt.year.to_numpy()
+    if len(years) == 0:
+        return filtered, pd.DataFrame(columns=qc_table_columns())
+
+    first_year = int(years.min())
+    year_idx = years - first_year
+    n_years = int(year_idx.max()) + 1
+
+    n_obs = np.bincount(year_idx, minlength=n_years)
+    speed_counts = _count_flags_per_year(year_idx, n_years, speed_flags)
+    dir_counts = _count_flags_per_year(year_idx, n_years, dir_flags)
+
+    table = pd.DataFrame(
+        np.column_stack([n_obs, speed_counts, dir_counts]),
+        columns=qc_table_columns()[1:],
+    )
+    table.insert(0, "year", np.arange(first_year, first_year + n_years))
+    table = table[table["n_obs"] > 0].reset_index(drop=True)
+
+    return filtered, table
+
+
+def canonicalize_hourly(hourly, hourly_max_columns=("gust_raw",)):
+    """
+    Keep one observation per hour (vectorized, single np.lexsort).
+
+    Reports are bucketed on the hour they fall in (floored, so a report
+    never moves into the next hour, day or year file); within a bucket the
+    chosen row is, in order of preference:
+      1. one with a valid (QC-filtered) wind speed,
+      2. a routine report type (ROUTINE_REPORT_TYPES) over specials/others,
+      3. the report closest to a whole hour (then the earliest).
+
+    Columns of hourly_max_columns (gusts, often only in special reports)
+    take the maximum over all reports of the hour instead.
+
+    Expects the output of apply_isd_quality_filter. Returns the selected
+    rows sorted by time, with time set to the hour bucket and the original
+    timestamp kept in obs_time.
+    """
+    if hourly.empty:
+        return hourly.assign(obs_time=hourly["time"])
+
+    obs_time = hourly["time"]
+    bucket = obs_time.dt.floor("h")
+    bucket_ns = bucket.dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view(np.int64)
+    obs_ns = obs_time.dt.tz_localize(None).to_numpy().astype("datetime64[ns]").view(np.int64)
+    hour_ns = np.int64(3600 * 10**9)
+    since_hour = obs_ns - bucket_ns
+    offset = np.minimum(since_hour, hour_ns - since_hour)
+
+    report = pd.Categorical(hourly["report_type"])
+    lut = np.array(
+        [0 if c in ROUTINE_REPORT_TYPES else 1 for c in report.categories] + [1],
+        dtype=np.int8,
+    )
+    priority = lut[report.codes]  # NaN code -1 maps to the trailing entry
+    no_speed = np.isnan(hourly["wind_speed"].to_numpy(dtype=float))
+
+    # np.lexsort: last key is the primary one
+    order = np.lexsort((obs_ns, offset, priority, no_speed, bucket_ns))
+    sorted_buckets = bucket_ns[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_buckets[1:] != sorted_buckets[:-1]
+    selected = order[first]
+
+    canonical = hourly.iloc[selected].reset_index(drop=True)
+    starts = np.flatnonzero(first)
+    for col in hourly_max_columns:
+        if col in hourly.columns:
+            values = hourly[col].to_numpy(dtype=float)[order]
+            canonical[col] = np.fmax.reduceat(values, starts)
+    canonical["obs_time"] = canonical["time"]
+    canonical["time"] = bucket.iloc[selected].reset_index(drop=True)
+    return canonical
+
+
+def qc_table_columns():
+    """Column names of the per-year QC table."""
+    return (
+        ["year", "n_obs"]
+        + [f"speed_{flag}" for flag in QC_FLAGS]
+        + [f"direction_{flag}" for flag in QC_FLAGS]
+    )
+
+
+def summarize_qc_table(qc_table):
+    """
+    Merge per-year QC tables (e.g. one per downloaded file) into one row
+    per year.
+    """
+    if qc_table is None or qc_table.empty:
+        return pd.DataFrame(columns=qc_table_columns())
+    return qc_table.groupby("year", as_index=False, sort=True).sum()
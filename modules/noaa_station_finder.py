@@ -1,11 +1,22 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
 import pandas as pd
 import requests
 from geopy.distance import geodesic
+from scipy.spatial import cKDTree
+
+from modules.noaa_isd_fetcher import ISD_GLOBAL_HOURLY_URL, _make_session
+from modules.utils import file_lock
 
 
-def load_isd_stations(csv_path):
+def _parse_isd_history_csv(csv_path):
     """
-    Load and clean the isd-history.csv (NOAA ISD station history).
+    Parse and clean the isd-history.csv (NOAA ISD station history).
 
     - Strip extra spaces in headers and values.
     - Normalize common column names: ELEV, BEGIN, END.
@@ -14,7 +25,7 @@ def load_isd_stations(csv_path):
     """
     df = pd.read_csv(csv_path, dtype=str)
     df.columns = df.columns.str.strip()
-    df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
+    df = df.apply(lambda x: x.str.strip() if pd.api.types.is_string_dtype(x) else x)
 
     elevation_col = next(
         (col for col in df.columns if col.strip().upper() in ["ELEV", "ELEV(M)"]),
@@ -49,10 +60,248 @@ def load_isd_stations(csv_path):
     return df
 
 
+# Version of the pickled catalogue layout; bump to invalidate old caches.
+CATALOGUE_CACHE_VERSION = 1
+
+
+def _file_sha1(path, chunk_size=1 << 20):
+    """SHA-1 of a file, read in chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_cached_table(csv_path, parser, cache_path=None, use_cache=True):
+    """
+    Return parser(csv_path), going through a pickled binary cache stored
+    next to the CSV (or at cache_path).
+
+    The cache keeps the typed DataFrame together with the source signature
+    (mtime, size, SHA-1). It is reused when mtime and size are unchanged, or
+    when the content hash still matches (e.g. file touched or re-copied);
+    otherwise the CSV is parsed again and the cache rewritten.
+    """
+    if not use_cache:
+        return parser(csv_path)
+
+    if cache_path is None:
+        cache_path = os.path.splitext(csv_path)[0] + ".pkl"
+
+    stat = os.stat(csv_path)
+    signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except Exception as e:
+            print(f"Unreadable catalogue cache {cache_path} ({e}) - rebuilding.")
+            cached = None
+
+    if cached is not None and cached.get("version") == CATALOGUE_CACHE_VERSION:
+        if (
+            cached.get("mtime_ns") == signature["mtime_ns"]
+            and cached.get("size") == signature["size"]
+        ):
+            return cached["data"]
+
+        sha1 = _file_sha1(csv_path)
+        if cached.get("sha1") == sha1:
+            cached.update(signature)
+            _write_cache(cache_path, cached)
+            return cached["data"]
+    else:
+        sha1 = None
+
+    data = parser(csv_path)
+    payload = {
+        "version": CATALOGUE_CACHE_VERSION,
+        "sha1": sha1 or _file_sha1(csv_path),
+        "data": data,
+        **signature,
+    }
+    _write_cache(cache_path, payload)
+    return data
+
+
+def _write_cache(cache_path, payload):
+    """Atomically write a pickled cache payload (failures are not fatal)."""
+    # Per-process temporary name: several site workers may rebuild it at once.
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write catalogue cache {cache_path}: {e}")
+
+
+def load_isd_stations(csv_path, cache_path=None, use_cache=True):
+    """
+    Load and clean the isd-history.csv (NOAA ISD station history).
+
+    The parsed, typed catalogue is persisted as a binary cache next to the
+    CSV (isd-history.pkl by default) and rebuilt automatically when the
+    CSV changes. Set use_cache=False to always parse the CSV.
+    """
+    return _load_cached_table(
+        csv_path, _parse_isd_history_csv, cache_path=cache_path, use_cache=use_cache
+    )
+
+
+# isd-inventory.csv: USAF, WBAN, YEAR, JAN ... DEC (observations per month)
+INVENTORY_MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN",
+                    "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+
+# A month counts as covered with ~8 reports per day (synoptic) over its
+# length, allowing MONTHLY_OBS_TOLERANCE of them to be missing.
+MIN_DAILY_OBS = 8
+MONTHLY_OBS_TOLERANCE = 0.1
+
+
+def _parse_isd_inventory_csv(csv_path):
+    """
+    Parse isd-inventory.csv into a dense station x month count array.
+
+    Returns a dict:
+        {
+            "station_ids": ndarray of "USAF-WBAN" (sorted),
+            "first_year": int (column 0 = January of first_year),
+            "counts": uint16 ndarray (n_stations, n_months), clipped at 65535,
+        }
+    """
+    df = pd.read_csv(csv_path, dtype={"USAF": str, "WBAN": str})
+    df.columns = df.columns.str.strip().str.upper()
+    df = df.dropna(subset=["USAF", "WBAN", "YEAR"])
+
+    station_ids = df["USAF"].str.strip() + "-" + df["WBAN"].str.strip()
+    codes, uniques = pd.factorize(station_ids, sort=True)
+
+    years = df["YEAR"].to_numpy(dtype=int)
+    first_year = int(years.min()) if len(years) else 0
+    n_months = (int(years.max()) - first_year + 1) * 12 if len(years) else 0
+
+    monthly = (
+        df[list(INVENTORY_MONTHS)].apply(pd.to_numeric, errors="coerce")
+        .fillna(0).to_numpy(dtype=np.int64)
+    )
+    counts = np.zeros((len(uniques), n_months), dtype=np.uint16)
+    cols = (years - first_year)[:, None] * 12 + np.arange(12)
+    counts[codes[:, None], cols] = np.clip(monthly, 0, np.iinfo(np.uint16).max)
+
+    return {
+        "station_ids": np.asarray(uniques, dtype=str),
+        "first_year": first_year,
+        "counts": counts,
+    }
+
+
+def load_isd_inventory(
+    csv_path, start_date=None, end_date=None, cache_path=None, use_cache=True
+):
+    """
+    Load NOAA's isd-inventory.csv (monthly observation counts per station)
+    as a compact station x month array (see _parse_isd_inventory_csv),
+    with the same binary cache as load_isd_stations (isd-inventory.pkl).
+
+    With start_date / end_date, only the months of those years are kept,
+    for the stations with at least one observation in them: the full array
+    (~90 MB) stays in the loading process, and the one handed to site
+    workers covers the study period only.
+    """
+    inventory = _load_cached_table(
+        csv_path, _parse_isd_inventory_csv, cache_path=cache_path, use_cache=use_cache
+    )
+    if start_date is None and end_date is None:
+        return inventory
+    return restrict_isd_inventory(inventory, start_date, end_date)
+
+
+def restrict_isd_inventory(inventory, start_date=None, end_date=None):
+    """
+    Copy of an inventory limited to the years of [start_date, end_date]
+    (either bound may be None), without the stations that have no
+    observation in them.
+    """
+    first_year = inventory["first_year"]
+    n_months = inventory["counts"].shape[1]
+    lo, hi = 0, n_months
+    if start_date is not None:
+        lo = min(max((int(str(start_date)[:4]) - first_year) * 12, 0), n_months)
+    if end_date is not None:
+        hi = min((int(str(end_date)[:4]) - first_year + 1) * 12, n_months)
+    hi = max(hi, lo)
+
+    window = inventory["counts"][:, lo:hi]
+    keep = window.any(axis=1)
+    return {
+        "station_ids": inventory["station_ids"][keep],
+        "first_year": first_year + lo // 12,
+        "counts": window[keep],
+    }
+
+
+def _month_offset(date, first_year):
+    ts = pd.Timestamp(date)
+    return (ts.year - first_year) * 12 + ts.month - 1
+
+
+def _monthly_obs_thresholds(first_year, lo, hi, min_daily_obs, tolerance):
+    """Minimum counts of inventory columns lo..hi-1 (column 0 = Jan of first_year)."""
+    months = pd.period_range(
+        pd.Period(year=first_year + lo // 12, month=lo % 12 + 1, freq="M"),
+        periods=hi - lo,
+        freq="M",
+    )
+    return np.ceil(min_daily_obs * months.days_in_month.to_numpy() * (1.0 - tolerance))
+
+
+def isd_station_coverage(
+    inventory,
+    station_ids,
+    start_date,
+    end_date,
+    min_daily_obs=MIN_DAILY_OBS,
+    tolerance=MONTHLY_OBS_TOLERANCE,
+):
+    """
+    Fraction of the months of [start_date, end_date] with at least
+    min_daily_obs observations per day of the month (less the tolerance
+    fraction), for each station ID ("USAF-WBAN"). Stations absent from the
+    inventory get 0.0. Returns a float ndarray.
+    """
+    station_ids = np.asarray(station_ids, dtype=str)
+    first = _month_offset(start_date, inventory["first_year"])
+    last = _month_offset(end_date, inventory["first_year"])
+    n_window = last - first + 1
+    if n_window <= 0:
+        return np.zeros(len(station_ids))
+
+    known = inventory["station_ids"]
+    pos = np.searchsorted(known, station_ids)
+    pos = np.minimum(pos, max(len(known) - 1, 0))
+    found = (known[pos] == station_ids) if len(known) else np.zeros(len(station_ids), bool)
+
+    lo = max(first, 0)
+    hi = min(last + 1, inventory["counts"].shape[1])
+    covered = np.zeros(len(station_ids))
+    if hi > lo and found.any():
+        window = inventory["counts"][pos[found], lo:hi]
+        min_obs = _monthly_obs_thresholds(
+            inventory["first_year"], lo, hi, min_daily_obs, tolerance
+        )
+        covered[found] = (window >= min_obs).sum(axis=1)
+    return covered / n_window
+
+
 def test_isd_station_availability(usaf, wban, year):
     """
     Check if the NOAA ISD file for a given station (USAF+WBAN) and year
     actually exists on the Global Hourly server (HEAD request on CSV URL).
+    For many station-years, use probe_isd_availability (concurrent, cached).
     """
     url = f"https://www.ncei.noaa.gov/data/global-hourly/access/{year}/{usaf}{wban}.csv"
     try:
@@ -62,48 +311,402 @@ def test_isd_station_availability(usaf, wban, year):
         return False
 
 
-def find_nearest_isd_stations(site_lat, site_lon, isd_df, max_distance_km=80, n=5):
+# Persisted results of probe_isd_availability
+DEFAULT_AVAILABILITY_TABLE = os.path.join("data", "cache", "isd_availability.csv")
+AVAILABILITY_COLUMNS = ["usaf", "wban", "year", "available", "checked_at"]
+
+# How long a probe result is trusted. Files of closed years rarely appear
+# or vanish; the current / previous year is re-checked daily.
+AVAILABLE_TTL = timedelta(days=365)
+MISSING_TTL = timedelta(days=30)
+RECENT_YEAR_TTL = timedelta(days=1)
+
+DEFAULT_PROBE_WORKERS = 16
+PROBE_TIMEOUT_S = 5
+
+
+def _availability_ttl(year, available, now):
+    if int(year) >= now.year - 1:
+        return RECENT_YEAR_TTL
+    return AVAILABLE_TTL if available else MISSING_TTL
+
+
+def _load_availability_table(table_path):
+    if not os.path.exists(table_path):
+        return pd.DataFrame(columns=AVAILABILITY_COLUMNS)
+    try:
+        return pd.read_csv(table_path, dtype={"usaf": str, "wban": str})
+    except Exception as e:
+        print(f"Unreadable availability table {table_path} ({e}) - ignoring.")
+        return pd.DataFrame(columns=AVAILABILITY_COLUMNS)
+
+
+def probe_isd_availability(
+    triples,
+    table_path=DEFAULT_AVAILABILITY_TABLE,
+    max_workers=DEFAULT_PROBE_WORKERS,
+    base_url=ISD_GLOBAL_HOURLY_URL,
+    timeout=PROBE_TIMEOUT_S,
+):
+    """
+    Batch version of test_isd_station_availability.
+
+    `triples` is an iterable of (usaf, wban, year). Results still valid in
+    the availability table (table_path, see the *_TTL constants) are reused;
+    the others are checked with concurrent HEAD requests over one pooled
+    session and written back to the table (under a lock file, as several
+    site processes may probe at once).
+
+    Returns {(usaf, wban, year): bool}, or None for a station-year whose
+    availability is unknown (network error, rate limit or server error;
+    not persisted).
+    """
+    now = datetime.now(timezone.utc)
+    keys = list(dict.fromkeys((str(u), str(w), int(y)) for u, w, y in triples))
+
+    table = _load_availability_table(table_path)
+    known = {}
+    for row in table.itertuples(index=False):
+        checked_at = datetime.fromisoformat(row.checked_at)
+        available = bool(row.available)
+        if now - checked_at <= _availability_ttl(row.year, available, now):
+            known[(row.usaf, row.wban, int(row.year))] = available
+
+    results = {key: known[key] for key in keys if key in known}
+    to_probe = [key for key in keys if key not in known]
+    if not to_probe:
+        return results
+
+    print(f"Probing {len(to_probe)} NOAA ISD station-year(s) ({len(results)} cached)...")
+
+    def _probe(session, key):
+        """(key, available or None when unknown) for one station-year."""
+        usaf, wban, year = key
+        try:
+            response = session.head(f"{base_url}/{year}/{usaf}{wban}.csv", timeout=timeout)
+        except requests.RequestException:
+            return key, None
+        if response.status_code not in (200, 404):
+            return key, None
+        return key, response.status_code == 200
+
+    probed = {}
+    max_workers = max(1, min(int(max_workers), len(to_probe)))
+    with _make_session(max_workers) as session, ThreadPoolExecutor(max_workers) as pool:
+        for key, available in pool.map(lambda k: _probe(session, k), to_probe):
+            results[key] = available
+            if available is not None:
+                probed[key] = available
+
+    if probed:
+        new_rows = pd.DataFrame(
+            [(u, w, y, a, now.isoformat()) for (u, w, y), a in probed.items()],
+            columns=AVAILABILITY_COLUMNS,
+        )
+        # Re-read under the lock: other processes may have added rows
+        with file_lock(f"{table_path}.lock", poll_s=0.1, stale_s=60):
+            table = _load_availability_table(table_path)
+            merged = pd.concat([table, new_rows], ignore_index=True) if len(table) else new_rows
+            merged = merged.drop_duplicates(subset=["usaf", "wban", "year"], keep="last")
+            tmp_path = f"{table_path}.{os.getpid()}.tmp"
+            merged.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, table_path)
+
+    return results
+
+
+# Mean Earth radius used by the spatial index (km).
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine (sphere) vs geodesic (WGS84) distances differ by less than 0.6 %,
+# so the index searches slightly wider and refines candidates with geodesic().
+_INDEX_RADIUS_MARGIN = 1.01
+_INDEX_EXTRA_CANDIDATES = 5
+
+
+def _latlon_to_unit_xyz(lat, lon):
+    """
+    Convert latitude / longitude (deg, scalars or arrays) to 3D coordinates
+    on the unit sphere, shape (n, 3).
+    """
+    lat_rad = np.deg2rad(np.atleast_1d(np.asarray(lat, dtype=float)))
+    lon_rad = np.deg2rad(np.atleast_1d(np.asarray(lon, dtype=float)))
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack(
+        (cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad))
+    )
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Vectorized great-circle distance (km) on a sphere of radius EARTH_RADIUS_KM.
+    """
+    lat1, lon1, lat2, lon2 = map(np.deg2rad, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def build_isd_station_index(isd_df):
+    """
+    Build a spatial index over the stations of an isd-history DataFrame
+    (output of load_isd_stations).
+
+    Stations are projected to unit-sphere 3D coordinates and stored in a
+    scipy cKDTree, so chord-distance queries replace the full geodesic scan.
+    Build it once per run and pass it to find_nearest_isd_stations /
+    find_nearest_isd_stations_batch.
+
+    Returns a dict:
+        {
+            "tree": cKDTree,
+            "stations": DataFrame (isd_df with a fresh RangeIndex),
+            "lat": ndarray,
+            "lon": ndarray,
+        }
+    """
+    stations = isd_df.reset_index(drop=True)
+    lat = stations["LAT"].to_numpy(dtype=float)
+    lon = stations["LON"].to_numpy(dtype=float)
+    tree = cKDTree(_latlon_to_unit_xyz(lat, lon))
+    return {"tree": tree, "stations": stations, "lat": lat, "lon": lon}
+
+
+def _station_record(row, dist_km):
+    """
+    Build the standard station dict from one isd-history row.
+    """
+    begin = int(row["BEGIN"]) if "BEGIN" in row and not pd.isna(row["BEGIN"]) else None
+    end = int(row["END"]) if "END" in row and not pd.isna(row["END"]) else None
+
+    years_available = None
+    if begin and end:
+        begin_year = int(str(begin)[:4])
+        end_year = int(str(end)[:4])
+        years_available = list(range(begin_year, end_year + 1))
+
+    return {
+        "usaf": row.get("USAF"),
+        "wban": row.get("WBAN"),
+        "station_id": f"{row.get('USAF')}-{row.get('WBAN')}",
+        "name": row.get("STATION NAME", "Unknown").title(),
+        "country": row.get("CTRY"),
+        "latitude": float(row["LAT"]),
+        "longitude": float(row["LON"]),
+        "elevation_m": row.get("ELEV", None),
+        "distance_km": round(dist_km, 2),
+        "begin": begin,
+        "end": end,
+        "years_available": years_available,
+    }
+
+
+def station_active_years(station, start_year, end_year):
+    """
+    Years of [start_year, end_year] within the station's BEGIN/END window
+    (station dict from find_nearest_isd_stations). All years are returned
+    when the window is unknown.
+    """
+    years = range(int(start_year), int(end_year) + 1)
+    available = station.get("years_available")
+    if not available:
+        return list(years)
+    return [y for y in years if available[0] <= y <= available[-1]]
+
+
+def _refine_candidates(index, site_lat, site_lon, cand_idx, max_distance_km, n):
+    """
+    Rank KD-tree candidates for one site: vectorized haversine pre-ranking,
+    then exact geodesic distances on the short list only.
+    """
+    cand_idx = np.asarray(cand_idx, dtype=int)
+    if cand_idx.size == 0:
+        return []
+
+    approx_km = _haversine_km(
+        site_lat, site_lon, index["lat"][cand_idx], index["lon"][cand_idx]
+    )
+    order = np.argsort(approx_km, kind="stable")[: n + _INDEX_EXTRA_CANDIDATES]
+
+    site_coord = (site_lat, site_lon)
+    refined = []
+    for i in cand_idx[order]:
+        dist_km = geodesic(site_coord, (index["lat"][i], index["lon"][i])).km
+        if dist_km <= max_distance_km:
+            refined.append((dist_km, i))
+
+    refined.sort(key=lambda x: x[0])
+    stations = index["stations"]
+    return [_station_record(stations.iloc[i], dist_km) for dist_km, i in refined[:n]]
+
+
+def _chord_radius(max_distance_km):
+    """
+    Unit-sphere chord length matching a great-circle distance (with margin).
+    """
+    angle = min(np.pi, max_distance_km * _INDEX_RADIUS_MARGIN / EARTH_RADIUS_KM)
+    return 2.0 * np.sin(angle / 2.0)
+
+
+def find_nearest_isd_stations(
+    site_lat, site_lon, isd_df=None, max_distance_km=80, n=5, index=None
+):
     """
     Find the n closest ISD stations within max_distance_km using the
     already-loaded isd-history DataFrame.
 
     This function does NOT hit NOAA APIs; it relies on LAT/LON and BEGIN/END
     metadata to build a structured list.
+
+    Pass a prebuilt `index` (build_isd_station_index) to avoid rebuilding
+    the KD-tree on every call; otherwise it is built from isd_df.
+    Distances are geodesic (WGS84), as before.
     """
-    station_list = []
+    if index is None:
+        index = build_isd_station_index(isd_df)
 
-    for _, row in isd_df.iterrows():
-        station_coord = (row["LAT"], row["LON"])
-        site_coord = (site_lat, site_lon)
-        dist_km = geodesic(site_coord, station_coord).km
+    site_xyz = _latlon_to_unit_xyz(site_lat, site_lon)[0]
+    cand_idx = index["tree"].query_ball_point(site_xyz, _chord_radius(max_distance_km))
+    return _refine_candidates(index, site_lat, site_lon, cand_idx, max_distance_km, n)
 
-        if dist_km <= max_distance_km:
-            begin = int(row["BEGIN"]) if "BEGIN" in row and not pd.isna(row["BEGIN"]) else None
-            end = int(row["END"]) if "END" in row and not pd.isna(row["END"]) else None
-
-            years_available = None
-            if begin and end:
-                begin_year = int(str(begin)[:4])
-                end_year = int(str(end)[:4])
-                years_available = list(range(begin_year, end_year + 1))
-
-            station_list.append(
-                {
-                    "usaf": row.get("USAF"),
-                    "wban": row.get("WBAN"),
-                    "station_id": f"{row.get('USAF')}-{row.get('WBAN')}",
-                    "name": row.get("STATION NAME", "Unknown").title(),
-                    "country": row.get("CTRY"),
-                    "latitude": float(row["LAT"]),
-                    "longitude": float(row["LON"]),
-                    "elevation_m": row.get("ELEV", None),
-                    "distance_km": round(dist_km, 2),
-                    "begin": begin,
-                    "end": end,
-                    "years_available": years_available,
-                }
-            )
-
-    # Sort by distance and return the first n
-    station_list.sort(key=lambda x: x["distance_km"])
-    return station_list[:n]
+
+def find_nearest_isd_stations_batch(sites, isd_df=None, max_distance_km=80, n=5, index=None):
+    """
+    Batch version of find_nearest_isd_stations for many sites in one call.
+
+    `sites` is an iterable of (lat, lon) pairs. Returns one station list per
+    site, in the same order.
+    """
+    if index is None:
+        index = build_isd_station_index(isd_df)
+
+    coords = np.asarray(list(sites), dtype=float).reshape(-1, 2)
+    if coords.shape[0] == 0:
+        return []
+
+    sites_xyz = _latlon_to_unit_xyz(coords[:, 0], coords[:, 1])
+    cand_lists = index["tree"].query_ball_point(sites_xyz, _chord_radius(max_distance_km))
+
+    return [
+        _refine_candidates(index, lat, lon, cand_idx, max_distance_km, n)
+        for (lat, lon), cand_idx in zip(coords, cand_lists)
+    ]
+
+
+def select_isd_stations_by_coverage(
+    site_lat,
+    site_lon,
+    inventory,
+    start_date,
+    end_date,
+    isd_df=None,
+    index=None,
+    max_distance_km=80,
+    n=2,
+    n_candidates=10,
+    min_coverage=0.5,
+):
+    """
+    Coverage-aware version of find_nearest_isd_stations.
+
+    The n_candidates nearest stations are scored with isd_station_coverage
+    over the requested window (each dict gets a "coverage" key). Stations
+    with coverage >= min_coverage come first, nearest first; the others
+    follow by decreasing coverage; stations without any coverage are left
+    out. Returns the best n.
+    """
+    candidates = find_nearest_isd_stations(
+        site_lat,
+        site_lon,
+        isd_df=isd_df,
+        max_distance_km=max_distance_km,
+        n=n_candidates,
+        index=index,
+    )
+    if not candidates:
+        return []
+
+    coverage = isd_station_coverage(
+        inventory, [c["station_id"] for c in candidates], start_date, end_date
+    )
+    for station, cov in zip(candidates, coverage):
+        station["coverage"] = round(float(cov), 3)
+    return _rank_by_coverage(candidates, min_coverage, n)
+
+
+def select_isd_stations_by_availability(
+    site_lat,
+    site_lon,
+    start_date,
+    end_date,
+    isd_df=None,
+    index=None,
+    max_distance_km=80,
+    n=2,
+    n_candidates=5,
+    min_coverage=0.5,
+    table_path=DEFAULT_AVAILABILITY_TABLE,
+    base_url=ISD_GLOBAL_HOURLY_URL,
+):
+    """
+    Selection for runs without the inventory file: the yearly files of the
+    n_candidates nearest stations over the requested window are checked
+    with probe_isd_availability (cached in table_path). "coverage" is the
+    share of the window's years with a file; years that could not be
+    checked (network error, rate limit) count as available, so a failed
+    probe does not remove stations. Ranking as in
+    select_isd_stations_by_coverage.
+    """
+    candidates = find_nearest_isd_stations(
+        site_lat,
+        site_lon,
+        isd_df=isd_df,
+        max_distance_km=max_distance_km,
+        n=n_candidates,
+        index=index,
+    )
+    if not candidates:
+        return []
+
+    start_year, end_year = int(str(start_date)[:4]), int(str(end_date)[:4])
+    n_years = max(1, end_year - start_year + 1)
+    active = {
+        c["station_id"]: station_active_years(c, start_year, end_year) for c in candidates
+    }
+    available = probe_isd_availability(
+        [
+            (c["usaf"], c["wban"], year)
+            for c in candidates
+            for year in active[c["station_id"]]
+        ],
+        table_path=table_path,
+        base_url=base_url,
+    )
+    n_unknown = sum(value is None for value in available.values())
+    if n_unknown:
+        print(f"NOAA availability unknown for {n_unknown} station-year(s) - assumed available.")
+    for station in candidates:
+        n_files = sum(
+            available[(str(station["usaf"]), str(station["wban"]), year)] is not False
+            for year in active[station["station_id"]]
+        )
+        station["coverage"] = round(n_files / n_years, 3)
+    return _rank_by_coverage(candidates, min_coverage, n)
+
+
+def _rank_by_coverage(candidates, min_coverage, n):
+    """
+    Stations with coverage >= min_coverage first, nearest first; the
+    others by decreasing coverage. Stations with zero coverage are dropped.
+    Returns the best n.
+    """
+    ranked = sorted(
+        [c for c in candidates if c["coverage"] > 0],
+        key=lambda c: (
+            c["coverage"] < min_coverage,
+            c["distance_km"] if c["coverage"] >= min_coverage else -c["coverage"],
+        ),
+    )
+    return ranked[:n]
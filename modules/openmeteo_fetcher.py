@@ -1,87 +1,159 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from modules.utils import json_float_array, loads_json
 
-def fetch_openmeteo_data(
-    lat,
-    lon,
-    start_date,
-    end_date,
-    model=None,
-    gust_correction_factor=None,
-    mean_correction_factor=None,
-):
-    """
-    Download Open-Meteo hourly data (archive API) and build standardized
-    daily aggregates for the statistics engine.
 
-    Key assumptions (Open-Meteo docs):
-    - Hourly variables (all at 10 m):
-        * wind_speed_10m     : instantaneous model wind speed at the given hour
-        * wind_direction_10m : instantaneous direction (deg)
-        * wind_gusts_10m     : max gust over the previous hour
-    - Units: m/s via wind_speed_unit=ms.
-    - Timezone: UTC for consistency with other sources.
+OPENMETEO_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+OPENMETEO_HOURLY_VARIABLES = ("wind_speed_10m", "wind_direction_10m", "wind_gusts_10m")
+OPENMETEO_DAILY_VARIABLES = (
+    "wind_speed_10m_max",
+    "wind_speed_10m_mean",
+    "wind_gusts_10m_max",
+    "wind_direction_10m_dominant",
+)
 
-    Daily aggregates produced:
-        * windspeed_mean      : daily MAX of wind_speed_10m (m/s)
-        * windspeed_daily_avg : daily average of wind_speed_10m (m/s)
-        * wind_direction      : daily vector-mean direction (deg)
-        * windspeed_gust      : daily MAX of wind_gusts_10m (m/s)
-        * n_hours             : number of hourly samples per day
+# "hourly": hourly variables aggregated locally (all daily fields).
+# "daily": daily variables aggregated by Open-Meteo (24x smaller payload;
+# direction is the dominant one, not a vector mean; hour count unknown).
+OPENMETEO_AGGREGATIONS = ("hourly", "daily")
+
+# Long periods are split into chunks of OPENMETEO_CHUNK_YEARS calendar years,
+# fetched concurrently; each failed request is retried with backoff.
+OPENMETEO_CHUNK_YEARS = 1
+OPENMETEO_MAX_WORKERS = 4
+OPENMETEO_TIMEOUT_S = 120
+OPENMETEO_RETRIES = 4
+OPENMETEO_BACKOFF_S = 2.0
+
+# Multi-location requests (comma-separated latitude/longitude lists) are
+# capped by location count and by URL length.
+OPENMETEO_BATCH_MAX_LOCATIONS = 50
+OPENMETEO_MAX_URL_LENGTH = 8000
 
-    Optional factors:
-    - mean_correction_factor: multiply windspeed_mean and windspeed_daily_avg by this factor.
-    - gust_correction_factor: if provided, only used as fallback when daily gust is NaN
-      (windspeed_gust = factor * windspeed_mean). Existing gusts are not modified.
-    """
-    base_url = "https://archive-api.open-meteo.com/v1/archive"
-    model_param = f"&models={model}" if model else ""
 
-    url_hourly = (
-        f"{base_url}?latitude={lat}&longitude={lon}"
-        f"&start_date={start_date}&end_date={end_date}"
-        f"&hourly=wind_speed_10m,wind_direction_10m,wind_gusts_10m"
-        f"&wind_speed_unit=ms"
-        f"&timezone=UTC{model_param}"
+def _make_session(pool_size):
+    """
+    requests.Session shared by the chunk requests: keep-alive pool sized
+    for the workers and retries (with backoff) on transient HTTP errors.
+    Read errors (e.g. a read timeout, which already used up the request
+    timeout) are not retried, so a time budget is not exceeded by retries.
+    """
+    retry = Retry(
+        total=OPENMETEO_RETRIES,
+        read=0,
+        backoff_factor=OPENMETEO_BACKOFF_S,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
     )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _date_chunks(start_date, end_date, chunk_years=OPENMETEO_CHUNK_YEARS):
+    """
+    Split [start_date, end_date] (YYYY-MM-DD) into consecutive periods of at
+    most chunk_years calendar years. Chunks end on Dec 31, so no day is
+    split across two requests.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    chunk_years = max(1, int(chunk_years))
 
-    print(f"Open-Meteo API call (hourly): {url_hourly}")
-    response_hourly = requests.get(url_hourly)
-    if response_hourly.status_code != 200:
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start.replace(year=chunk_start.year + chunk_years - 1, month=12, day=31))
+        chunks.append((chunk_start.isoformat(), chunk_end.isoformat()))
+        chunk_start = chunk_end.replace(year=chunk_end.year + 1, month=1, day=1)
+    return chunks
+
+
+def _request_openmeteo(
+    session, params, base_url=OPENMETEO_ARCHIVE_URL, deadline=None, aggregation="hourly"
+):
+    """
+    GET the archive API and return the decoded JSON (raises on errors).
+    deadline (time.monotonic() value) caps the request timeout; TimeoutError
+    is raised once it has passed. aggregation only labels the messages.
+    """
+    http_timeout = OPENMETEO_TIMEOUT_S
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Open-Meteo time budget exhausted.")
+        http_timeout = min(http_timeout, remaining)
+    try:
+        response = session.get(base_url, params=params, timeout=http_timeout)
+    except requests.RequestException as e:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"Open-Meteo time budget exhausted: {e}") from e
+        raise
+    print(f"Open-Meteo API call ({aggregation}): {response.url}")
+    if response.status_code != 200:
         raise Exception(
-            f"Open-Meteo API error (hourly): {response_hourly.status_code} - {response_hourly.text}"
+            f"Open-Meteo API error ({aggregation}): {response.status_code} - {response.text}"
         )
+    return loads_json(response.content)
+
 
-    data_hourly_json = response_hourly.json()
-    data_hourly = data_hourly_json.get("hourly", {})
+def _hourly_time_index(times):
+    """Hourly timestamps (unixtime seconds, or ISO strings) as UTC datetimes."""
+    if times and isinstance(times[0], str):
+        return pd.to_datetime(times, utc=True)
+    return pd.to_datetime(np.fromiter(times, dtype=np.int64, count=len(times)), unit="s", utc=True)
+
+
+def _aggregate_hourly_block(data_hourly):
+    """
+    Daily aggregates of one 'hourly' block of the Open-Meteo response:
+    time, windspeed_mean (max), windspeed_daily_avg, wind_direction
+    (vector mean), windspeed_gust (max), n_hours.
+
+    The JSON lists are decoded straight into float64 arrays (json_float_array)
+    instead of going through a DataFrame of Python objects.
+    """
     if not data_hourly:
         raise ValueError("Open-Meteo hourly response missing 'hourly' block.")
 
-    df_hourly = pd.DataFrame(data_hourly)
-    if df_hourly.empty:
-        raise ValueError("Open-Meteo hourly response empty after DataFrame conversion.")
-
     expected_cols = {"time", "wind_speed_10m", "wind_direction_10m"}
-    missing_cols = expected_cols - set(df_hourly.columns)
+    missing_cols = expected_cols - set(data_hourly)
     if missing_cols:
         raise ValueError(f"Missing columns in Open-Meteo hourly response: {missing_cols}")
 
-    if "wind_gusts_10m" not in df_hourly.columns:
-        df_hourly["wind_gusts_10m"] = np.nan
+    times = data_hourly["time"]
+    if not times:
+        raise ValueError("Open-Meteo hourly response is empty.")
 
-    df_hourly["time"] = pd.to_datetime(df_hourly["time"], utc=True)
+    speed = json_float_array(data_hourly["wind_speed_10m"])
+    direction = json_float_array(data_hourly["wind_direction_10m"])
+    if "wind_gusts_10m" in data_hourly:
+        gust = json_float_array(data_hourly["wind_gusts_10m"])
+    else:
+        gust = np.full(len(times), np.nan)
 
     # Daily aggregates
-    df_hourly["date"] = df_hourly["time"].dt.date
-
-    dir_rad = np.deg2rad(df_hourly["wind_direction_10m"].astype(float))
-    df_hourly["dir_u"] = np.cos(dir_rad)
-    df_hourly["dir_v"] = np.sin(dir_rad)
+    dir_rad = np.deg2rad(direction)
+    df_hourly = pd.DataFrame(
+        {
+            "date": _hourly_time_index(times).normalize().tz_localize(None),
+            "wind_speed_10m": speed,
+            "wind_gusts_10m": gust,
+            "dir_u": np.cos(dir_rad),
+            "dir_v": np.sin(dir_rad),
+        }
+    )
 
     grouped = df_hourly.groupby("date")
 
@@ -108,7 +180,258 @@ def fetch_openmeteo_data(
     )
 
     df_daily_agg["time"] = pd.to_datetime(df_daily_agg["time"])
+    return df_daily_agg
+
+
+def _daily_block(data_daily):
+    """
+    Daily fields from the 'daily' block of the Open-Meteo response
+    (aggregation="daily"): windspeed_mean = wind_speed_10m_max,
+    windspeed_daily_avg = wind_speed_10m_mean, windspeed_gust =
+    wind_gusts_10m_max, wind_direction = wind_direction_10m_dominant.
+    Missing variables give NaN; n_hours is NaN (not reported by the API).
+    """
+    if not data_daily:
+        raise ValueError("Open-Meteo daily response missing 'daily' block.")
+
+    missing_cols = {"time", "wind_speed_10m_max"} - set(data_daily)
+    if missing_cols:
+        raise ValueError(f"Missing columns in Open-Meteo daily response: {missing_cols}")
+
+    times = data_daily["time"]
+    if not times:
+        raise ValueError("Open-Meteo daily response is empty.")
+
+    n_days = len(times)
+    nan_days = np.full(n_days, np.nan)
+    return pd.DataFrame(
+        {
+            "time": _hourly_time_index(times).normalize().tz_localize(None),
+            "windspeed_mean": json_float_array(data_daily["wind_speed_10m_max"]),
+            "windspeed_daily_avg": (
+                json_float_array(data_daily["wind_speed_10m_mean"])
+                if "wind_speed_10m_mean" in data_daily
+                else nan_days.copy()
+            ),
+            "wind_direction": (
+                json_float_array(data_daily["wind_direction_10m_dominant"])
+                if "wind_direction_10m_dominant" in data_daily
+                else nan_days.copy()
+            ),
+            "windspeed_gust": (
+                json_float_array(data_daily["wind_gusts_10m_max"])
+                if "wind_gusts_10m_max" in data_daily
+                else nan_days.copy()
+            ),
+            # Aggregated by Open-Meteo; the hours behind it are not reported
+            "n_hours": nan_days.copy(),
+        }
+    )
+
+
+def _check_aggregation(aggregation):
+    """Raise ValueError for an aggregation not in OPENMETEO_AGGREGATIONS."""
+    if aggregation not in OPENMETEO_AGGREGATIONS:
+        raise ValueError(
+            f"Unknown Open-Meteo aggregation {aggregation!r}, expected one of {OPENMETEO_AGGREGATIONS}."
+        )
+
+
+def _model_label(model=None, aggregation="hourly"):
+    """
+    Value of the output `model` column: the requested model ("" for the
+    API default), suffixed with ":daily" for server-side daily aggregation.
+    """
+    label = model if model is not None else ""
+    if aggregation == "daily":
+        return f"{label}:daily" if label else "daily"
+    return label
+
+
+def _archive_params(locations, start_date, end_date, model=None, aggregation="hourly"):
+    """Query parameters of one archive request for [(lat, lon), ...]."""
+    variables = OPENMETEO_DAILY_VARIABLES if aggregation == "daily" else OPENMETEO_HOURLY_VARIABLES
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lon) for _, lon in locations),
+        "start_date": start_date,
+        "end_date": end_date,
+        aggregation: ",".join(variables),
+        "wind_speed_unit": "ms",
+        "timezone": "UTC",
+        "timeformat": "unixtime",
+    }
+    if model:
+        params["models"] = model
+    return params
+
+
+def _location_batches(
+    locations,
+    start_date,
+    end_date,
+    model=None,
+    base_url=OPENMETEO_ARCHIVE_URL,
+    max_locations=OPENMETEO_BATCH_MAX_LOCATIONS,
+    max_url_length=OPENMETEO_MAX_URL_LENGTH,
+    aggregation="hourly",
+):
+    """
+    Group location indices into multi-location requests holding at most
+    max_locations sites and whose URL stays within max_url_length.
+    A location always goes in some batch, even if alone it exceeds the limit.
+    """
+    empty_url = requests.Request(
+        "GET", base_url, params=_archive_params([], start_date, end_date, model, aggregation)
+    ).prepare().url
+    # Each location adds its two values plus two URL-encoded commas (%2C).
+    batches = []
+    batch, url_length = [], len(empty_url)
+    for i, (lat, lon) in enumerate(locations):
+        added = len(str(lat)) + len(str(lon)) + 6
+        if batch and (len(batch) >= max_locations or url_length + added > max_url_length):
+            batches.append(batch)
+            batch, url_length = [], len(empty_url)
+        batch.append(i)
+        url_length += added
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _fetch_openmeteo_chunk(
+    session,
+    locations,
+    start_date,
+    end_date,
+    model=None,
+    base_url=OPENMETEO_ARCHIVE_URL,
+    aggregation="hourly",
+    deadline=None,
+):
+    """
+    Download and aggregate one period for [(lat, lon), ...] in a single
+    request (runs in a worker thread, so the hourly payload is reduced to
+    daily rows as soon as it arrives).
+
+    Returns one (daily aggregates, response metadata without the data
+    block) per location, in request order.
+    """
+    payload = _request_openmeteo(
+        session,
+        _archive_params(locations, start_date, end_date, model, aggregation),
+        base_url,
+        deadline,
+        aggregation,
+    )
+    # One location: a single object; several: a list in request order.
+    if isinstance(payload, dict):
+        payload = [payload]
+    if len(payload) != len(locations):
+        raise ValueError(
+            f"Open-Meteo returned {len(payload)} locations for {len(locations)} requested."
+        )
+
+    block = _daily_block if aggregation == "daily" else _aggregate_hourly_block
+    results = []
+    for item in payload:
+        daily = block(item.pop(aggregation, None))
+        item.pop(f"{aggregation}_units", None)
+        results.append((daily, item))
+    return results
+
+
+def _fetch_openmeteo_locations(
+    locations,
+    start_date,
+    end_date,
+    model=None,
+    chunk_years=OPENMETEO_CHUNK_YEARS,
+    max_workers=OPENMETEO_MAX_WORKERS,
+    base_url=OPENMETEO_ARCHIVE_URL,
+    max_locations=OPENMETEO_BATCH_MAX_LOCATIONS,
+    max_url_length=OPENMETEO_MAX_URL_LENGTH,
+    aggregation="hourly",
+    timeout=None,
+):
+    """
+    Daily aggregates of several locations: one request per (location batch,
+    period chunk), run concurrently over a shared session. timeout (s)
+    bounds the whole download: requests still running or not yet started
+    when it expires fail with TimeoutError.
+
+    Returns a list aligned with `locations`: (concatenated daily aggregates,
+    metadata of the first chunk), or the exception that made one of the
+    requests of that location fail.
+    """
+    _check_aggregation(aggregation)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    chunks = _date_chunks(start_date, end_date, chunk_years)
+    if not chunks:
+        raise ValueError(f"Empty Open-Meteo period: {start_date} -> {end_date}")
+    batches = _location_batches(
+        locations,
+        start_date,
+        end_date,
+        model,
+        base_url,
+        max_locations,
+        max_url_length,
+        aggregation,
+    )
 
+    tasks = [(batch, chunk) for batch in batches for chunk in chunks]
+    max_workers = max(1, min(int(max_workers), len(tasks)))
+    per_location = [dict() for _ in locations]
+    errors = {}
+    with _make_session(max_workers) as session, ThreadPoolExecutor(max_workers) as pool:
+        futures = {
+            pool.submit(
+                _fetch_openmeteo_chunk,
+                session,
+                [locations[i] for i in batch],
+                chunk_start,
+                chunk_end,
+                model,
+                base_url,
+                aggregation,
+                deadline,
+            ): (batch, chunk_start)
+            for batch, (chunk_start, chunk_end) in tasks
+        }
+        for future in as_completed(futures):
+            batch, chunk_start = futures[future]
+            try:
+                chunk_results = future.result()
+            except Exception as e:
+                for i in batch:
+                    errors.setdefault(i, e)
+                continue
+            for i, result in zip(batch, chunk_results):
+                per_location[i][chunk_start] = result
+
+    results = []
+    for i in range(len(locations)):
+        if i in errors:
+            results.append(errors[i])
+            continue
+        ordered = [per_location[i][chunk_start] for chunk_start, _ in chunks]
+        daily = pd.concat([d for d, _ in ordered], ignore_index=True)
+        results.append((daily, ordered[0][1]))
+    return results
+
+
+def _finalize_openmeteo_daily(
+    df_daily_agg,
+    meta,
+    lat,
+    lon,
+    model=None,
+    gust_correction_factor=None,
+    mean_correction_factor=None,
+    aggregation="hourly",
+):
+    """Correction factors and metadata columns (standard Open-Meteo schema)."""
     if mean_correction_factor is not None:
         factor_mean = float(mean_correction_factor)
         print(f"Applying mean correction factor: x{factor_mean}")
@@ -133,11 +456,11 @@ def fetch_openmeteo_data(
     else:
         df_daily_agg["gust_correction_factor"] = 1.0
 
-    timezone = data_hourly_json.get("timezone", "UTC")
-    utc_offset_seconds = data_hourly_json.get("utc_offset_seconds", 0)
-    elevation = data_hourly_json.get("elevation", np.nan)
-    meta_lat = data_hourly_json.get("latitude", lat)
-    meta_lon = data_hourly_json.get("longitude", lon)
+    timezone = meta.get("timezone", "UTC")
+    utc_offset_seconds = meta.get("utc_offset_seconds", 0)
+    elevation = meta.get("elevation", np.nan)
+    meta_lat = meta.get("latitude", lat)
+    meta_lon = meta.get("longitude", lon)
 
     df_daily_agg["source"] = "open-meteo"
     df_daily_agg["latitude"] = float(meta_lat)
@@ -145,12 +468,172 @@ def fetch_openmeteo_data(
     df_daily_agg["elevation"] = float(elevation) if pd.notnull(elevation) else np.nan
     df_daily_agg["timezone"] = timezone
     df_daily_agg["utc_offset_seconds"] = int(utc_offset_seconds)
-    df_daily_agg["model"] = model if model is not None else ""
+    df_daily_agg["model"] = _model_label(model, aggregation)
+    return df_daily_agg
+
+
+def fetch_openmeteo_data(
+    lat,
+    lon,
+    start_date,
+    end_date,
+    model=None,
+    gust_correction_factor=None,
+    mean_correction_factor=None,
+    chunk_years=OPENMETEO_CHUNK_YEARS,
+    max_workers=OPENMETEO_MAX_WORKERS,
+    base_url=OPENMETEO_ARCHIVE_URL,
+    aggregation="hourly",
+    timeout=None,
+):
+    """
+    Download Open-Meteo hourly data (archive API) and build standardized
+    daily aggregates for the statistics engine.
+
+    Key assumptions (Open-Meteo docs):
+    - Hourly variables (all at 10 m):
+        * wind_speed_10m     : instantaneous model wind speed at the given hour
+        * wind_direction_10m : instantaneous direction (deg)
+        * wind_gusts_10m     : max gust over the previous hour
+    - Units: m/s via wind_speed_unit=ms.
+    - Timezone: UTC for consistency with other sources.
+
+    Requests:
+    - The period is split into chunks of chunk_years calendar years
+      (_date_chunks), fetched concurrently by up to max_workers threads over
+      one shared session with timeouts and retries (backoff on 429 / 5xx).
+    - Each chunk is aggregated to daily as soon as it arrives; the daily
+      chunks are then concatenated, so peak memory and the cost of a failure
+      scale with one chunk. A chunk failing after its retries fails the call.
+    - timeout (s), if given, bounds the whole download (TimeoutError).
+
+    Daily aggregates produced:
+        * windspeed_mean      : daily MAX of wind_speed_10m (m/s)
+        * windspeed_daily_avg : daily average of wind_speed_10m (m/s)
+        * wind_direction      : daily vector-mean direction (deg)
+        * windspeed_gust      : daily MAX of wind_gusts_10m (m/s)
+        * n_hours             : number of hourly samples per day
+
+    aggregation="daily" requests Open-Meteo's daily variables instead
+    (about 24x less data to transfer and parse):
+        * windspeed_mean      : wind_speed_10m_max (m/s)
+        * windspeed_daily_avg : wind_speed_10m_mean (m/s)
+        * wind_direction      : wind_direction_10m_dominant (deg)
+        * windspeed_gust      : wind_gusts_10m_max (m/s)
+        * n_hours             : NaN (not reported by the API)
+    The output `model` column then ends with ":daily" (see _model_label).
+
+    Optional factors:
+    - mean_correction_factor: multiply windspeed_mean and windspeed_daily_avg by this factor.
+    - gust_correction_factor: if provided, only used as fallback when daily gust is NaN
+      (windspeed_gust = factor * windspeed_mean). Existing gusts are not modified.
+    """
+    result = _fetch_openmeteo_locations(
+        [(lat, lon)],
+        start_date,
+        end_date,
+        model=model,
+        chunk_years=chunk_years,
+        max_workers=max_workers,
+        base_url=base_url,
+        aggregation=aggregation,
+        timeout=timeout,
+    )[0]
+    if isinstance(result, Exception):
+        raise result
+
+    df_daily_agg, meta = result
+    df_daily_agg = _finalize_openmeteo_daily(
+        df_daily_agg,
+        meta,
+        lat,
+        lon,
+        model=model,
+        gust_correction_factor=gust_correction_factor,
+        mean_correction_factor=mean_correction_factor,
+        aggregation=aggregation,
+    )
 
     print("Open-Meteo data downloaded and aggregated successfully (v1-audit).")
     return df_daily_agg
 
 
+def fetch_openmeteo_batch(
+    locations,
+    start_date,
+    end_date,
+    model=None,
+    gust_correction_factor=None,
+    mean_correction_factor=None,
+    chunk_years=OPENMETEO_CHUNK_YEARS,
+    max_workers=OPENMETEO_MAX_WORKERS,
+    base_url=OPENMETEO_ARCHIVE_URL,
+    max_locations=OPENMETEO_BATCH_MAX_LOCATIONS,
+    max_url_length=OPENMETEO_MAX_URL_LENGTH,
+    aggregation="hourly",
+):
+    """
+    fetch_openmeteo_data for many sites at once.
+
+    locations: [(lat, lon), ...]. Sites are grouped into multi-location
+    requests (comma-separated latitude/longitude lists) of at most
+    max_locations sites and max_url_length URL characters, each split into
+    period chunks like fetch_openmeteo_data; the responses are split back
+    into one daily frame per site with the same schema.
+
+    Returns a list aligned with `locations`; the sites of a request that
+    failed (after retries) get None, and each failed request is reported
+    with all of its sites.
+    """
+    results = _fetch_openmeteo_locations(
+        locations,
+        start_date,
+        end_date,
+        model=model,
+        chunk_years=chunk_years,
+        max_workers=max_workers,
+        base_url=base_url,
+        max_locations=max_locations,
+        max_url_length=max_url_length,
+        aggregation=aggregation,
+    )
+
+    # The sites of one failed request share its exception object
+    failed = {}
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            failed.setdefault(id(result), (result, []))[1].append(i)
+    for error, indices in failed.values():
+        print(
+            f"Open-Meteo batch request failed ({error}): all {len(indices)} site(s) "
+            f"of this batch failed: {[locations[i] for i in indices]}."
+        )
+
+    frames = []
+    for (lat, lon), result in zip(locations, results):
+        if isinstance(result, Exception):
+            frames.append(None)
+            continue
+        df_daily_agg, meta = result
+        frames.append(
+            _finalize_openmeteo_daily(
+                df_daily_agg,
+                meta,
+                lat,
+                lon,
+                model=model,
+                gust_correction_factor=gust_correction_factor,
+                mean_correction_factor=mean_correction_factor,
+                aggregation=aggregation,
+            )
+        )
+
+    n_ok = sum(df is not None for df in frames)
+    print(f"Open-Meteo batch: {n_ok}/{len(locations)} site(s) downloaded and aggregated.")
+
+    return frames
+
+
 def save_openmeteo_data(
     site_name,
     site_folder,
@@ -161,6 +644,8 @@ def save_openmeteo_data(
     model=None,
     gust_correction_factor=None,
     mean_correction_factor=None,
+    aggregation="hourly",
+    timeout=None,
 ):
     """
     Convenience wrapper:
@@ -178,8 +663,15 @@ def save_openmeteo_data(
         model=model,
         gust_correction_factor=gust_correction_factor,
         mean_correction_factor=mean_correction_factor,
+        aggregation=aggregation,
+        timeout=timeout,
     )
 
+    return _save_openmeteo_csv(df, site_name, site_folder, lat, lon)
+
+
+def _save_openmeteo_csv(df, site_name, site_folder, lat, lon):
+    """Write openmeteo_{site_name}.csv and return the summary dict."""
     filename = f"openmeteo_{site_name}.csv"
     filepath = os.path.join(site_folder, filename)
     df.to_csv(filepath, index=False)
@@ -191,3 +683,39 @@ def save_openmeteo_data(
         "latitude": lat,
         "longitude": lon,
     }
+
+
+def save_openmeteo_batch(
+    sites,
+    start_date,
+    end_date,
+    model=None,
+    gust_correction_factor=None,
+    mean_correction_factor=None,
+    aggregation="hourly",
+):
+    """
+    save_openmeteo_data for many sites with multi-location requests
+    (fetch_openmeteo_batch).
+
+    sites: [(site_name, site_folder, lat, lon), ...]. Returns the summary
+    dicts in the same order (None for sites whose download failed).
+    """
+    frames = fetch_openmeteo_batch(
+        [(lat, lon) for _, _, lat, lon in sites],
+        start_date,
+        end_date,
+        model=model,
+        gust_correction_factor=gust_correction_factor,
+        mean_correction_factor=mean_correction_factor,
+        aggregation=aggregation,
+    )
+
+    summaries = []
+    for (site_name, site_folder, lat, lon), df in zip(sites, frames):
+        if df is None:
+            summaries.append(None)
+            continue
+        os.makedirs(site_folder, exist_ok=True)
+        summaries.append(_save_openmeteo_csv(df, site_name, site_folder, lat, lon))
+    return summaries
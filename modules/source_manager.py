@@ -1,12 +1,115 @@
 # source_manager.py
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
 import pandas as pd
+import requests
 
 from modules.meteostat_fetcher import fetch_meteostat_data
 from modules.era5_fetcher import save_era5_data
+from modules.era5_job_queue import STATE_SUBMITTED, collect_era5_job, era5_job_key, load_era5_job
 from modules.nasa_power_fetcher import fetch_nasa_power_data
 from modules.openmeteo_fetcher import save_openmeteo_data
 
+# Per-source wall-time limits (s). ERA5 can wait in the CDS queue for a long
+# time; the others are plain HTTP APIs. Meteostat has none: its client takes
+# no timeout, so its work could not be stopped.
+SOURCE_TIMEOUTS_S = {
+    "openmeteo": 600,
+    "nasa_power": 300,
+    "era5": 3 * 3600,
+}
+
+
+def _timed_out_entry(key, limit):
+    """Result entry of a source that ran out of time (not a normal failure)."""
+    print(f"{key} timed out after {limit} s - source skipped.")
+    return {"data": None, "timed_out": True, "timeout_s": limit}
+
+
+def _run_source_tasks(tasks, concurrent=False, timeouts=None):
+    """
+    Run independent source fetches and collect their results.
+
+    `tasks` maps a source key to a callable taking the source's time budget
+    in seconds (SOURCE_TIMEOUTS_S, overridable with `timeouts`) and
+    returning the result entry (e.g. {"data": df}) or None. Each callable
+    handles and reports its own errors, and passes the budget to its
+    blocking calls (HTTP timeouts, ERA5 queue wait and polling) so the work
+    itself stops; a source that runs out of time gets a {"data": None,
+    "timed_out": True, "timeout_s": ...} entry. A source without a budget
+    (None) runs to completion.
+
+    In concurrent mode all tasks start at once on a thread pool. The wait
+    for each result is also bounded by its budget, counted from the start
+    of the batch, as a backstop for a task that overruns its own budget.
+    Only give budgets to tasks that honour them: a thread that keeps
+    running is still joined at interpreter exit.
+    """
+    limits = dict(SOURCE_TIMEOUTS_S)
+    limits.update(timeouts or {})
+    results = {}
+
+    if not concurrent:
+        for key, task in tasks.items():
+            entry = task(limits.get(key))
+            if entry is not None:
+                results[key] = entry
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=max(1, len(tasks)))
+    try:
+        futures = {key: pool.submit(task, limits.get(key)) for key, task in tasks.items()}
+        started = time.monotonic()
+        for key, future in futures.items():
+            limit = limits.get(key)
+            remaining = None if limit is None else max(0.0, started + limit - time.monotonic())
+            try:
+                entry = future.result(timeout=remaining)
+            except FuturesTimeoutError:
+                results[key] = _timed_out_entry(key, limit)
+                continue
+            if entry is not None:
+                results[key] = entry
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def _fetch_meteostat_stations(
+    station_ids, site_name, site_folder, lat, lon, start_date, end_date
+):
+    """
+    Meteostat stations {rank: station_id} in one request, as
+    {"meteostat{rank}": {"data", "station_id"}} for stations with data.
+    """
+    ranks = list(station_ids)
+    try:
+        df_meteo = fetch_meteostat_data(
+            site_name,
+            site_folder,
+            lat,
+            lon,
+            start_date,
+            end_date,
+            station_ids=[station_ids[rank] for rank in ranks],
+            ranks=ranks,
+        )
+    except Exception as e:
+        print(f"Meteostat error: {e}")
+        return None
+
+    entries = {}
+    for rank, station_id in station_ids.items():
+        df = df_meteo.get(f"meteostat{rank}")
+        if df is not None and not df.empty:
+            entries[f"meteostat{rank}"] = {"data": df, "station_id": station_id}
+        else:
+            print(f"Meteostat station{rank} data ({station_id}) missing.")
+    return entries
+
 
 def fetch_observed_sources(
     site_info,
@@ -19,65 +122,42 @@ def fetch_observed_sources(
     meteostat_id1=None,
     meteostat_id2=None,
 ):
-    observed = {}
-
-    # Meteostat Station 1
-    try:
-        if meteostat_id1:
-            df_meteo = fetch_meteostat_data(
-                site_name,
-                site_folder,
-                lat,
-                lon,
-                start_date,
-                end_date,
-                station_ids=[meteostat_id1],
-            )
-            df1 = df_meteo.get("meteostat1")
-            if df1 is not None and not df1.empty:
-                observed["meteostat1"] = {"data": df1, "station_id": meteostat_id1}
-            else:
-                print(f"Meteostat station1 data ({meteostat_id1}) missing.")
-    except Exception as e:
-        print(f"Meteostat 1 error: {e}")
+    """
+    Fetch the observed sources (Meteostat stations 1 and 2).
 
-    # Meteostat Station 2
-    try:
-        if meteostat_id2:
-            df_meteo = fetch_meteostat_data(
-                site_name,
-                site_folder,
-                lat,
-                lon,
-                start_date,
-                end_date,
-                station_ids=[meteostat_id2],
-            )
-            df2 = df_meteo.get("meteostat1")
-            if df2 is not None and not df2.empty:
-                observed["meteostat2"] = {"data": df2, "station_id": meteostat_id2}
-            else:
-                print(f"Meteostat station2 data ({meteostat_id2}) missing.")
-    except Exception as e:
-        print(f"Meteostat 2 error: {e}")
+    Both stations come from a single multi-station Meteostat request, run
+    in the calling thread without a time budget (the Meteostat client
+    takes no timeout).
+    """
+    station_ids = {
+        rank: station_id
+        for rank, station_id in ((1, meteostat_id1), (2, meteostat_id2))
+        if station_id
+    }
+    if not station_ids:
+        return {}
 
-    return observed
+    return (
+        _fetch_meteostat_stations(
+            station_ids, site_name, site_folder, lat, lon, start_date, end_date
+        )
+        or {}
+    )
 
 
-def fetch_model_source(
-    site_info,
+def _fetch_openmeteo(
     site_name,
     site_folder,
     lat,
     lon,
     start_date,
     end_date,
-    openmeteo_model=None,
-    gust_correction_factor=None,
+    openmeteo_model,
+    gust_correction_factor,
+    openmeteo_aggregation="hourly",
+    timeout=None,
 ):
-    model = {}
-
-    # Open-Meteo with optional model and gust factor
+    """Open-Meteo with optional model, gust factor and aggregation mode."""
     try:
         df_openmeteo = save_openmeteo_data(
             site_name,
@@ -88,27 +168,53 @@ def fetch_model_source(
             end_date,
             model=openmeteo_model,
             gust_correction_factor=gust_correction_factor,
+            aggregation=openmeteo_aggregation,
+            timeout=timeout,
         )
         if df_openmeteo and os.path.exists(df_openmeteo["filepath"]):
             df = pd.read_csv(df_openmeteo["filepath"])
-            model["openmeteo"] = {"data": df}
-        else:
-            print("No OpenMeteo data retrieved.")
+            return {"data": df}
+        print("No OpenMeteo data retrieved.")
+    except TimeoutError:
+        return _timed_out_entry("openmeteo", timeout)
     except Exception as e:
         print(f"OpenMeteo error: {e}")
+    return None
 
-    # NASA POWER
+
+def _fetch_nasa_power(site_name, site_folder, lat, lon, start_date, end_date, timeout=None):
+    """NASA POWER daily series."""
     try:
-        df_nasa_result = fetch_nasa_power_data(site_name, site_folder, lat, lon, start_date, end_date)
+        df_nasa_result = fetch_nasa_power_data(
+            site_name, site_folder, lat, lon, start_date, end_date, timeout=timeout
+        )
         if df_nasa_result and os.path.exists(df_nasa_result["filepath"]):
             df = pd.read_csv(df_nasa_result["filepath"])
-            model["nasa_power"] = {"data": df}
-        else:
-            print("Empty dataset for NASA POWER")
+            return {"data": df}
+        print("Empty dataset for NASA POWER")
+    except requests.Timeout:
+        return _timed_out_entry("nasa_power", timeout)
     except Exception as e:
         print(f"NASA POWER error: {e}")
+    return None
+
 
-    # ERA5 with cached files
+def _fetch_era5(
+    site_name,
+    site_folder,
+    lat,
+    lon,
+    start_date,
+    end_date,
+    era5_jobs_dir=None,
+    timeout=SOURCE_TIMEOUTS_S["era5"],
+):
+    """
+    ERA5 with cached files. With era5_jobs_dir, the request is expected to
+    have been queued up front (Era5JobQueue) and its ZIP is collected,
+    waiting at most `timeout` seconds. Otherwise the request is sent
+    directly and polled for at most `timeout` seconds (save_era5_data).
+    """
     try:
         filepath = os.path.join(site_folder, f"era5_{site_name}.csv")
         dailypath = os.path.join(site_folder, f"era5_daily_{site_name}.csv")
@@ -117,7 +223,27 @@ def fetch_model_source(
             df_era5 = pd.read_csv(filepath)
             df_era5_daily = pd.read_csv(dailypath)
         else:
-            era5_result = save_era5_data(site_name, site_folder, lat, lon, start_date, end_date)
+            if era5_jobs_dir:
+                era5_result = collect_era5_job(
+                    era5_jobs_dir,
+                    site_name,
+                    site_folder,
+                    lat,
+                    lon,
+                    start_date,
+                    end_date,
+                    timeout=timeout,
+                )
+                if era5_result is None:
+                    job = load_era5_job(
+                        era5_jobs_dir, era5_job_key(lat, lon, start_date, end_date)
+                    )
+                    if job is not None and job["state"] == STATE_SUBMITTED:
+                        return _timed_out_entry("era5", timeout)
+            else:
+                era5_result = save_era5_data(
+                    site_name, site_folder, lat, lon, start_date, end_date, timeout=timeout
+                )
             if era5_result and os.path.exists(era5_result["filepath"]):
                 df_era5 = pd.read_csv(era5_result["filepath"])
                 df_era5_daily = pd.read_csv(era5_result["filepath_daily"])
@@ -126,8 +252,62 @@ def fetch_model_source(
                 df_era5, df_era5_daily = None, None
 
         if df_era5 is not None and not df_era5.empty:
-            model["era5"] = {"data": df_era5, "daily": df_era5_daily}
+            return {"data": df_era5, "daily": df_era5_daily}
+    except TimeoutError:
+        return _timed_out_entry("era5", timeout)
     except Exception as e:
         print(f"ERA5 error: {e}")
+    return None
+
+
+def fetch_model_source(
+    site_info,
+    site_name,
+    site_folder,
+    lat,
+    lon,
+    start_date,
+    end_date,
+    openmeteo_model=None,
+    gust_correction_factor=None,
+    concurrent=False,
+    timeouts=None,
+    era5_jobs_dir=None,
+    openmeteo_aggregation="hourly",
+):
+    """
+    Fetch the model sources (Open-Meteo, NASA POWER, ERA5).
+
+    With concurrent=True the three sources start at once, so the wall time
+    is roughly that of the slowest one (usually ERA5). Each source is
+    bounded by its own timeout (see _run_source_tasks); a source that runs
+    out of time gets a "timed_out" entry without data.
+
+    era5_jobs_dir: directory of an Era5JobQueue where the ERA5 request of
+    this site was submitted beforehand (see era5_job_queue).
+
+    openmeteo_aggregation: "hourly" (local daily aggregation) or "daily"
+    (Open-Meteo daily variables), see fetch_openmeteo_data.
+    """
+    tasks = {
+        "openmeteo": lambda timeout: _fetch_openmeteo(
+            site_name,
+            site_folder,
+            lat,
+            lon,
+            start_date,
+            end_date,
+            openmeteo_model,
+            gust_correction_factor,
+            openmeteo_aggregation,
+            timeout,
+        ),
+        "nasa_power": lambda timeout: _fetch_nasa_power(
+            site_name, site_folder, lat, lon, start_date, end_date, timeout
+        ),
+        "era5": lambda timeout: _fetch_era5(
+            site_name, site_folder, lat, lon, start_date, end_date, era5_jobs_dir, timeout
+        ),
+    }
 
-    return model
+    return _run_source_tasks(tasks, concurrent=concurrent, timeouts=timeouts)
@@ -1,6 +1,15 @@
+import contextlib
+import json
 import os
+import time
+import numpy as np
 import pandas as pd
 from geopy.distance import geodesic
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON decoding of API responses
+    orjson = None
 
 def ensure_directory(path):
     if not os.path.exists(path):
@@ -19,3 +28,57 @@ def calculate_distance_km(coord1, coord2):
     except Exception as e:
         print(f"Error while computing distance: {e}")
         return None
+
+
+def loads_json(content):
+    """
+    Decode a JSON API response body (bytes or str), with orjson when
+    installed and the standard json module otherwise.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def json_float_array(values, dtype=np.float64):
+    """
+    Decoded JSON numbers (list, or dict values) as a typed NumPy array,
+    filled in one pass into a preallocated buffer. null becomes NaN.
+    """
+    if isinstance(values, dict):
+        values = values.values()
+    return np.fromiter(values, dtype=dtype, count=len(values))
+
+
+@contextlib.contextmanager
+def file_lock(lock_path, poll_s=1.0, stale_s=3600.0, timeout=None):
+    """
+    Cross-process lock held by creating lock_path exclusively (waiting
+    while another process holds it). A lock file older than stale_s is
+    considered abandoned and taken over. The file is removed on exit.
+    With a timeout (s), TimeoutError is raised if the lock is still held
+    by someone else after that long.
+    """
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_s:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Lock {lock_path} still held after {timeout} s")
+            time.sleep(poll_s)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
@@ -1,22 +1,44 @@
+import argparse
+import contextlib
+import io
 import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
 import pandas as pd
 
 from modules.utils import load_sites_from_csv
-from modules.meteostat_fetcher import get_nearest_stations_info
+from modules.meteostat_fetcher import configure_meteostat_cache, get_nearest_stations_info
 from modules.source_manager import fetch_observed_sources, fetch_model_source
+from modules.era5_job_queue import Era5JobQueue, DEFAULT_JOBS_DIR as ERA5_JOBS_DIR
+from modules.openmeteo_fetcher import OPENMETEO_AGGREGATIONS, save_openmeteo_batch
 from modules.globe_visualizer import visualize_sites_plotly
 from modules.tkinter_ui import get_date_range_from_user
 from modules.station_profiler import generate_station_csv, generate_station_docx
 
 # Specific sources
-from modules.noaa_station_finder import load_isd_stations, find_nearest_isd_stations
-from modules.noaa_isd_fetcher import fetch_isd_series
+from modules.noaa_station_finder import (
+    load_isd_stations,
+    build_isd_station_index,
+    load_isd_inventory,
+    select_isd_stations_by_availability,
+    select_isd_stations_by_coverage,
+    station_active_years,
+)
+from modules.noaa_isd_fetcher import fetch_isd_series, update_isd_series
+from modules.noaa_isd_cache import DEFAULT_CACHE_DIR as NOAA_ISD_CACHE_DIR
 #from modules.meteo_france_station_finder import get_mf_stations_list, find_closest_mf_station
 #from modules.meteo_france_fetcher import fetch_meteo_france_data
 
 from modules.analysis_runner import run_analysis_for_site
 from modules.report_generator import generate_report
 
+# Threads used for the independent source downloads of one site
+DEFAULT_FETCH_WORKERS = 4
+
+# Optional NOAA inventory (monthly counts per station) for station selection
+ISD_INVENTORY_CSV = os.path.join("data", "isd-inventory.csv")
+
 
 def export_site_data(site_data, site_folder):
     os.makedirs(site_folder, exist_ok=True)
@@ -29,12 +51,6 @@ def export_site_data(site_data, site_folder):
             df.to_csv(filepath, index=False)
             print(f"Generated file: {filepath}")
             paths.append(filepath)
-
-            if "noaa_station" in key:
-                raw_path = os.path.join(site_folder, f"raw_{filename}")
-                if hasattr(df, "_raw") and isinstance(df._raw, pd.DataFrame):
-                    df._raw.to_csv(raw_path, index=False)
-                    print(f"NOAA ISD raw CSV saved: {raw_path}")
         else:
             print(f"No data for {key} - file not generated.")
 
@@ -58,8 +74,477 @@ def load_existing_data(site_folder, site_name, key):
     return None
 
 
-def main():
+def _new_site_data(site, start, end):
+    """Base site record (also used for sites whose processing failed)."""
+    return {
+        "name": site["name"],
+        "country": site["country"],
+        "latitude": float(site["latitude"]),
+        "longitude": float(site["longitude"]),
+        "start": start,
+        "end": end,
+        "reference": site["reference"],
+        "meteostat1": None,
+        "meteostat2": None,
+        "noaa1": None,
+        "noaa2": None,
+        "data": {},
+    }
+
+
+def _fetch_noaa_station(i, station, name, site_folder, start, end):
+    """
+    Reuse, extend or download the NOAA ISD series of one candidate station:
+    daily series noaa_station{i}_{name}.csv plus its hourly archive
+    raw_noaa_station{i}_{name}.csv, both written by the fetcher.
+    An existing file of the same station covering the start of the period
+    is only completed with the years it is missing (otherwise it is
+    downloaded again), and only years within the station's BEGIN/END
+    window are requested.
+    """
+    years = station_active_years(station, start[:4], end[:4])
+    filename = f"noaa_station{i}_{name}.csv"
+    filepath = os.path.join(site_folder, filename)
+    if os.path.exists(filepath):
+        print(f"NOAA file already present - fetching missing years only: {filepath}")
+        df = update_isd_series(
+            filepath,
+            usaf=station["usaf"],
+            wban=station["wban"],
+            start_date=start,
+            end_date=end,
+            output_dir=site_folder,
+            site_name=name,
+            station_rank=i,
+            save_hourly=True,
+            station_metadata=station,
+            verbose=True,
+            years_available=years,
+            cache_dir=NOAA_ISD_CACHE_DIR,
+        )
+        if df is not None:
+            return df
+
+    if not years:
+        print(f"NOAA station {i} ({station['station_id']}) has no data in the period.")
+        return None
+
+    print(f"Downloading NOAA Station {i}...")
+    return fetch_isd_series(
+        site_name=name,
+        usaf=station["usaf"],
+        wban=station["wban"],
+        years=years,
+        output_dir=site_folder,
+        verbose=True,
+        save_hourly=True,
+        station_rank=i,
+        station_metadata=station,
+        cache_dir=NOAA_ISD_CACHE_DIR,
+    )
+
+
+def _fetch_observed(site, name, site_folder, lat, lon, start, end, station1, station2):
+    """Meteostat stations 1 / 2 (existing CSVs first, then download)."""
+    observed = {}
+    for key in ["meteostat1", "meteostat2"]:
+        df = load_existing_data(site_folder, name, key)
+        if df is not None:
+            observed[key] = {"data": df}
+
+    if not all(k in observed for k in ["meteostat1", "meteostat2"]):
+        try:
+            fetched_observed = fetch_observed_sources(
+                site_info=site,
+                site_name=name,
+                site_folder=site_folder,
+                lat=lat,
+                lon=lon,
+                start_date=start,
+                end_date=end,
+                meteostat_id1=station1["id"],
+                meteostat_id2=station2["id"],
+            )
+            observed.update(fetched_observed)
+        except Exception as e:
+            print(f"Error fetching observed sources: {e}")
+    return observed
+
+
+def _fetch_model(
+    site,
+    name,
+    site_folder,
+    lat,
+    lon,
+    start,
+    end,
+    era5_jobs_dir=None,
+    openmeteo_aggregation="hourly",
+):
+    """Open-Meteo, NASA POWER and ERA5 (existing CSVs first, then download)."""
+    model = {}
+    for key in ["openmeteo", "nasa_power", "era5"]:
+        df = load_existing_data(site_folder, name, key)
+        if df is not None:
+            model[key] = {"data": df}
+
+    if not all(k in model for k in ["openmeteo", "nasa_power", "era5"]):
+        try:
+            fetched_model = fetch_model_source(
+                site_info=site,
+                site_name=name,
+                site_folder=site_folder,
+                lat=lat,
+                lon=lon,
+                start_date=start,
+                end_date=end,
+                openmeteo_model=None,
+                gust_correction_factor=None,
+                concurrent=True,
+                era5_jobs_dir=era5_jobs_dir,
+                openmeteo_aggregation=openmeteo_aggregation,
+            )
+            model.update(fetched_model)
+        except Exception as e:
+            print(f"Error fetching model source: {e}")
+    return model
+
+
+def _site_paths(site):
+    """(site_folder, report_docx_path) of a site."""
+    site_ref = f"{site['reference']}_{site['name']}"
+    site_folder = os.path.join("data", site_ref)
+    return site_folder, os.path.join(site_folder, "report", f"{site_ref}.docx")
+
+
+def submit_era5_jobs(sites, start, end, jobs_dir=ERA5_JOBS_DIR):
+    """
+    Queue the ERA5 requests of every site still to process, without
+    waiting, and start polling them in the background. Returns the queue.
+    """
+    queue = Era5JobQueue(jobs_dir)
+    for site in sites:
+        site_folder, report_docx_path = _site_paths(site)
+        era5_path = os.path.join(site_folder, f"era5_{site['name']}.csv")
+        if os.path.exists(report_docx_path) or os.path.exists(era5_path):
+            continue
+        queue.submit(float(site["latitude"]), float(site["longitude"]), start, end)
+    queue.start_polling()
+    return queue
+
+
+def prefetch_openmeteo(sites, start, end, aggregation="hourly"):
+    """
+    Download Open-Meteo for every site still to process with a few
+    multi-location requests, writing openmeteo_{name}.csv into each site
+    folder (then read by _fetch_model). Sites left out by a failed request
+    are fetched individually later.
+    """
+    pending = []
+    for site in sites:
+        site_folder, report_docx_path = _site_paths(site)
+        openmeteo_path = os.path.join(site_folder, f"openmeteo_{site['name']}.csv")
+        if os.path.exists(report_docx_path) or os.path.exists(openmeteo_path):
+            continue
+        pending.append(
+            (site["name"], site_folder, float(site["latitude"]), float(site["longitude"]))
+        )
+    if len(pending) < 2:
+        return
+
+    print(f"Open-Meteo batch download for {len(pending)} sites...")
+    try:
+        summaries = save_openmeteo_batch(pending, start, end, aggregation=aggregation)
+    except Exception as e:
+        print(
+            f"Open-Meteo batch download failed ({e}): all {len(pending)} sites "
+            "fall back to per-site Open-Meteo downloads."
+        )
+        return
+    failed = [name for (name, _, _, _), summary in zip(pending, summaries) if summary is None]
+    if failed:
+        print(
+            f"Open-Meteo: the {len(failed)} site(s) of failed batch requests fall back "
+            f"to per-site downloads: {', '.join(failed)}"
+        )
+
+
+def process_site(
+    site,
+    start,
+    end,
+    isd_index,
+    fetch_workers=DEFAULT_FETCH_WORKERS,
+    era5_jobs_dir=None,
+    isd_inventory=None,
+    openmeteo_aggregation="hourly",
+):
+    """
+    Full pipeline for one site: station lookup, source downloads, export,
+    analysis and report. Returns the site record used by the globe view.
+
+    The independent I/O-bound fetches (NOAA stations, Meteostat, models)
+    run concurrently on a thread pool of fetch_workers threads. With
+    era5_jobs_dir, ERA5 is collected from the jobs queued by
+    submit_era5_jobs instead of being requested here. With isd_inventory
+    (load_isd_inventory), NOAA stations are ranked by distance and by
+    coverage of the study period; without it, by distance and by the
+    probed availability of their yearly files.
+    openmeteo_aggregation selects the Open-Meteo mode ("hourly" or "daily").
+    """
+    name = site["name"]
+    country = site["country"]
+    lat = float(site["latitude"])
+    lon = float(site["longitude"])
+
+    print(f"\nProcessing site: {name} ({country})")
+
+    site_folder, report_docx_path = _site_paths(site)
+    os.makedirs(site_folder, exist_ok=True)
+
+    site_data = _new_site_data(site, start, end)
+
+    if os.path.exists(report_docx_path):
+        print(f"Analysis already done for {name} - skipping analysis and report.")
+        return site_data
+
+    stations = get_nearest_stations_info(lat, lon)
+    station1 = stations["station1"]
+    station2 = stations["station2"]
+
+    if isd_inventory is not None:
+        noaa_candidates = select_isd_stations_by_coverage(
+            lat, lon, isd_inventory, start, end, index=isd_index
+        )
+    else:
+        noaa_candidates = select_isd_stations_by_availability(lat, lon, start, end, index=isd_index)
+    noaa_station1 = noaa_candidates[0] if len(noaa_candidates) > 0 else None
+    noaa_station2 = noaa_candidates[1] if len(noaa_candidates) > 1 else None
+    print(f"NOAA station 1 candidate: {noaa_station1}")
+    print(f"NOAA station 2 candidate: {noaa_station2}")
+
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as pool:
+        noaa_futures = {
+            i: pool.submit(_fetch_noaa_station, i, station, name, site_folder, start, end)
+            for i, station in enumerate([noaa_station1, noaa_station2], 1)
+            if station
+        }
+        observed_future = pool.submit(
+            _fetch_observed, site, name, site_folder, lat, lon, start, end, station1, station2
+        )
+        model_future = pool.submit(
+            _fetch_model,
+            site,
+            name,
+            site_folder,
+            lat,
+            lon,
+            start,
+            end,
+            era5_jobs_dir,
+            openmeteo_aggregation,
+        )
+
+        noaa_data = {}
+        for i, future in noaa_futures.items():
+            try:
+                noaa_data[f"noaa_station{i}"] = future.result()
+            except Exception as e:
+                print(f"Error NOAA station {i}: {e}")
+
+        observed = observed_future.result()
+        model = model_future.result()
+
+    site_data.update(
+        {
+            "meteostat1": station1,
+            "meteostat2": station2,
+            "noaa1": noaa_station1,
+            "noaa2": noaa_station2,
+            "data": {
+                "meteostat1": observed.get("meteostat1", {}).get("data"),
+                "meteostat2": observed.get("meteostat2", {}).get("data"),
+                "noaa_station1": noaa_data.get("noaa_station1"),
+                "noaa_station2": noaa_data.get("noaa_station2"),
+                "openmeteo": model.get("openmeteo", {}).get("data"),
+                "nasa_power": model.get("nasa_power", {}).get("data"),
+                "era5": model.get("era5", {}).get("data"),
+            },
+        }
+    )
+
+    export_site_data(site_data, site_folder)
+
+    required_sources = [
+        "meteostat1",
+        "meteostat2",
+        "noaa_station1",
+        "noaa_station2",
+        "openmeteo",
+        "nasa_power",
+        "era5",
+    ]
+
+    missing_sources = [
+        key for key in required_sources if site_data["data"].get(key) is None
+    ]
+
+    if missing_sources:
+        print(
+            f"Missing sources for {name}: {missing_sources} - analysis and report still generated."
+        )
+
+    dataframes = {key: site_data["data"].get(key) for key in required_sources}
+
+    run_analysis_for_site(name, site_folder, site, dataframes)
+    generate_report(site_data, output_folder="data")
+
+    return site_data
+
+
+# Set in each worker process by _init_site_worker (avoids pickling the
+# station index for every task).
+_worker_isd_index = None
+_worker_isd_inventory = None
+
+
+def _init_site_worker(isd_index, isd_inventory=None):
+    global _worker_isd_index, _worker_isd_inventory
+    _worker_isd_index = isd_index
+    _worker_isd_inventory = isd_inventory
+    # Meteostat cache settings are class attributes, not inherited by
+    # spawned processes
+    configure_meteostat_cache()
+
+
+def _run_site_captured(
+    site, start, end, fetch_workers, era5_jobs_dir, openmeteo_aggregation="hourly"
+):
+    """
+    Process one site in a worker process, capturing its console output
+    (stdout and stderr, e.g. tqdm progress bars).
+    Returns {"site_data", "log", "error"}; failures do not propagate.
+
+    The per-source DataFrames are already exported to the site folder, so
+    they are dropped from the returned record instead of being pickled back.
+    """
+    buffer = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            site_data = process_site(
+                site,
+                start,
+                end,
+                _worker_isd_index,
+                fetch_workers,
+                era5_jobs_dir,
+                _worker_isd_inventory,
+                openmeteo_aggregation,
+            )
+        except Exception:
+            error = traceback.format_exc()
+            print(error)
+            site_data = _new_site_data(site, start, end)
+    site_data["data"] = {}
+    return {"site_data": site_data, "log": buffer.getvalue(), "error": error}
+
+
+def run_sites(
+    sites,
+    start,
+    end,
+    isd_index,
+    site_workers=1,
+    fetch_workers=DEFAULT_FETCH_WORKERS,
+    era5_jobs_dir=None,
+    isd_inventory=None,
+    openmeteo_aggregation="hourly",
+):
+    """
+    Run process_site for all sites and return their records in input order.
+
+    - site_workers <= 1: sites run one after another, output streamed live.
+    - site_workers > 1: sites run on a process pool; each site's console
+      output is collected and printed as one block when the site finishes.
+
+    A failing site is reported and still gets its base record, so the
+    final map includes every site. Failures are summarised at the end.
+    """
+    results = [None] * len(sites)
+    failures = {}
+
+    if site_workers <= 1:
+        for k, site in enumerate(sites):
+            try:
+                results[k] = process_site(
+                    site,
+                    start,
+                    end,
+                    isd_index,
+                    fetch_workers,
+                    era5_jobs_dir,
+                    isd_inventory,
+                    openmeteo_aggregation,
+                )
+            except Exception:
+                failures[site["name"]] = traceback.format_exc()
+                print(failures[site["name"]])
+                results[k] = _new_site_data(site, start, end)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=site_workers,
+            initializer=_init_site_worker,
+            initargs=(isd_index, isd_inventory),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _run_site_captured,
+                    site,
+                    start,
+                    end,
+                    fetch_workers,
+                    era5_jobs_dir,
+                    openmeteo_aggregation,
+                ): k
+                for k, site in enumerate(sites)
+            }
+            for future in as_completed(futures):
+                k = futures[future]
+                name = sites[k]["name"]
+                try:
+                    outcome = future.result()
+                except Exception:
+                    # Worker crash (e.g. killed process): no log to show
+                    outcome = {
+                        "site_data": _new_site_data(sites[k], start, end),
+                        "log": "",
+                        "error": traceback.format_exc(),
+                    }
+                print(f"\n===== Site {name} =====")
+                print(outcome["log"], end="")
+                if outcome["error"]:
+                    failures[name] = outcome["error"]
+                    if not outcome["log"]:
+                        print(outcome["error"])
+                results[k] = outcome["site_data"]
+
+    if failures:
+        print(f"\n{len(failures)} site(s) failed: {', '.join(failures)}")
+
+    return results
+
+
+def main(
+    site_workers=1,
+    fetch_workers=DEFAULT_FETCH_WORKERS,
+    era5_queue=False,
+    openmeteo_batch=False,
+    openmeteo_aggregation="hourly",
+):
     print("Current working directory:", os.getcwd())
+    configure_meteostat_cache()
     print("Loading sites from modele_sites.csv...")
     sites = load_sites_from_csv("modele_sites.csv")
     start, end = get_date_range_from_user()
@@ -68,175 +553,31 @@ def main():
         return
 
     isd_df = load_isd_stations("data/isd-history.csv")
-    all_sites_data = []
-
-    for site in sites:
-        name = site["name"]
-        country = site["country"]
-        lat = float(site["latitude"])
-        lon = float(site["longitude"])
-
-        print(f"\nProcessing site: {name} ({country})")
-
-        site_ref = f"{site['reference']}_{name}"
-        site_folder = os.path.join("data", site_ref)
-        os.makedirs(site_folder, exist_ok=True)
-
-        report_docx_path = os.path.join(site_folder, "report", f"{site_ref}.docx")
-        site_data = {
-            "name": name,
-            "country": country,
-            "latitude": lat,
-            "longitude": lon,
-            "start": start,
-            "end": end,
-            "reference": site["reference"],
-            "meteostat1": None,
-            "meteostat2": None,
-            "noaa1": None,
-            "noaa2": None,
-            "data": {},
-        }
-
-        already_processed = os.path.exists(report_docx_path)
-        if already_processed:
-            print(f"Analysis already done for {name} - skipping analysis and report.")
-        else:
-            stations = get_nearest_stations_info(lat, lon)
-            station1 = stations["station1"]
-            station2 = stations["station2"]
-
-            noaa_candidates = find_nearest_isd_stations(lat, lon, isd_df)
-            noaa_station1 = noaa_candidates[0] if len(noaa_candidates) > 0 else None
-            noaa_station2 = noaa_candidates[1] if len(noaa_candidates) > 1 else None
-            print(f"NOAA station 1 candidate: {noaa_station1}")
-            print(f"NOAA station 2 candidate: {noaa_station2}")
-
-            noaa_data = {}
-            for i, station in enumerate([noaa_station1, noaa_station2], 1):
-                if station:
-                    try:
-                        filename = f"noaa_station{i}_{name}.csv"
-                        filepath = os.path.join(site_folder, filename)
-                        if os.path.exists(filepath):
-                            print(f"NOAA file already present - reusing without download: {filepath}")
-                            df = pd.read_csv(filepath)
-                        else:
-                            print(f"Downloading NOAA Station {i}...")
-                            df = fetch_isd_series(
-                                site_name=name,
-                                usaf=station["usaf"],
-                                wban=station["wban"],
-                                years=list(range(int(start[:4]), int(end[:4]) + 1)),
-                                output_dir=site_folder,
-                                verbose=True,
-                                return_raw=True,
-                                station_rank=i,
-                            )
-                        noaa_data[f"noaa_station{i}"] = df
-                    except Exception as e:
-                        print(f"Error NOAA station {i}: {e}")
-
-            observed = {}
-            for key in ["meteostat1", "meteostat2"]:
-                df = load_existing_data(site_folder, name, key)
-                if df is not None:
-                    observed[key] = {"data": df}
-
-            if not all(k in observed for k in ["meteostat1", "meteostat2"]):
-                try:
-                    fetched_observed = fetch_observed_sources(
-                        site_info=site,
-                        site_name=name,
-                        site_folder=site_folder,
-                        lat=lat,
-                        lon=lon,
-                        start_date=start,
-                        end_date=end,
-                        meteostat_id1=station1["id"],
-                        meteostat_id2=station2["id"],
-                    )
-                    observed.update(fetched_observed)
-                except Exception as e:
-                    print(f"Error fetching observed sources: {e}")
-
-            model = {}
-            for key in ["openmeteo", "nasa_power", "era5"]:
-                df = load_existing_data(site_folder, name, key)
-                if df is not None:
-                    model[key] = {"data": df}
-
-            if not all(k in model for k in ["openmeteo", "nasa_power", "era5"]):
-                try:
-                    fetched_model = fetch_model_source(
-                        site_info=site,
-                        site_name=name,
-                        site_folder=site_folder,
-                        lat=lat,
-                        lon=lon,
-                        start_date=start,
-                        end_date=end,
-                        openmeteo_model=None,
-                        gust_correction_factor=None,
-                    )
-                    model.update(fetched_model)
-                except Exception as e:
-                    print(f"Error fetching model source: {e}")
-
-            site_data.update(
-                {
-                    "meteostat1": station1,
-                    "meteostat2": station2,
-                    "noaa1": noaa_station1,
-                    "noaa2": noaa_station2,
-                    "data": {
-                        "meteostat1": observed.get("meteostat1", {}).get("data"),
-                        "meteostat2": observed.get("meteostat2", {}).get("data"),
-                        "noaa_station1": noaa_data.get("noaa_station1"),
-                        "noaa_station2": noaa_data.get("noaa_station2"),
-                        "openmeteo": model.get("openmeteo", {}).get("data"),
-                        "nasa_power": model.get("nasa_power", {}).get("data"),
-                        "era5": model.get("era5", {}).get("data"),
-                    },
-                }
-            )
-
-            export_site_data(site_data, site_folder)
-
-            required_sources = [
-                "meteostat1",
-                "meteostat2",
-                "noaa_station1",
-                "noaa_station2",
-                "openmeteo",
-                "nasa_power",
-                "era5",
-            ]
-
-            missing_sources = [
-                key for key in required_sources if site_data["data"].get(key) is None
-            ]
-
-            if missing_sources:
-                print(
-                    f"Missing sources for {name}: {missing_sources} - analysis and report still generated."
-                )
-
-            dataframes = {
-                "meteostat1": site_data["data"].get("meteostat1"),
-                "meteostat2": site_data["data"].get("meteostat2"),
-                "noaa_station1": site_data["data"].get("noaa_station1"),
-                "noaa_station2": site_data["data"].get("noaa_station2"),
-                "openmeteo": site_data["data"].get("openmeteo"),
-                "nasa_power": site_data["data"].get("nasa_power"),
-                "era5": site_data["data"].get("era5"),
-            }
-
-            run_analysis_for_site(name, site_folder, site, dataframes)
-            generate_report(site_data, output_folder="data")
-
-        # Append in all cases, even when skipping analysis
-        all_sites_data.append(site_data)
+    isd_index = build_isd_station_index(isd_df)
+    isd_inventory = None
+    if os.path.exists(ISD_INVENTORY_CSV):
+        print(f"Loading NOAA ISD inventory from {ISD_INVENTORY_CSV}...")
+        isd_inventory = load_isd_inventory(ISD_INVENTORY_CSV, start_date=start, end_date=end)
+
+    era5_jobs = submit_era5_jobs(sites, start, end) if era5_queue else None
+    if openmeteo_batch:
+        prefetch_openmeteo(sites, start, end, aggregation=openmeteo_aggregation)
+
+    try:
+        all_sites_data = run_sites(
+            sites,
+            start,
+            end,
+            isd_index,
+            site_workers=site_workers,
+            fetch_workers=fetch_workers,
+            era5_jobs_dir=era5_jobs.jobs_dir if era5_jobs else None,
+            isd_inventory=isd_inventory,
+            openmeteo_aggregation=openmeteo_aggregation,
+        )
+    finally:
+        if era5_jobs:
+            era5_jobs.stop_polling(wait=False)
 
     visualize_sites_plotly(all_sites_data, "visualisation_plotly.html")
 
@@ -244,5 +585,51 @@ def main():
     #generate_station_docx(all_sites_data)
 
 
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Wind Data - multi-source wind analysis per site")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of sites processed in parallel (process pool). Default: 1 (sequential).",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=DEFAULT_FETCH_WORKERS,
+        help=f"Threads for concurrent source downloads within a site. Default: {DEFAULT_FETCH_WORKERS}.",
+    )
+    parser.add_argument(
+        "--era5-queue",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Submit all ERA5 requests up front and poll them in the background. Default: off.",
+    )
+    parser.add_argument(
+        "--openmeteo-batch",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Download Open-Meteo for all sites up front with multi-location requests. Default: off.",
+    )
+    parser.add_argument(
+        "--openmeteo-aggregation",
+        choices=OPENMETEO_AGGREGATIONS,
+        default="hourly",
+        help=(
+            "Open-Meteo mode: 'hourly' (aggregated locally, all daily fields) or "
+            "'daily' (Open-Meteo daily variables, dominant direction, no hour count). "
+            "Default: hourly."
+        ),
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = _parse_args()
+    main(
+        site_workers=args.workers,
+        fetch_workers=args.fetch_workers,
+        era5_queue=args.era5_queue,
+        openmeteo_batch=args.openmeteo_batch,
+        openmeteo_aggregation=args.openmeteo_aggregation,
+    )
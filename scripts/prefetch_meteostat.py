@@ -0,0 +1,119 @@
+# prefetch_meteostat.py
+#
+# Warm the pipeline's Meteostat cache (data/cache/meteostat) before a batch:
+# resolve the two nearest Meteostat stations of every site of
+# modele_sites.csv, then download each distinct station-year once,
+# concurrently. The per-site runs of script.py then read Meteostat locally.
+#
+# Usage (from the repository root):
+#   python -m scripts.prefetch_meteostat --start 2005-01-01 --end 2024-12-31
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from modules.utils import load_sites_from_csv
+from modules.meteostat_fetcher import (
+    METEOSTAT_CACHE_DIR,
+    METEOSTAT_HOURLY_MAX_AGE_S,
+    configure_meteostat_cache,
+    fetch_meteostat_hourly,
+    get_nearest_stations_info,
+)
+
+DEFAULT_WORKERS = 8
+
+
+def collect_station_years(sites, start_year, end_year, stations_per_site=2):
+    """Sorted distinct (station_id, year) pairs needed by the sites."""
+    station_ids = set()
+    for site in sites:
+        info = get_nearest_stations_info(
+            float(site["latitude"]), float(site["longitude"]), limit=stations_per_site
+        )
+        station_ids.update(station["id"] for station in info.values())
+    return sorted(
+        (station_id, year)
+        for station_id in station_ids
+        for year in range(start_year, end_year + 1)
+    )
+
+
+def _prefetch_station_year(station_id, year):
+    """Fetch one station-year through the Meteostat cache; returns the row count."""
+    return len(
+        fetch_meteostat_hourly(station_id, datetime(year, 1, 1), datetime(year, 12, 31, 23, 59))
+    )
+
+
+def prefetch_meteostat(
+    sites_csv="modele_sites.csv",
+    start_date="2000-01-01",
+    end_date=None,
+    workers=DEFAULT_WORKERS,
+    cache_dir=METEOSTAT_CACHE_DIR,
+    max_age_s=METEOSTAT_HOURLY_MAX_AGE_S,
+):
+    """
+    Download every station-year needed by the sites of sites_csv into
+    cache_dir. Returns {(station_id, year): n_rows or None on error}.
+    """
+    configure_meteostat_cache(cache_dir=cache_dir, hourly_max_age_s=max_age_s)
+
+    start_year = int(start_date[:4])
+    end_year = int((end_date or datetime.now().strftime("%Y-%m-%d"))[:4])
+
+    sites = load_sites_from_csv(sites_csv)
+    print(f"Resolving Meteostat stations for {len(sites)} site(s)...")
+    station_years = collect_station_years(sites, start_year, end_year)
+    print(f"Prefetching {len(station_years)} station-year(s) into {cache_dir}...")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_prefetch_station_year, station_id, year): (station_id, year)
+            for station_id, year in station_years
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"Prefetch error for {key[0]} {key[1]}: {e}")
+                results[key] = None
+
+    failed = sum(1 for n in results.values() if n is None)
+    empty = sum(1 for n in results.values() if n == 0)
+    print(
+        f"Meteostat prefetch done: {len(results) - failed} fetched "
+        f"({empty} without data), {failed} failed."
+    )
+    return results
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Prefetch Meteostat hourly data for all sites")
+    parser.add_argument("--sites", default="modele_sites.csv", help="Sites CSV (default: modele_sites.csv).")
+    parser.add_argument("--start", required=True, help="Start date YYYY-MM-DD.")
+    parser.add_argument("--end", default=None, help="End date YYYY-MM-DD (default: today).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent downloads.")
+    parser.add_argument("--cache-dir", default=METEOSTAT_CACHE_DIR, help="Meteostat cache directory.")
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=METEOSTAT_HOURLY_MAX_AGE_S / 86400,
+        help="Retention of cached hourly files (days).",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    prefetch_meteostat(
+        sites_csv=args.sites,
+        start_date=args.start,
+        end_date=args.end,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        max_age_s=args.max_age_days * 86400,
+    )
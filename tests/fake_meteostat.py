@@ -0,0 +1,30 @@
+"""
+Stand-in for the optional `meteostat` package in tests, so modules that
+import it can be loaded without it. Tests patch Stations / Hourly in the
+module under test with fakes serving fixture frames.
+"""
+import sys
+import types
+
+
+def install():
+    """Register a placeholder `meteostat` module unless the real one is installed."""
+    try:
+        import meteostat  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    module = types.ModuleType("meteostat")
+
+    class Stations:
+        cache_dir = None
+        max_age = 0
+
+    class Hourly:
+        cache_dir = None
+        max_age = 0
+
+    module.Stations = Stations
+    module.Hourly = Hourly
+    sys.modules["meteostat"] = module
@@ -0,0 +1,262 @@
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from modules.era5_fetcher import save_era5_data, snap_to_era5_grid
+from modules.era5_job_queue import (
+    Era5JobQueue,
+    collect_era5_job,
+    era5_job_key,
+    load_era5_job,
+)
+
+ERA5_CSV = "valid_time,u10,v10\n" + "".join(
+    f"2020-01-0{day} {hour:02d}:00:00,{-3.0 - hour / 10},{-4.0}\n"
+    for day in (1, 2)
+    for hour in range(24)
+)
+
+
+class FakeResult:
+    """Mimics a legacy cdsapi Result: queued -> running -> completed."""
+
+    def __init__(self, request_id, polls_before_done=2):
+        self.reply = {"request_id": request_id, "state": "queued"}
+        self._polls_left = polls_before_done
+
+    def update(self):
+        self._polls_left -= 1
+        self.reply["state"] = "completed" if self._polls_left <= 0 else "running"
+
+    def download(self, target):
+        with zipfile.ZipFile(target, "w") as zf:
+            zf.writestr("era5_timeseries.csv", ERA5_CSV)
+        return target
+
+
+class FakeCdsClient:
+    def __init__(self):
+        self.submitted = []
+
+    def retrieve(self, dataset, request):
+        self.submitted.append((dataset, request))
+        return FakeResult(f"job-{len(self.submitted)}")
+
+
+class TestEra5JobQueue(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.jobs_dir = os.path.join(self._tmp.name, "jobs")
+        self.cell_dir = os.path.join(self._tmp.name, "cells")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_submit_persist_resume_and_collect(self):
+        client = FakeCdsClient()
+        queue = Era5JobQueue(
+            self.jobs_dir, client=client, poll_interval_s=0, cell_cache_dir=self.cell_dir
+        )
+        key_a = queue.submit(44.0, 4.5, "2020-01-01", "2020-01-02")
+        queue.submit(45.0, 5.5, "2020-01-01", "2020-01-02")
+        self.assertEqual(len(client.submitted), 2)
+        self.assertEqual(load_era5_job(self.jobs_dir, key_a)["job_id"], "job-1")
+
+        # Restart: nothing is resubmitted, polling resumes from the job IDs
+        resumed = []
+        restarted = Era5JobQueue(
+            self.jobs_dir,
+            client=client,
+            poll_interval_s=0,
+            resume_result=lambda c, job_id: resumed.append(job_id) or FakeResult(job_id),
+        )
+        restarted.submit(44.0, 4.5, "2020-01-01", "2020-01-02")
+        self.assertEqual(len(client.submitted), 2)
+
+        self.assertEqual(restarted.poll_once(), 2)
+        self.assertEqual(sorted(resumed), ["job-1", "job-2"])
+        restarted.start_polling()
+        restarted._thread.join(timeout=5)
+        self.assertEqual(load_era5_job(self.jobs_dir, key_a)["state"], "downloaded")
+
+        site_folder = os.path.join(self._tmp.name, "site")
+        result = collect_era5_job(
+            self.jobs_dir,
+            "SITE",
+            site_folder,
+            44.0,
+            4.5,
+            "2020-01-01",
+            "2020-01-02",
+            timeout=1,
+            cell_cache_dir=self.cell_dir,
+        )
+        self.assertTrue(os.path.exists(result["filepath_daily"]))
+        self.assertTrue(os.path.exists(restarted.zip_path(key_a)))
+
+    def test_sites_in_same_grid_cell_share_one_job(self):
+        self.assertEqual(
+            era5_job_key(44.04, 4.61, "2020-01-01", "2020-12-31"),
+            "44.00_4.50_2020-01-01_2020-12-31",
+        )
+
+        client = FakeCdsClient()
+        queue = Era5JobQueue(
+            self.jobs_dir, client=client, poll_interval_s=0, cell_cache_dir=self.cell_dir
+        )
+        key_a = queue.submit(44.04, 4.61, "2020-01-01", "2020-01-02")
+        key_b = queue.submit(43.96, 4.45, "2020-01-01", "2020-01-02")
+        self.assertEqual(key_a, key_b)
+        self.assertEqual(len(client.submitted), 1)
+        self.assertEqual(client.submitted[0][1]["location"], {"longitude": 4.5, "latitude": 44.0})
+
+        while queue.poll_once():
+            pass
+        for name, lat, lon in (("A", 44.04, 4.61), ("B", 43.96, 4.45)):
+            result = collect_era5_job(
+                self.jobs_dir,
+                name,
+                os.path.join(self._tmp.name, name),
+                lat,
+                lon,
+                "2020-01-01",
+                "2020-01-02",
+                timeout=1,
+                cell_cache_dir=self.cell_dir,
+            )
+            self.assertEqual(result["latitude"], lat)
+        self.assertTrue(os.path.exists(queue.cell_csv_path(key_a)))
+
+    def test_grid_snapping_rounds_ties_up(self):
+        self.assertEqual(snap_to_era5_grid(44.125, 4.375), (44.25, 4.5))
+        self.assertEqual(snap_to_era5_grid(-44.125, 0.125), (-44.0, 0.25))
+        self.assertEqual(snap_to_era5_grid(44.1, 4.6), (44.0, 4.5))
+
+    def test_direct_download_reuses_queued_cell_series(self):
+        client = FakeCdsClient()
+        queue = Era5JobQueue(
+            self.jobs_dir, client=client, poll_interval_s=0, cell_cache_dir=self.cell_dir
+        )
+        queue.submit(44.04, 4.61, "2020-01-01", "2020-01-02")
+        while queue.poll_once():
+            pass
+        collect_era5_job(
+            self.jobs_dir,
+            "A",
+            os.path.join(self._tmp.name, "A"),
+            44.04,
+            4.61,
+            "2020-01-01",
+            "2020-01-02",
+            timeout=1,
+            cell_cache_dir=self.cell_dir,
+        )
+
+        # Same cell: served from the cell cache, no second CDS request
+        with mock.patch("modules.era5_fetcher.cdsapi.Client") as cds_client:
+            result = save_era5_data(
+                "B",
+                os.path.join(self._tmp.name, "B"),
+                43.96,
+                4.45,
+                "2020-01-01",
+                "2020-01-02",
+                cell_cache_dir=self.cell_dir,
+            )
+        cds_client.assert_not_called()
+        self.assertEqual(len(client.submitted), 1)
+        self.assertTrue(os.path.exists(result["filepath_daily"]))
+        self.assertEqual(os.listdir(self.cell_dir), ["era5_cell_44.00_4.50_2020-01-01_2020-01-02.csv"])
+
+    def test_direct_download_with_budget_polls_the_job(self):
+        client = FakeCdsClient()
+        with mock.patch("modules.era5_fetcher.cdsapi.Client", return_value=client) as cds_client, \
+                mock.patch("modules.era5_fetcher.ERA5_POLL_INTERVAL_S", 0):
+            result = save_era5_data(
+                "SITE",
+                os.path.join(self._tmp.name, "site"),
+                44.0,
+                4.5,
+                "2020-01-01",
+                "2020-01-02",
+                cell_cache_dir=self.cell_dir,
+                timeout=5,
+            )
+
+        cds_client.assert_called_once_with(wait_until_complete=False)
+        self.assertEqual(len(client.submitted), 1)
+        self.assertTrue(os.path.exists(result["filepath_daily"]))
+
+    def test_direct_download_stops_at_the_budget(self):
+        client = FakeCdsClient()
+        client.retrieve = lambda dataset, request: FakeResult("job-1", polls_before_done=10**6)
+        started = time.monotonic()
+        with mock.patch("modules.era5_fetcher.cdsapi.Client", return_value=client), \
+                mock.patch("modules.era5_fetcher.ERA5_POLL_INTERVAL_S", 0.05):
+            with self.assertRaises(TimeoutError):
+                save_era5_data(
+                    "SITE",
+                    os.path.join(self._tmp.name, "site"),
+                    44.0,
+                    4.5,
+                    "2020-01-01",
+                    "2020-01-02",
+                    cell_cache_dir=self.cell_dir,
+                    timeout=0.2,
+                )
+
+        self.assertLess(time.monotonic() - started, 2)
+        # The cell lock is released for the next site of the cell
+        self.assertEqual(os.listdir(self.cell_dir), [])
+
+    def test_collect_returns_when_job_never_completes(self):
+        client = FakeCdsClient()
+        queue = Era5JobQueue(
+            self.jobs_dir, client=client, poll_interval_s=0, cell_cache_dir=self.cell_dir
+        )
+        queue.submit(44.0, 4.5, "2020-01-01", "2020-01-02")
+
+        started = time.monotonic()
+        result = collect_era5_job(
+            self.jobs_dir,
+            "SITE",
+            os.path.join(self._tmp.name, "site"),
+            44.0,
+            4.5,
+            "2020-01-01",
+            "2020-01-02",
+            timeout=0.2,
+            cell_cache_dir=self.cell_dir,
+        )
+
+        self.assertIsNone(result)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_job_failed_after_repeated_poll_errors(self):
+        def unreachable(client, job_id):
+            raise ConnectionError("CDS unreachable")
+
+        queue = Era5JobQueue(
+            self.jobs_dir, client=FakeCdsClient(), poll_interval_s=0, cell_cache_dir=self.cell_dir
+        )
+        key = queue.submit(44.0, 4.5, "2020-01-01", "2020-01-02")
+        restarted = Era5JobQueue(
+            self.jobs_dir,
+            client=FakeCdsClient(),
+            poll_interval_s=0,
+            resume_result=unreachable,
+            max_poll_errors=3,
+        )
+
+        restarted.start_polling()
+        restarted._thread.join(timeout=5)
+
+        self.assertFalse(restarted._thread.is_alive())
+        self.assertEqual(load_era5_job(self.jobs_dir, key)["state"], "failed")
+
+
+if __name__ == '__main__':
+    unittest.main()
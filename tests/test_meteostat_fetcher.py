@@ -0,0 +1,269 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from tests import fake_meteostat
+
+fake_meteostat.install()
+
+from modules import meteostat_fetcher  # noqa: E402
+
+
+SITE = (48.85, 2.35)
+
+# Twelve stations north of the site, nearest first
+STATIONS = pd.DataFrame(
+    {
+        "name": [f"Station {k}" for k in range(12)],
+        "latitude": [SITE[0] + 0.01 * (k + 1) for k in range(12)],
+        "longitude": [SITE[1]] * 12,
+        "elevation": [30.0 + k for k in range(12)],
+        "timezone": ["Europe/Paris"] * 12,
+    },
+    index=pd.Index([f"0715{k:02d}" for k in range(12)], name="id"),
+)
+
+
+class FakeStations:
+    """Stations().nearby(lat, lon).fetch(limit) over STATIONS; counts queries."""
+
+    queries = []
+
+    def nearby(self, lat, lon):
+        return self
+
+    def fetch(self, limit):
+        FakeStations.queries.append(limit)
+        return STATIONS.head(limit)
+
+
+def hourly_frame(station_id, start, end):
+    """Hourly rows of a station: wspd = 3.6 * (hour + offset) km/h, north wind."""
+    offset = int(station_id[-2:])
+    times = pd.date_range(start, end, freq="h")
+    return pd.DataFrame(
+        {
+            "wspd": 3.6 * (times.hour + offset),
+            "wpgt": 3.6 * (times.hour + offset + 2),
+            "wdir": np.where(times.hour % 2, 350.0, 10.0),
+        },
+        index=pd.Index(times, name="time"),
+    )
+
+
+class FakeHourlyFrames:
+    """Hourly(loc, start, end).fetch() over hourly_frame; Meteostat layout."""
+
+    cache_dir = None
+    max_age = 0
+    queries = []
+
+    def __init__(self, loc, start, end, timezone=None):
+        FakeHourlyFrames.queries.append(loc)
+        self._loc, self._start, self._end = loc, start, end
+
+    def fetch(self):
+        if isinstance(self._loc, str):
+            return hourly_frame(self._loc, self._start, self._end)
+        if len(self._loc) == 1:
+            # A one-station list still comes back with a time index
+            return hourly_frame(self._loc[0], self._start, self._end)
+        return pd.concat(
+            {sid: hourly_frame(sid, self._start, self._end) for sid in self._loc},
+            names=["station"],
+        )
+
+
+class MeteostatFakesMixin:
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        FakeStations.queries = []
+        FakeHourlyFrames.queries = []
+        meteostat_fetcher.clear_station_cache()
+        self.addCleanup(meteostat_fetcher.clear_station_cache)
+        for name, fake in (("Stations", FakeStations), ("Hourly", FakeHourlyFrames)):
+            patcher = mock.patch.object(meteostat_fetcher, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TestStationMemo(MeteostatFakesMixin, unittest.TestCase):
+    def test_nearest_stations_are_memoized_per_location(self):
+        first = meteostat_fetcher.get_nearest_stations_info(*SITE)
+        # Same location after rounding to STATION_CACHE_DECIMALS
+        again = meteostat_fetcher.get_nearest_stations_info(SITE[0] + 1e-5, SITE[1])
+
+        self.assertEqual(FakeStations.queries, [meteostat_fetcher.STATION_LOOKUP_LIMIT])
+        self.assertEqual(list(first), ["station1", "station2"])
+        self.assertEqual(first, again)
+        self.assertEqual(first["station2"]["id"], "071501")
+        self.assertEqual(first["station2"]["elevation"], 31.0)
+
+        # Callers get copies: editing one does not alter the memo
+        first["station1"]["name"] = "edited"
+        self.assertEqual(
+            meteostat_fetcher.get_nearest_stations_info(*SITE)["station1"]["name"], "Station 0"
+        )
+
+        # Another location is a new query
+        meteostat_fetcher.get_nearest_stations_info(SITE[0] + 0.1, SITE[1])
+        self.assertEqual(len(FakeStations.queries), 2)
+
+    def test_larger_limit_queries_once_more(self):
+        meteostat_fetcher.get_nearest_stations_info(*SITE)
+        stations = meteostat_fetcher.get_nearest_stations_info(*SITE, limit=11)
+        meteostat_fetcher.get_nearest_stations_info(*SITE, limit=5)
+
+        self.assertEqual(FakeStations.queries, [meteostat_fetcher.STATION_LOOKUP_LIMIT, 11])
+        self.assertEqual(len(stations), 11)
+
+    def test_station_meta_by_id_reuses_the_site_query(self):
+        nearest = meteostat_fetcher.get_nearest_stations_info(*SITE)
+
+        meta = meteostat_fetcher.get_station_meta(*SITE, "071501")
+
+        self.assertEqual(meta, nearest["station2"])
+        self.assertEqual(meteostat_fetcher.get_station_meta(*SITE, "999999"), {})
+        self.assertEqual(len(FakeStations.queries), 1)
+
+    def test_station2_alone_is_written_with_its_metadata(self):
+        site_folder = self._tmp.name
+
+        data = meteostat_fetcher.fetch_meteostat_data(
+            "SITE",
+            site_folder,
+            *SITE,
+            "2021-01-01",
+            "2021-01-02",
+            station_ids=["071501"],
+            ranks=[2],
+        )
+
+        self.assertEqual(list(data), ["meteostat2"])
+        self.assertTrue(os.path.exists(os.path.join(site_folder, "meteostat2_SITE.csv")))
+        df = data["meteostat2"]
+        self.assertEqual(df["station_id"].iloc[0], "071501")
+        self.assertEqual(df["station_name"].iloc[0], "Station 1")
+        self.assertEqual(df["station_elevation"].iloc[0], 31.0)
+        self.assertEqual(FakeHourlyFrames.queries, [["071501"]])
+        self.assertEqual(len(FakeStations.queries), 1)
+
+
+class TestMultiStationDaily(MeteostatFakesMixin, unittest.TestCase):
+    def test_grouped_aggregation_matches_single_station_path(self):
+        station_ids = ["071500", "071503"]
+        metas = {sid: meteostat_fetcher.get_station_meta(*SITE, sid) for sid in station_ids}
+
+        multi = meteostat_fetcher.fetch_meteostat_daily_multi(
+            station_ids,
+            "2021-01-01",
+            "2021-01-03",
+            mean_correction_factor=1.1,
+            station_metas=metas,
+        )
+        self.assertEqual(FakeHourlyFrames.queries, [station_ids])
+
+        for sid in station_ids:
+            single = meteostat_fetcher._fetch_meteostat_daily_for_station(
+                sid,
+                *SITE,
+                "2021-01-01",
+                "2021-01-03",
+                mean_correction_factor=1.1,
+                station_meta=metas[sid],
+            )
+            pd.testing.assert_frame_equal(multi[sid], single)
+
+        # Station 071503: hourly speeds 3..26 m/s on a full day
+        day = multi["071503"].iloc[0]
+        self.assertEqual(day["n_hours"], 24)
+        self.assertAlmostEqual(day["windspeed_mean"], 26.0 * 1.1)
+        self.assertAlmostEqual(day["windspeed_daily_avg"], 14.5 * 1.1)
+        self.assertAlmostEqual(day["windspeed_gust"], 28.0)
+        self.assertAlmostEqual(min(day["wind_direction"], 360.0 - day["wind_direction"]), 0.0)
+        self.assertEqual(day["station_name"], "Station 3")
+        self.assertEqual(
+            list(multi["071500"]["time"].dt.strftime("%Y-%m-%d")),
+            ["2021-01-01", "2021-01-02", "2021-01-03"],
+        )
+
+
+class FakeHourly:
+    """Records the period and retention of each query; serves hourly_frame."""
+
+    cache_dir = None
+    max_age = 0
+    queries = []
+
+    def __init__(self, loc, start, end, timezone=None):
+        FakeHourly.queries.append((loc, start, end, self.max_age))
+        self._args = (loc, start, end)
+
+    def fetch(self):
+        return hourly_frame(*self._args)
+
+
+class TestMeteostatCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        FakeHourly.queries = []
+        for name in ("Hourly", "Stations"):
+            patcher = mock.patch.object(
+                meteostat_fetcher, name, type(name, (FakeHourly,), {})
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_configure_sets_cache_dir_and_ages(self):
+        cache_dir = os.path.join(self._tmp.name, "meteostat")
+        meteostat_fetcher.configure_meteostat_cache(
+            cache_dir=cache_dir, hourly_max_age_s=100, stations_max_age_s=10
+        )
+        self.addCleanup(meteostat_fetcher.configure_meteostat_cache, cache_dir=cache_dir)
+
+        self.assertTrue(os.path.isdir(cache_dir))
+        self.assertEqual(meteostat_fetcher.Hourly.cache_dir, cache_dir)
+        self.assertEqual(meteostat_fetcher.Hourly.max_age, 100)
+        self.assertEqual(meteostat_fetcher.Stations.max_age, 10)
+
+    def test_current_year_uses_short_retention(self):
+        cache_dir = os.path.join(self._tmp.name, "meteostat")
+        meteostat_fetcher.configure_meteostat_cache(
+            cache_dir=cache_dir, hourly_max_age_s=1000, recent_max_age_s=60
+        )
+        self.addCleanup(meteostat_fetcher.configure_meteostat_cache, cache_dir=cache_dir)
+        this_year = datetime.now().year
+
+        meteostat_fetcher.fetch_meteostat_hourly(
+            "071500", datetime(2010, 1, 1), datetime(2010, 12, 31)
+        )
+        df = meteostat_fetcher.fetch_meteostat_hourly(
+            "071500", datetime(this_year - 1, 12, 31), datetime(this_year, 1, 2)
+        )
+
+        # Past years (even in a request reaching this year) keep the long
+        # retention; only the current-year part uses the short one.
+        self.assertEqual(
+            [(q[1], q[2], q[3]) for q in FakeHourly.queries],
+            [
+                (datetime(2010, 1, 1), datetime(2010, 12, 31), 1000),
+                (datetime(this_year - 1, 12, 31), datetime(this_year - 1, 12, 31, 23, 59, 59), 1000),
+                (datetime(this_year, 1, 1), datetime(this_year, 1, 2), 60),
+            ],
+        )
+        self.assertEqual(meteostat_fetcher.Hourly.max_age, 1000)
+        # One continuous hourly series once joined
+        self.assertEqual(len(df), 49)
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertTrue(df.index.is_unique)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,416 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from email.utils import formatdate
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pandas as pd
+import requests
+
+from modules import noaa_isd_cache
+from modules.noaa_isd_fetcher import _download_isd_year, fetch_isd_series, update_isd_series
+from modules.noaa_station_finder import (
+    build_isd_station_index,
+    probe_isd_availability,
+    select_isd_stations_by_availability,
+)
+
+USAF = "075790"
+WBAN = "99999"
+
+
+def _year_csv(year):
+    """Small Global Hourly fixture: two days, three reports per day."""
+    rows = ['"STATION","DATE","REPORT_TYPE","WND"']
+    for day, speeds in ((1, (31, 52, 40)), (2, (10, 20, 90))):
+        for hour, speed in zip((0, 6, 12), speeds):
+            rows.append(
+                f'"{USAF}{WBAN}","{year}-01-{day:02d}T{hour:02d}:00:00","FM-12",'
+                f'"270,1,N,{speed:04d},1"'
+            )
+    return "\n".join(rows) + "\n"
+
+
+def _year_lite(year):
+    """The same reports as _year_csv in ISD-Lite fixed-width format."""
+    rows = []
+    for day, speeds in ((1, (31, 52, 40)), (2, (10, 20, 90))):
+        for hour, speed in zip((0, 6, 12), speeds):
+            rows.append(
+                f"{year:4d} 01 {day:02d} {hour:02d}"
+                + "".join(f"{v:6d}" for v in (-9999, -9999, -9999, 270, speed, -9999, -9999, -9999))
+            )
+    return gzip.compress(("\n".join(rows) + "\n").encode())
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class IsdFixtureServer:
+    """
+    Local HTTP stand-in serving {year}/{usaf}{wban}.csv (Global Hourly) and
+    {year}/{usaf}-{wban}-{year}.gz (ISD-Lite) fixture files.
+    """
+
+    def __init__(self, years):
+        self._tmp = tempfile.TemporaryDirectory()
+        for year in years:
+            year_dir = os.path.join(self._tmp.name, str(year))
+            os.makedirs(year_dir)
+            with open(os.path.join(year_dir, f"{USAF}{WBAN}.csv"), "w") as f:
+                f.write(_year_csv(year))
+            with open(os.path.join(year_dir, f"{USAF}-{WBAN}-{year}.gz"), "wb") as f:
+                f.write(_year_lite(year))
+
+        handler = partial(_QuietHandler, directory=self._tmp.name)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+
+class TestNoaaIsdDownload(unittest.TestCase):
+    def setUp(self):
+        self.server = IsdFixtureServer(years=[2010, 2011, 2013])
+        self._out = tempfile.TemporaryDirectory()
+        self.output_dir = self._out.name
+
+    def tearDown(self):
+        self.server.close()
+        self._out.cleanup()
+
+    def _fetch(self, **kwargs):
+        return fetch_isd_series(
+            USAF,
+            WBAN,
+            range(2010, 2014),
+            self.output_dir,
+            base_url=self.server.base_url,
+            **kwargs,
+        )
+
+    def test_concurrent_matches_serial(self):
+        serial = self._fetch(max_workers=1)
+        concurrent = self._fetch(max_workers=4)
+
+        self.assertEqual(len(concurrent), 6)  # 2012 is missing (404)
+        self.assertEqual(list(serial["time"]), list(concurrent["time"]))
+        self.assertEqual(list(concurrent["windspeed_mean"][:2]), [5.2, 9.0])
+        self.assertEqual(list(concurrent["n_hours"].unique()), [3])
+
+    def test_return_raw_sorted_hourly(self):
+        raw = self._fetch(return_raw=True)
+
+        self.assertEqual(len(raw), 18)
+        self.assertTrue(raw["time"].is_monotonic_increasing)
+
+    def test_daily_and_hourly_outputs_in_one_pass(self):
+        daily = self._fetch(save_hourly=True, station_metadata={"latitude": 44.2, "elevation_m": None})
+
+        saved_daily = pd.read_csv(os.path.join(self.output_dir, "noaa_stationX_site.csv"))
+        saved_hourly = pd.read_csv(os.path.join(self.output_dir, "raw_noaa_stationX_site.csv"))
+        self.assertEqual(len(saved_daily), len(daily))
+        self.assertEqual(len(saved_hourly), 18)
+        self.assertEqual(list(saved_hourly.columns[:3]), ["time", "date", "wind_speed"])
+        self.assertEqual(daily["station_latitude"].iloc[0], 44.2)
+
+    def test_streaming_matches_in_memory(self):
+        in_memory = self._fetch()
+        streamed = self._fetch(streaming=True)
+
+        pd.testing.assert_frame_equal(in_memory, streamed)
+        with self.assertRaises(ValueError):
+            self._fetch(streaming=True, return_raw=True)
+
+    def test_isd_lite_backend_matches_global_hourly(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        hourly = self._fetch()
+        lite = self._fetch(backend="isd-lite", cache_dir=cache_dir)
+
+        pd.testing.assert_frame_equal(hourly, lite)
+        self.assertIsNotNone(
+            noaa_isd_cache.lookup(cache_dir, "isd-lite", 2010, f"{USAF}-{WBAN}-2010.gz")
+        )
+
+    def test_incremental_update_matches_full_download(self):
+        full = self._fetch()
+        daily_csv = os.path.join(self.output_dir, "noaa_stationX_site.csv")
+        fetch_isd_series(
+            USAF, WBAN, [2010, 2011], self.output_dir, base_url=self.server.base_url,
+            save_hourly=True,
+        )
+
+        updated = update_isd_series(
+            daily_csv, USAF, WBAN, "2013-12-31", self.output_dir,
+            base_url=self.server.base_url, save_hourly=True,
+        )
+
+        self.assertEqual(list(updated["time"]), list(full["time"]))
+        self.assertEqual(list(updated["windspeed_mean"]), list(full["windspeed_mean"]))
+        self.assertEqual(len(pd.read_csv(daily_csv)), len(full))
+        raw = pd.read_csv(os.path.join(self.output_dir, "raw_noaa_stationX_site.csv"))
+        self.assertEqual(len(raw), 18)
+        qc = pd.read_csv(os.path.join(self.output_dir, "qc_noaa_stationX_site.csv"))
+        self.assertEqual(list(qc["year"]), [2010, 2011, 2013])
+
+        # Already covering end_date: no download at all
+        self.server.close()
+        self.server = IsdFixtureServer(years=[])
+        again = update_isd_series(daily_csv, USAF, WBAN, "2013-01-02", self.output_dir)
+        self.assertEqual(len(again), len(full))
+
+    def test_incremental_update_refuses_unusable_files(self):
+        daily_csv = os.path.join(self.output_dir, "noaa_stationX_site.csv")
+        raw_csv = os.path.join(self.output_dir, "raw_noaa_stationX_site.csv")
+        fetch_isd_series(
+            USAF, WBAN, [2011], self.output_dir, base_url=self.server.base_url,
+            save_hourly=True,
+        )
+        kwargs = dict(base_url=self.server.base_url, save_hourly=True)
+
+        # File of another station (the station choice changed)
+        self.assertIsNone(
+            update_isd_series(daily_csv, "999999", WBAN, "2013-12-31", self.output_dir, **kwargs)
+        )
+        # Period starting before the file: leading years would be missing
+        self.assertIsNone(
+            update_isd_series(
+                daily_csv, USAF, WBAN, "2013-12-31", self.output_dir,
+                start_date="2010-01-01", **kwargs,
+            )
+        )
+        self.assertIsNone(
+            update_isd_series(
+                daily_csv, USAF, WBAN, "2013-12-31", self.output_dir,
+                years_available=[2010, 2011, 2012, 2013], **kwargs,
+            )
+        )
+        # Unreadable hourly archive: left as is, not replaced by new years
+        with open(raw_csv, "w") as f:
+            f.write("garbage")
+        self.assertIsNone(
+            update_isd_series(
+                daily_csv, USAF, WBAN, "2013-12-31", self.output_dir,
+                start_date="2011-01-01", **kwargs,
+            )
+        )
+        with open(raw_csv) as f:
+            self.assertEqual(f.read(), "garbage")
+
+    def test_raw_file_cache_serves_closed_years_offline(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        first = self._fetch(cache_dir=cache_dir)
+        self.server.close()
+        self.server = IsdFixtureServer(years=[])
+
+        second = self._fetch(cache_dir=cache_dir)
+
+        self.assertEqual(list(first["windspeed_mean"]), list(second["windspeed_mean"]))
+        entry = noaa_isd_cache.lookup(cache_dir, "global-hourly", 2010, f"{USAF}{WBAN}.csv")
+        self.assertTrue(entry["immutable"])
+
+    def test_not_modified_refreshes_fetch_time(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        filename = f"{USAF}{WBAN}.csv"
+        fixture_path = os.path.join(self.server._tmp.name, "2010", filename)
+        with open(fixture_path, "rb") as f:
+            content = f.read()
+        last_modified = formatdate(os.path.getmtime(fixture_path) + 1, usegmt=True)
+        noaa_isd_cache.store(
+            cache_dir, "global-hourly", 2010, filename, content, last_modified=last_modified
+        )
+        # First fetched within the grace period after the year closed
+        meta_path = os.path.join(cache_dir, "global-hourly", "2010", filename + ".json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta["fetched_at"] = "2011-01-15T00:00:00+00:00"
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        self.assertFalse(
+            noaa_isd_cache.lookup(cache_dir, "global-hourly", 2010, filename)["immutable"]
+        )
+
+        with requests.Session() as session:
+            data = _download_isd_year(
+                session,
+                f"{self.server.base_url}/2010/{filename}",
+                cache_dir=cache_dir,
+                dataset="global-hourly",
+                year=2010,
+            )
+
+        self.assertEqual(data, content)
+        entry = noaa_isd_cache.lookup(cache_dir, "global-hourly", 2010, filename)
+        self.assertTrue(entry["immutable"])
+        self.assertEqual(entry["last_modified"], last_modified)
+
+    def test_entry_evicted_after_lookup_is_downloaded_again(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        filename = f"{USAF}{WBAN}.csv"
+        url = f"{self.server.base_url}/2010/{filename}"
+        fixture_path = os.path.join(self.server._tmp.name, "2010", filename)
+        with open(fixture_path, "rb") as f:
+            content = f.read()
+        last_modified = formatdate(os.path.getmtime(fixture_path) + 1, usegmt=True)
+        lookup = noaa_isd_cache.lookup
+
+        def lookup_then_evict(*args):
+            # Another worker evicts the entry right after this lookup
+            entry = lookup(*args)
+            noaa_isd_cache.evict_lru(cache_dir, max_bytes=0)
+            return entry
+
+        # Immutable entry: one download; revalidated entry: 304, then a full GET
+        for immutable, requests_made in ((True, 1), (False, 2)):
+            noaa_isd_cache.store(
+                cache_dir, "global-hourly", 2010, filename, content, last_modified=last_modified
+            )
+            with self.subTest(immutable=immutable), requests.Session() as session, \
+                    mock.patch.object(session, "get", wraps=session.get) as get, \
+                    mock.patch.object(noaa_isd_cache, "lookup", side_effect=lookup_then_evict), \
+                    mock.patch.object(noaa_isd_cache, "is_immutable", return_value=immutable):
+                data = _download_isd_year(
+                    session, url, cache_dir=cache_dir, dataset="global-hourly", year=2010
+                )
+                self.assertEqual(data, content)
+                self.assertEqual(get.call_count, requests_made)
+
+    def test_missing_closed_year_is_not_requested_again(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        self._fetch(cache_dir=cache_dir)
+        self.assertTrue(
+            noaa_isd_cache.is_missing(cache_dir, "global-hourly", 2012, f"{USAF}{WBAN}.csv")
+        )
+
+        # 2012 now exists upstream, but the negative cache still answers
+        self.server.close()
+        self.server = IsdFixtureServer(years=[2010, 2011, 2012, 2013])
+        self.assertEqual(len(self._fetch(cache_dir=cache_dir)), 6)
+        self.assertFalse(noaa_isd_cache.store_missing(cache_dir, "global-hourly", 2999, "x.csv"))
+
+    def test_availability_probe_persists_results(self):
+        table = os.path.join(self.output_dir, "isd_availability.csv")
+        triples = [(USAF, WBAN, year) for year in (2010, 2012, 2013)]
+
+        first = probe_isd_availability(triples, table_path=table, base_url=self.server.base_url)
+        self.assertEqual(
+            first, {(USAF, WBAN, 2010): True, (USAF, WBAN, 2012): False, (USAF, WBAN, 2013): True}
+        )
+
+        # Served from the table without any request
+        self.server.close()
+        self.server = IsdFixtureServer(years=[])
+        second = probe_isd_availability(triples, table_path=table, base_url=self.server.base_url)
+        self.assertEqual(first, second)
+        self.assertEqual(len(pd.read_csv(table)), 3)
+
+    def test_unreachable_server_leaves_availability_unknown(self):
+        table = os.path.join(self.output_dir, "isd_availability.csv")
+        base_url = self.server.base_url
+        self.server.close()
+        self.server = IsdFixtureServer(years=[])
+
+        result = probe_isd_availability(
+            [(USAF, WBAN, 2010), (USAF, WBAN, 2011)], table_path=table, base_url=base_url
+        )
+
+        self.assertEqual(result, {(USAF, WBAN, 2010): None, (USAF, WBAN, 2011): None})
+        self.assertFalse(os.path.exists(table))
+
+        # Unknown years do not remove the stations (distance order); only
+        # the one closed before the period is left out
+        selected = select_isd_stations_by_availability(
+            44.0,
+            4.0,
+            "2010-01-01",
+            "2011-12-31",
+            index=build_isd_station_index(self._probe_isd_df()),
+            n=2,
+            table_path=table,
+            base_url=base_url,
+        )
+        self.assertEqual([s["usaf"] for s in selected], ["000001", USAF])
+
+    def test_concurrent_probes_keep_every_row(self):
+        table = os.path.join(self.output_dir, "isd_availability.csv")
+        threads = [
+            threading.Thread(
+                target=probe_isd_availability,
+                args=([(f"{k:06d}", WBAN, 2010)],),
+                kwargs={"table_path": table, "base_url": self.server.base_url},
+            )
+            for k in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(pd.read_csv(table)), 8)
+        self.assertFalse(os.path.exists(table + ".lock"))
+
+    @staticmethod
+    def _probe_isd_df():
+        return pd.DataFrame(
+            {
+                "USAF": ["000001", USAF, "000002"],
+                "WBAN": [WBAN] * 3,
+                "STATION NAME": ["EMPTY", "FIXTURE", "CLOSED"],
+                "CTRY": ["FR"] * 3,
+                "LAT": [44.01, 44.05, 44.02],
+                "LON": [4.0] * 3,
+                "ELEV": [10.0] * 3,
+                "BEGIN": [19730101.0, 19730101.0, 19730101.0],
+                "END": [20241231.0, 20241231.0, 19991231.0],
+            }
+        )
+
+    def test_selection_by_probed_availability(self):
+        # The nearest station has no file on the server; the fixture
+        # station (3 of the 4 years, 2012 missing) is chosen first.
+        isd_df = self._probe_isd_df()
+        table = os.path.join(self.output_dir, "isd_availability.csv")
+
+        selected = select_isd_stations_by_availability(
+            44.0,
+            4.0,
+            "2010-01-01",
+            "2013-12-31",
+            index=build_isd_station_index(isd_df),
+            n=2,
+            table_path=table,
+            base_url=self.server.base_url,
+        )
+
+        # Stations without any file are left out
+        self.assertEqual([s["usaf"] for s in selected], [USAF])
+        self.assertEqual(selected[0]["coverage"], 0.75)
+        # Only years within each station's BEGIN/END window are probed
+        self.assertEqual(len(pd.read_csv(table)), 8)
+
+    def test_cache_lru_eviction(self):
+        cache_dir = os.path.join(self.output_dir, "cache")
+        for year in (2001, 2002, 2003):
+            noaa_isd_cache.store(cache_dir, "global-hourly", year, "x.csv", b"0" * 100)
+            path = os.path.join(cache_dir, "global-hourly", str(year), "x.csv")
+            os.utime(path, (year, year))
+
+        self.assertEqual(noaa_isd_cache.evict_lru(cache_dir, max_bytes=150), 2)
+        self.assertIsNone(noaa_isd_cache.lookup(cache_dir, "global-hourly", 2001, "x.csv"))
+        self.assertIsNotNone(noaa_isd_cache.lookup(cache_dir, "global-hourly", 2003, "x.csv"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import gzip
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from modules.noaa_isd_parser import (
+    apply_isd_quality_filter,
+    canonicalize_hourly,
+    decode_wnd,
+    read_isd_global_hourly,
+    read_isd_lite,
+)
+
+CSV_FIXTURE = b'''"STATION","DATE","SOURCE","REPORT_TYPE","WND","CIG","TMP"
+"07579099999","2010-01-01T00:00:00","4","FM-12","270,1,N,0061,1","22000,1,9,N","+0051,1"
+"07579099999","2010-01-01T03:00:00","4","FM-12","999,9,C,0000,1","22000,1,9,N","+0049,1"
+"07579099999","2010-01-01T06:00:00","4","FM-12","180,3,N,0850,3","22000,1,9,N","+0049,1"
+"07579099999","2010-01-01T09:00:00","4","FM-12","090,1,N,9999,9","22000,1,9,N","+0049,1"
+'''
+
+LITE_FIXTURE = (
+    b"2010 01 01 00   -12   -45 10132   270    61     0 -9999 -9999\n"
+    b"2010 01 01 03   -20   -49 10130     0     0     0 -9999 -9999\n"
+    b"2010 01 01 06   -22   -50 10128 -9999 -9999 -9999 -9999 -9999\n"
+    b"2010 12 31 23    35    10 10120   180  1250     8     3    -1\n"
+)
+
+# Several reports per hour: SYNOP / METAR routine reports and specials
+MIXED_REPORTS_FIXTURE = b'''"STATION","DATE","REPORT_TYPE","WND","GUST"
+"07579099999","2010-01-01T00:00:00","FM-12","270,1,N,0061,1",""
+"07579099999","2010-01-01T00:20:00","FM-16","270,1,N,0150,1","210"
+"07579099999","2010-01-01T00:50:00","FM-15","270,1,N,0070,1",""
+"07579099999","2010-01-01T01:05:00","FM-16","270,1,N,0080,1",""
+"07579099999","2010-01-01T01:40:00","FM-16","270,1,N,0090,1",""
+"07579099999","2010-01-01T03:00:00","FM-15","270,1,N,9999,9",""
+"07579099999","2010-01-01T03:10:00","FM-16","270,1,N,0100,1",""
+'''
+
+
+class TestNoaaIsdParser(unittest.TestCase):
+    def test_decode_wnd(self):
+        wnd = decode_wnd(["318,1,N,0061,1", "999,9,C,0000,5", "bad", None, "090,2,N,9999,9"])
+
+        np.testing.assert_array_equal(wnd["direction"][:2], [318.0, np.nan])
+        np.testing.assert_array_equal(wnd["speed"][:2], [6.1, 0.0])
+        self.assertTrue(np.isnan(wnd["speed"][2:]).all())
+        self.assertEqual(list(wnd["type_code"][:2]), ["N", "C"])
+        self.assertEqual(list(wnd["direction_qc"]), ["1", "9", "9", "9", "2"])
+        self.assertEqual(list(wnd["speed_qc"][:2]), ["1", "5"])
+
+    def test_read_only_needed_columns(self):
+        hourly = read_isd_global_hourly(CSV_FIXTURE)
+
+        self.assertNotIn("TMP", hourly.columns)
+        self.assertEqual(len(hourly), 4)
+        self.assertEqual(str(hourly["time"].dt.tz), "UTC")
+        self.assertEqual(list(hourly["wind_speed_qc"].astype(str)), ["1", "1", "3", "9"])
+        self.assertTrue(hourly["gust_raw"].isna().all())
+
+    def test_read_isd_lite_fixed_width(self):
+        lite = read_isd_lite(gzip.compress(LITE_FIXTURE))
+
+        self.assertEqual(
+            [str(t) for t in lite["time"]],
+            [
+                "2010-01-01 00:00:00+00:00",
+                "2010-01-01 03:00:00+00:00",
+                "2010-01-01 06:00:00+00:00",
+                "2010-12-31 23:00:00+00:00",
+            ],
+        )
+        np.testing.assert_array_equal(lite["wind_speed_raw"], [6.1, 0.0, np.nan, 125.0])
+        # Calm direction (0) is treated as missing, like 999 in Global Hourly
+        np.testing.assert_array_equal(lite["wind_dir_raw"], [270.0, np.nan, np.nan, 180.0])
+        self.assertEqual(list(lite["wind_type"]), ["N", "C", "N", "N"])
+
+        # No quality codes: only the range check rejects values
+        filtered, table = apply_isd_quality_filter(lite)
+        self.assertEqual(table.loc[0, "speed_range"], 1)
+        self.assertEqual(table.loc[0, "speed_qc_2"], 0)
+        self.assertTrue(np.isnan(filtered["wind_speed"].iloc[3]))
+
+    def test_canonical_hourly_series(self):
+        filtered, _ = apply_isd_quality_filter(read_isd_global_hourly(MIXED_REPORTS_FIXTURE))
+        canonical = canonicalize_hourly(filtered)
+
+        self.assertEqual(
+            [t.strftime("%H:%M") for t in canonical["time"]], ["00:00", "01:00", "03:00"]
+        )
+        # Routine report over the special, on the hour over 00:50 (which
+        # stays in hour 00); 01:05 is nearer a whole hour than 01:40; a
+        # valid special beats a routine report with a missing speed
+        self.assertEqual(list(canonical["report_type"]), ["FM-12", "FM-16", "FM-16"])
+        np.testing.assert_array_equal(canonical["wind_speed"], [6.1, 8.0, 10.0])
+        # Gust from the 00:20 special is kept as the hourly maximum
+        np.testing.assert_array_equal(canonical["gust_raw"], [21.0, np.nan, np.nan])
+
+    def test_canonical_hourly_keeps_year_boundary(self):
+        year_2010 = b'''"STATION","DATE","REPORT_TYPE","WND","GUST"
+"07579099999","2010-12-31T23:00:00","FM-15","270,1,N,0050,1",""
+"07579099999","2010-12-31T23:50:00","FM-15","270,1,N,0060,1",""
+'''
+        year_2011 = b'''"STATION","DATE","REPORT_TYPE","WND","GUST"
+"07579099999","2011-01-01T00:00:00","FM-15","270,1,N,0070,1",""
+'''
+        parts = []
+        for content in (year_2010, year_2011):
+            filtered, _ = apply_isd_quality_filter(read_isd_global_hourly(content))
+            parts.append(canonicalize_hourly(filtered))
+        combined = pd.concat(parts, ignore_index=True)
+
+        # 23:50 stays in the 2010 file's last hour: no duplicate 2011 hour
+        self.assertEqual(
+            [str(t) for t in combined["time"]],
+            ["2010-12-31 23:00:00+00:00", "2011-01-01 00:00:00+00:00"],
+        )
+        np.testing.assert_array_equal(combined["wind_speed"], [5.0, 7.0])
+
+    def test_quality_filter_and_per_year_table(self):
+        hourly = read_isd_global_hourly(CSV_FIXTURE)
+        filtered, qc_table = apply_isd_quality_filter(hourly)
+
+        np.testing.assert_array_equal(filtered["wind_speed"], [6.1, 0.0, np.nan, np.nan])
+        np.testing.assert_array_equal(filtered["wind_dir"], [270.0, np.nan, np.nan, 90.0])
+
+        self.assertEqual(len(qc_table), 1)
+        row = qc_table.iloc[0]
+        self.assertEqual(row["year"], 2010)
+        self.assertEqual(row["n_obs"], 4)
+        self.assertEqual(row["speed_qc_3"], 1)
+        self.assertEqual(row["direction_qc_3"], 1)
+        self.assertEqual(row["speed_range"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+from modules.noaa_station_finder import (
+    load_isd_stations,
+    build_isd_station_index,
+    find_nearest_isd_stations,
+    find_nearest_isd_stations_batch,
+    isd_station_coverage,
+    load_isd_inventory,
+    select_isd_stations_by_coverage,
+    station_active_years,
+)
+
+
+def _make_isd_df(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "USAF": [f"{i:06d}" for i in range(n)],
+            "WBAN": ["99999"] * n,
+            "STATION NAME": [f"STATION {i}" for i in range(n)],
+            "CTRY": ["FR"] * n,
+            "LAT": rng.uniform(42.0, 47.0, n),
+            "LON": rng.uniform(1.0, 7.0, n),
+            "ELEV": rng.uniform(0.0, 500.0, n),
+            "BEGIN": [19730101.0] * n,
+            "END": [20241231.0] * n,
+        }
+    )
+
+
+def _brute_force(site_lat, site_lon, isd_df, max_distance_km, n):
+    dists = [
+        (geodesic((site_lat, site_lon), (lat, lon)).km, usaf)
+        for lat, lon, usaf in zip(isd_df["LAT"], isd_df["LON"], isd_df["USAF"])
+    ]
+    dists = [d for d in dists if d[0] <= max_distance_km]
+    dists.sort()
+    return dists[:n]
+
+
+class TestNoaaStationIndex(unittest.TestCase):
+    def setUp(self):
+        self.isd_df = _make_isd_df()
+        self.index = build_isd_station_index(self.isd_df)
+
+    def test_matches_geodesic_ranking(self):
+        site_lat, site_lon = 44.21, 4.74
+        expected = _brute_force(site_lat, site_lon, self.isd_df, 80, 5)
+        result = find_nearest_isd_stations(site_lat, site_lon, index=self.index, n=5)
+
+        self.assertEqual([s["usaf"] for s in result], [e[1] for e in expected])
+        for station, (dist_km, _) in zip(result, expected):
+            self.assertAlmostEqual(station["distance_km"], round(dist_km, 2))
+        self.assertEqual(result[0]["years_available"][0], 1973)
+
+    def test_requested_years_limited_to_active_window(self):
+        station = find_nearest_isd_stations(44.21, 4.74, index=self.index, n=1)[0]
+
+        self.assertEqual(station_active_years(station, 2020, 2026), [2020, 2021, 2022, 2023, 2024])
+        self.assertEqual(station_active_years(station, 1950, 1972), [])
+        self.assertEqual(station_active_years({"years_available": None}, 1950, 1951), [1950, 1951])
+
+    def test_batch_matches_single_queries(self):
+        sites = [(44.21, 4.74), (45.5, 2.0), (60.0, 20.0)]
+        batch = find_nearest_isd_stations_batch(sites, index=self.index, n=3)
+
+        self.assertEqual(len(batch), 3)
+        for (lat, lon), stations in zip(sites, batch):
+            single = find_nearest_isd_stations(lat, lon, self.isd_df, n=3)
+            self.assertEqual(
+                [s["station_id"] for s in stations], [s["station_id"] for s in single]
+            )
+        self.assertEqual(batch[2], [])
+
+
+class TestIsdStationCatalogue(unittest.TestCase):
+    def test_cache_rebuilt_when_csv_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "isd-history.csv")
+            _make_isd_df(n=10).to_csv(csv_path, index=False)
+
+            first = load_isd_stations(csv_path)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "isd-history.pkl")))
+            self.assertEqual(len(first), 10)
+            self.assertTrue(pd.api.types.is_float_dtype(first["LAT"]))
+
+            cached = load_isd_stations(csv_path)
+            pd.testing.assert_frame_equal(first, cached)
+
+            _make_isd_df(n=12).to_csv(csv_path, index=False)
+            os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 10**9))
+            self.assertEqual(len(load_isd_stations(csv_path)), 12)
+
+
+class TestIsdInventory(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.isd_df = _make_isd_df(n=50)
+        self.index = build_isd_station_index(self.isd_df)
+        self.nearest = find_nearest_isd_stations(44.21, 4.74, index=self.index, n=3)
+
+        # Nearest station: only 2019; second nearest: 2019-2020 full hourly
+        rows = []
+        for usaf, years in ((self.nearest[0]["usaf"], [2019]), (self.nearest[1]["usaf"], [2019, 2020])):
+            for year in years:
+                rows.append([usaf, "99999", year] + [720] * 12)
+        rows.append([self.nearest[2]["usaf"], "99999", 2020] + [100] * 12)
+        inventory_csv = os.path.join(self._tmp.name, "isd-inventory.csv")
+        pd.DataFrame(
+            rows,
+            columns=["USAF", "WBAN", "YEAR", "JAN", "FEB", "MAR", "APR", "MAY", "JUN",
+                     "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"],
+        ).to_csv(inventory_csv, index=False)
+        self.inventory = load_isd_inventory(inventory_csv)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_inventory_array_and_coverage(self):
+        self.assertEqual(self.inventory["counts"].shape, (3, 24))
+        self.assertEqual(self.inventory["first_year"], 2019)
+
+        ids = [s["station_id"] for s in self.nearest] + ["000000-00000"]
+        coverage = isd_station_coverage(self.inventory, ids, "2019-01-01", "2020-12-31")
+        np.testing.assert_allclose(coverage, [0.5, 1.0, 0.0, 0.0])
+
+    def test_monthly_threshold_follows_month_length(self):
+        # 8 reports a day less 10%: 202 in February 2019, 216 in April, 224 in May
+        counts = np.zeros((1, 24), dtype=np.uint16)
+        counts[0, 1] = 202
+        counts[0, 3] = 215
+        counts[0, 4] = 224
+        counts[0, 13] = 202  # February 2020 has 29 days: 209 needed
+        inventory = {"station_ids": np.array(["A-1"]), "first_year": 2019, "counts": counts}
+
+        for start, end, expected in (
+            ("2019-02-01", "2019-02-28", 1.0),
+            ("2019-04-01", "2019-05-31", 0.5),
+            ("2020-02-01", "2020-02-29", 0.0),
+        ):
+            coverage = isd_station_coverage(inventory, ["A-1"], start, end)
+            np.testing.assert_allclose(coverage, [expected])
+
+    def test_selector_prefers_covered_stations(self):
+        selected = select_isd_stations_by_coverage(
+            44.21, 4.74, self.inventory, "2019-01-01", "2020-12-31",
+            index=self.index, n=2, min_coverage=0.8,
+        )
+
+        self.assertEqual(selected[0]["station_id"], self.nearest[1]["station_id"])
+        self.assertEqual(selected[1]["station_id"], self.nearest[0]["station_id"])
+        self.assertEqual(selected[0]["coverage"], 1.0)
+
+        # Only two candidates have covered months at all
+        selected = select_isd_stations_by_coverage(
+            44.21, 4.74, self.inventory, "2019-01-01", "2020-12-31",
+            index=self.index, n=3, min_coverage=0.8,
+        )
+        self.assertEqual(len(selected), 2)
+
+    def test_inventory_restricted_to_study_years(self):
+        inventory = load_isd_inventory(
+            os.path.join(self._tmp.name, "isd-inventory.csv"),
+            start_date="2020-03-01",
+            end_date="2020-06-30",
+            use_cache=False,
+        )
+
+        self.assertEqual(inventory["first_year"], 2020)
+        self.assertEqual(inventory["counts"].shape, (2, 12))
+        self.assertNotIn(self.nearest[0]["station_id"], inventory["station_ids"])
+        ids = [s["station_id"] for s in self.nearest]
+        coverage = isd_station_coverage(inventory, ids, "2020-01-01", "2020-12-31")
+        np.testing.assert_allclose(coverage, [0.0, 1.0, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,346 @@
+import contextlib
+import io
+import json
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+
+from modules.openmeteo_fetcher import (
+    OPENMETEO_ARCHIVE_URL,
+    OPENMETEO_DAILY_VARIABLES,
+    _aggregate_hourly_block,
+    _archive_params,
+    _date_chunks,
+    _location_batches,
+    _model_label,
+    fetch_openmeteo_batch,
+    fetch_openmeteo_data,
+)
+
+
+def _archive_payload(query):
+    """
+    Archive response for the requested period and locations: one object, or
+    a list for comma-separated coordinates. Hourly speed = day of month +
+    latitude, gust = speed + 1, direction alternating 350 / 10 deg (north
+    on average). Daily requests get the matching daily block (max and mean
+    speed, max gust, dominant direction 0).
+    """
+    latitudes = [float(v) for v in query["latitude"][0].split(",")]
+    longitudes = [float(v) for v in query["longitude"][0].split(",")]
+    start = date.fromisoformat(query["start_date"][0])
+    end = date.fromisoformat(query["end_date"][0])
+
+    items = []
+    for lat, lon in zip(latitudes, longitudes):
+        if "daily" in query:
+            days = [start + timedelta(days=k) for k in range((end - start).days + 1)]
+            items.append(
+                {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "elevation": 42.0,
+                    "timezone": "UTC",
+                    "utc_offset_seconds": 0,
+                    "daily_units": {"time": "unixtime"},
+                    "daily": {
+                        "time": [
+                            int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp())
+                            for d in days
+                        ],
+                        "wind_speed_10m_max": [d.day + lat for d in days],
+                        "wind_speed_10m_mean": [d.day + lat - 0.5 for d in days],
+                        "wind_gusts_10m_max": [d.day + lat + 1.0 for d in days],
+                        "wind_direction_10m_dominant": [0] * len(days),
+                    },
+                }
+            )
+            continue
+        times, speeds, directions, gusts = [], [], [], []
+        day = start
+        while day <= end:
+            for hour in range(24):
+                stamp = datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc)
+                if query.get("timeformat") == ["unixtime"]:
+                    times.append(int(stamp.timestamp()))
+                else:
+                    times.append(stamp.strftime("%Y-%m-%dT%H:%M"))
+                speeds.append(day.day + lat)
+                directions.append(350.0 if hour % 2 else 10.0)
+                gusts.append(day.day + lat + 1.0)
+            day += timedelta(days=1)
+        items.append(
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "elevation": 42.0,
+                "timezone": "UTC",
+                "utc_offset_seconds": 0,
+                "hourly_units": {"time": query.get("timeformat", ["iso8601"])[0]},
+                "hourly": {
+                    "time": times,
+                    "wind_speed_10m": speeds,
+                    "wind_direction_10m": directions,
+                    "wind_gusts_10m": gusts,
+                },
+            }
+        )
+    return items[0] if len(items) == 1 else items
+
+
+class OpenMeteoFixtureServer:
+    """
+    Local HTTP stand-in for the archive API. Records the query of every
+    request; the first `fail_first` requests get a 503. Each response is
+    delayed by `delay_s` seconds.
+    """
+
+    def __init__(self, fail_first=0, delay_s=0):
+        self.queries = []
+        self.fail_first = fail_first
+        self.delay_s = delay_s
+        self.reject_latitude = None
+        self._lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                with fixture._lock:
+                    fixture.queries.append(query)
+                    fail = len(fixture.queries) <= fixture.fail_first
+                if fixture.reject_latitude in query["latitude"][0].split(","):
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                time.sleep(fixture.delay_s)
+                if fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps(_archive_payload(query)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        # Clients that gave up (timeouts) close the connection early
+        self.server.handle_error = lambda request, client_address: None
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1/archive"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestOpenMeteoChunks(unittest.TestCase):
+    def test_date_chunks_align_on_years(self):
+        self.assertEqual(
+            _date_chunks("1980-03-05", "1982-06-01"),
+            [
+                ("1980-03-05", "1980-12-31"),
+                ("1981-01-01", "1981-12-31"),
+                ("1982-01-01", "1982-06-01"),
+            ],
+        )
+        self.assertEqual(
+            _date_chunks("1980-03-05", "1983-06-01", chunk_years=2),
+            [("1980-03-05", "1981-12-31"), ("1982-01-01", "1983-06-01")],
+        )
+
+    def test_chunked_fetch_matches_period(self):
+        server = OpenMeteoFixtureServer()
+        self.addCleanup(server.close)
+
+        df = fetch_openmeteo_data(
+            0.0, 2.35, "2020-12-30", "2022-01-02", base_url=server.base_url
+        )
+
+        periods = sorted((q["start_date"][0], q["end_date"][0]) for q in server.queries)
+        self.assertEqual(
+            periods,
+            [
+                ("2020-12-30", "2020-12-31"),
+                ("2021-01-01", "2021-12-31"),
+                ("2022-01-01", "2022-01-02"),
+            ],
+        )
+        self.assertEqual(len(df), 2 + 365 + 2)
+        self.assertTrue(df["time"].is_monotonic_increasing)
+        self.assertTrue((df["n_hours"] == 24).all())
+        self.assertEqual(df["windspeed_mean"].iloc[0], 30.0)
+        self.assertEqual(df["windspeed_gust"].iloc[-1], 3.0)
+        direction = df["wind_direction"].to_numpy()
+        self.assertTrue(np.allclose(np.minimum(direction, 360.0 - direction), 0.0, atol=1e-6))
+        self.assertEqual(df["elevation"].iloc[0], 42.0)
+
+    def test_transient_error_is_retried(self):
+        server = OpenMeteoFixtureServer(fail_first=1)
+        self.addCleanup(server.close)
+
+        df = fetch_openmeteo_data(
+            48.85, 2.35, "2021-01-01", "2021-01-03", base_url=server.base_url
+        )
+
+        self.assertEqual(len(server.queries), 2)
+        self.assertEqual(len(df), 3)
+
+    def test_timeout_bounds_the_download(self):
+        server = OpenMeteoFixtureServer(delay_s=2)
+        self.addCleanup(server.close)
+
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            fetch_openmeteo_data(
+                1.0, 10.0, "2020-01-01", "2021-12-31", base_url=server.base_url, timeout=0.3
+            )
+        self.assertLess(time.monotonic() - started, 1.5)
+
+
+class TestOpenMeteoBatch(unittest.TestCase):
+    def test_location_batches_respect_limits(self):
+        locations = [(float(i), float(-i)) for i in range(7)]
+
+        by_count = _location_batches(locations, "2021-01-01", "2021-12-31", max_locations=3)
+        self.assertEqual(by_count, [[0, 1, 2], [3, 4, 5], [6]])
+
+        empty_url = requests.Request(
+            "GET", OPENMETEO_ARCHIVE_URL, params=_archive_params([], "2021-01-01", "2021-12-31")
+        ).prepare().url
+        limit = len(empty_url) + 60
+        by_url = _location_batches(locations, "2021-01-01", "2021-12-31", max_url_length=limit)
+        self.assertEqual(sum(len(batch) for batch in by_url), len(locations))
+        for batch in by_url:
+            url = requests.Request(
+                "GET",
+                OPENMETEO_ARCHIVE_URL,
+                params=_archive_params([locations[i] for i in batch], "2021-01-01", "2021-12-31"),
+            ).prepare().url
+            self.assertLessEqual(len(url), limit)
+
+    def test_batch_fetch_splits_sites(self):
+        server = OpenMeteoFixtureServer()
+        self.addCleanup(server.close)
+        locations = [(1.0, 10.0), (2.0, 20.0), (3.0, 30.0)]
+
+        frames = fetch_openmeteo_batch(
+            locations,
+            "2020-12-31",
+            "2021-01-02",
+            base_url=server.base_url,
+            max_locations=2,
+        )
+
+        # 2 location batches x 2 yearly chunks
+        self.assertEqual(len(server.queries), 4)
+        self.assertEqual(len(frames), 3)
+        for (lat, lon), df in zip(locations, frames):
+            self.assertEqual(len(df), 3)
+            self.assertEqual(df["latitude"].iloc[0], lat)
+            self.assertEqual(df["longitude"].iloc[0], lon)
+            self.assertEqual(list(df["windspeed_mean"]), [31.0 + lat, 1.0 + lat, 2.0 + lat])
+            self.assertEqual(df["source"].iloc[0], "open-meteo")
+
+    def test_failed_batch_leaves_other_sites(self):
+        server = OpenMeteoFixtureServer()
+        self.addCleanup(server.close)
+
+        # Latitude 95 is rejected by the fixture like an invalid coordinate,
+        # which fails the whole request of the first two sites.
+        server.reject_latitude = "95.0"
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            frames = fetch_openmeteo_batch(
+                [(1.0, 10.0), (95.0, 20.0), (96.0, 30.0)],
+                "2021-01-01",
+                "2021-01-02",
+                base_url=server.base_url,
+                max_locations=2,
+            )
+
+        self.assertIsNone(frames[0])
+        self.assertIsNone(frames[1])
+        self.assertEqual(len(frames[2]), 2)
+        # The failed request is reported once, with every site it held
+        failures = [line for line in log.getvalue().splitlines() if "request failed" in line]
+        self.assertEqual(len(failures), 1)
+        self.assertIn(
+            "all 2 site(s) of this batch failed: [(1.0, 10.0), (95.0, 20.0)]", failures[0]
+        )
+
+
+class TestOpenMeteoDecoding(unittest.TestCase):
+    def test_unixtime_and_iso_blocks_aggregate_alike(self):
+        query = {
+            "latitude": ["0"],
+            "longitude": ["0"],
+            "start_date": ["2021-02-27"],
+            "end_date": ["2021-03-01"],
+        }
+        iso = _aggregate_hourly_block(_archive_payload(query)["hourly"])
+        hourly = _archive_payload(dict(query, timeformat=["unixtime"]))["hourly"]
+        hourly["wind_gusts_10m"][0] = None
+        unix = _aggregate_hourly_block(hourly)
+
+        self.assertEqual(
+            list(unix["time"].dt.strftime("%Y-%m-%d")),
+            ["2021-02-27", "2021-02-28", "2021-03-01"],
+        )
+        self.assertTrue(np.array_equal(iso["windspeed_mean"], unix["windspeed_mean"]))
+        self.assertTrue(np.array_equal(iso["windspeed_gust"], unix["windspeed_gust"]))
+        self.assertTrue((unix["n_hours"] == 24).all())
+
+
+class TestOpenMeteoDailyMode(unittest.TestCase):
+    def test_daily_mode_uses_daily_variables(self):
+        server = OpenMeteoFixtureServer()
+        self.addCleanup(server.close)
+
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            df = fetch_openmeteo_data(
+                1.0,
+                10.0,
+                "2021-01-01",
+                "2021-01-03",
+                base_url=server.base_url,
+                aggregation="daily",
+            )
+
+        self.assertIn("Open-Meteo API call (daily)", log.getvalue())
+        query = server.queries[0]
+        self.assertNotIn("hourly", query)
+        self.assertEqual(query["daily"][0].split(","), list(OPENMETEO_DAILY_VARIABLES))
+        self.assertEqual(list(df["windspeed_mean"]), [2.0, 3.0, 4.0])
+        self.assertEqual(list(df["windspeed_gust"]), [3.0, 4.0, 5.0])
+        self.assertEqual(list(df["windspeed_daily_avg"]), [1.5, 2.5, 3.5])
+        self.assertTrue(df["n_hours"].isna().all())
+        self.assertEqual(
+            list(df["time"].dt.strftime("%Y-%m-%d")),
+            ["2021-01-01", "2021-01-02", "2021-01-03"],
+        )
+        self.assertEqual(df["model"].iloc[0], "daily")
+
+    def test_model_label_and_unknown_mode(self):
+        self.assertEqual(_model_label(None, "hourly"), "")
+        self.assertEqual(_model_label("era5", "hourly"), "era5")
+        self.assertEqual(_model_label("era5", "daily"), "era5:daily")
+        with self.assertRaises(ValueError):
+            fetch_openmeteo_data(1.0, 10.0, "2021-01-01", "2021-01-03", aggregation="weekly")
+
+
+if __name__ == "__main__":
+    unittest.main()
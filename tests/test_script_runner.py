@@ -0,0 +1,96 @@
+import contextlib
+import io
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from tests import fake_meteostat
+
+fake_meteostat.install()
+
+try:
+    import script  # noqa: E402
+except ImportError:
+    # script.py also loads the globe view and report modules (plotly, docx...)
+    script = None
+
+
+SITES = [
+    {"name": name, "country": "FR", "latitude": "44.0", "longitude": "4.5", "reference": ""}
+    for name in ("ALPHA", "BROKEN", "GAMMA", "DELTA")
+]
+
+
+def _fake_process_site(site, start, end, isd_index, *args):
+    """process_site stand-in: prints on stdout and stderr, fails for BROKEN."""
+    print(f"fetching {site['name']}")
+    print(f"progress {site['name']}", file=sys.stderr)
+    if site["name"] == "BROKEN":
+        raise RuntimeError("no source for BROKEN")
+    record = script._new_site_data(site, start, end)
+    record["noaa1"] = isd_index
+    record["data"] = {"era5": "frame"}
+    return record
+
+
+def _init_fake_site_worker(isd_index, isd_inventory=None):
+    # Set in the worker process itself, so it also holds with spawned workers
+    script._worker_isd_index = isd_index
+    script._worker_isd_inventory = isd_inventory
+    script.process_site = _fake_process_site
+
+
+def _fake_site_pool(max_workers, initializer, initargs):
+    return ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_fake_site_worker, initargs=initargs
+    )
+
+
+@unittest.skipIf(script is None, "script.py dependencies not installed")
+class TestRunSites(unittest.TestCase):
+    def _run(self, site_workers):
+        out = io.StringIO()
+        with mock.patch.object(script, "process_site", _fake_process_site), \
+                mock.patch.object(script, "ProcessPoolExecutor", _fake_site_pool), \
+                contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            results = script.run_sites(
+                SITES, "2020-01-01", "2020-12-31", "index", site_workers=site_workers
+            )
+        return results, out.getvalue()
+
+    def test_records_keep_input_order_with_failing_site(self):
+        for site_workers in (1, 2):
+            with self.subTest(site_workers=site_workers):
+                results, output = self._run(site_workers)
+
+                self.assertEqual([r["name"] for r in results], [s["name"] for s in SITES])
+                self.assertEqual(
+                    results[1], script._new_site_data(SITES[1], "2020-01-01", "2020-12-31")
+                )
+                for record in results[:1] + results[2:]:
+                    self.assertEqual(record["noaa1"], "index")
+                self.assertIn("1 site(s) failed: BROKEN", output)
+                self.assertIn("RuntimeError: no source for BROKEN", output)
+
+    def test_parallel_sites_print_their_own_log(self):
+        results, output = self._run(site_workers=2)
+
+        blocks = output.split("\n===== Site ")[1:]
+        self.assertEqual(
+            sorted(block.split(" =====")[0] for block in blocks),
+            sorted(s["name"] for s in SITES),
+        )
+        for block in blocks:
+            name = block.split(" =====")[0]
+            lines = block.split("\n\n")[0].splitlines()[1:]
+            # stdout and stderr (tqdm) of the site, and nothing of the others
+            self.assertEqual(lines[:2], [f"fetching {name}", f"progress {name}"])
+            others = [s["name"] for s in SITES if s["name"] != name]
+            self.assertFalse(any(other in line for line in lines for other in others))
+        # Frames stay in the site folders, not in the returned records
+        self.assertEqual(results[0]["data"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
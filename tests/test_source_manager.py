@@ -0,0 +1,68 @@
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from tests import fake_meteostat
+
+fake_meteostat.install()
+
+from modules import source_manager  # noqa: E402
+from modules.source_manager import _run_source_tasks  # noqa: E402
+
+
+class TestSourceTasks(unittest.TestCase):
+    def test_budget_is_passed_to_tasks(self):
+        budgets = {}
+
+        def task(key):
+            def run(timeout):
+                budgets[key] = timeout
+                return {"data": key}
+            return run
+
+        results = _run_source_tasks(
+            {"openmeteo": task("openmeteo"), "era5": task("era5")},
+            timeouts={"era5": 5},
+        )
+
+        self.assertEqual(budgets, {"openmeteo": 600, "era5": 5})
+        self.assertEqual(results["era5"], {"data": "era5"})
+
+    def test_timed_out_source_is_recorded(self):
+        def slow(timeout):
+            time.sleep(1)
+            return {"data": "late"}
+
+        started = time.monotonic()
+        results = _run_source_tasks(
+            {"nasa_power": slow, "openmeteo": lambda timeout: {"data": "ok"}},
+            concurrent=True,
+            timeouts={"nasa_power": 0.1},
+        )
+
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(results["openmeteo"], {"data": "ok"})
+        self.assertTrue(results["nasa_power"]["timed_out"])
+        self.assertIsNone(results["nasa_power"]["data"])
+        self.assertEqual(results["nasa_power"]["timeout_s"], 0.1)
+
+
+    def test_direct_era5_download_gets_the_budget(self):
+        def out_of_time(*args, timeout=None, **kwargs):
+            self.assertEqual(timeout, 7)
+            raise TimeoutError("ERA5 job still queued at the deadline")
+
+        with tempfile.TemporaryDirectory() as site_folder, \
+                mock.patch.object(source_manager, "save_era5_data", side_effect=out_of_time):
+            entry = source_manager._fetch_era5(
+                "SITE", site_folder, 44.0, 4.5, "2020-01-01", "2020-01-02", timeout=7
+            )
+
+        self.assertEqual(entry, {"data": None, "timed_out": True, "timeout_s": 7})
+
+    def test_meteostat_has_no_budget(self):
+        self.assertNotIn("meteostat", source_manager.SOURCE_TIMEOUTS_S)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from modules.utils import calculate_distance_km
+import numpy as np
+from modules.utils import calculate_distance_km, json_float_array, loads_json
 
 class TestUtils(unittest.TestCase):
     def test_calculate_distance(self):
@@ -12,5 +13,14 @@ class TestUtils(unittest.TestCase):
         self.assertGreater(dist, 300)
         self.assertLess(dist, 500)
 
+    def test_json_float_array(self):
+        data = loads_json(b'{"a": {"20200101": 1.5, "20200102": null}, "b": [1, 2]}')
+
+        values = json_float_array(data["a"])
+        self.assertEqual(values.dtype, np.float64)
+        self.assertEqual(values[0], 1.5)
+        self.assertTrue(np.isnan(values[1]))
+        self.assertEqual(json_float_array(data["b"], np.float32).dtype, np.float32)
+
 if __name__ == '__main__':
     unittest.main()